@@ -0,0 +1,106 @@
+-- Del esquema original (tasks con idx_user_id) al que dan por hecho el resto
+-- de migraciones y la API. Una base creada con BD/schema.sql ya lo tiene y la
+-- registra como aplicada; en una base anterior todo se puede volver a lanzar:
+-- tablas con IF NOT EXISTS, índices repetidos tolerados por migrate.py,
+-- triggers con DROP IF EXISTS y contadores recalculados desde tasks.
+--
+--   idx_user_created / idx_user_updated -> GET /tasks (0001 parte de él) y GET /tasks/changes
+--   ft_tasks_text                       -> GET /tasks/search
+--   task_counters + triggers            -> GET /tasks/stats (0002 redefine los triggers)
+--   task_tombstones + trigger           -> borrados de GET /tasks/changes
+--   reminder_log                        -> recordatorios ya enviados (reminders.py)
+--
+-- idx_user_id se elimina al final: idx_user_created empieza por user_id y
+-- cubre la FOREIGN KEY.
+
+CREATE INDEX idx_user_created ON tasks(user_id, created_at, id);
+CREATE INDEX idx_user_updated ON tasks(user_id, updated_at, id);
+CREATE FULLTEXT INDEX ft_tasks_text ON tasks(title, description);
+
+CREATE TABLE IF NOT EXISTS task_counters (
+    user_id INT NOT NULL,
+    completed BOOLEAN NOT NULL,
+    priority ENUM('low', 'medium', 'high') NOT NULL,
+    due_date DATE NOT NULL,
+    count INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, completed, priority, due_date),
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS task_tombstones (
+    user_id INT NOT NULL,
+    task_id INT NOT NULL,
+    deleted_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (user_id, deleted_at, task_id),
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
+
+CREATE INDEX idx_tombstones_deleted ON task_tombstones(deleted_at);
+
+CREATE TABLE IF NOT EXISTS reminder_log (
+    task_id INT NOT NULL,
+    due_date DATE NOT NULL,
+    user_id INT NOT NULL,
+    fired_at TIMESTAMP NOT NULL,
+    batch_id CHAR(32) NOT NULL,
+    PRIMARY KEY (task_id, due_date),
+    FOREIGN KEY (task_id) REFERENCES tasks(id) ON DELETE CASCADE
+);
+
+DROP TRIGGER IF EXISTS tasks_tombstone_delete;
+DROP TRIGGER IF EXISTS tasks_counters_update_new;
+DROP TRIGGER IF EXISTS tasks_counters_update_old;
+DROP TRIGGER IF EXISTS tasks_counters_delete;
+DROP TRIGGER IF EXISTS tasks_counters_insert;
+
+CREATE TRIGGER tasks_counters_insert AFTER INSERT ON tasks FOR EACH ROW
+    INSERT INTO task_counters (user_id, completed, priority, due_date, count)
+    SELECT NEW.user_id, COALESCE(NEW.completed, FALSE), COALESCE(NEW.priority, 'medium'),
+           COALESCE(NEW.due_date, '9999-12-31'), 1
+    FROM DUAL
+    WHERE @task_archiving IS NULL
+    ON DUPLICATE KEY UPDATE count = count + 1;
+
+CREATE TRIGGER tasks_counters_delete AFTER DELETE ON tasks FOR EACH ROW
+    UPDATE task_counters SET count = count - 1
+    WHERE user_id = OLD.user_id
+      AND completed = COALESCE(OLD.completed, FALSE)
+      AND priority = COALESCE(OLD.priority, 'medium')
+      AND due_date = COALESCE(OLD.due_date, '9999-12-31')
+      AND @task_archiving IS NULL;
+
+CREATE TRIGGER tasks_counters_update_old AFTER UPDATE ON tasks FOR EACH ROW
+    UPDATE task_counters SET count = count - 1
+    WHERE user_id = OLD.user_id
+      AND completed = COALESCE(OLD.completed, FALSE)
+      AND priority = COALESCE(OLD.priority, 'medium')
+      AND due_date = COALESCE(OLD.due_date, '9999-12-31')
+      AND (OLD.user_id <> NEW.user_id OR NOT (OLD.completed <=> NEW.completed)
+           OR NOT (OLD.priority <=> NEW.priority) OR NOT (OLD.due_date <=> NEW.due_date));
+
+CREATE TRIGGER tasks_counters_update_new AFTER UPDATE ON tasks FOR EACH ROW FOLLOWS tasks_counters_update_old
+    INSERT INTO task_counters (user_id, completed, priority, due_date, count)
+    SELECT NEW.user_id, COALESCE(NEW.completed, FALSE), COALESCE(NEW.priority, 'medium'),
+           COALESCE(NEW.due_date, '9999-12-31'), 1
+    FROM DUAL
+    WHERE OLD.user_id <> NEW.user_id OR NOT (OLD.completed <=> NEW.completed)
+          OR NOT (OLD.priority <=> NEW.priority) OR NOT (OLD.due_date <=> NEW.due_date)
+    ON DUPLICATE KEY UPDATE count = count + 1;
+
+CREATE TRIGGER tasks_tombstone_delete AFTER DELETE ON tasks FOR EACH ROW FOLLOWS tasks_counters_delete
+    INSERT INTO task_tombstones (user_id, task_id, deleted_at)
+    SELECT OLD.user_id, OLD.id, CURRENT_TIMESTAMP
+    FROM DUAL
+    WHERE @task_archiving IS NULL;
+
+-- Contadores de las tareas que ya existían, con los triggers ya activos.
+-- INSERT ... SELECT bloquea en modo compartido lo que lee: un INSERT o DELETE
+-- concurrente espera y su trigger se aplica sobre el valor ya recalculado.
+INSERT INTO task_counters (user_id, completed, priority, due_date, count)
+    SELECT user_id, COALESCE(completed, FALSE), COALESCE(priority, 'medium'),
+           COALESCE(due_date, '9999-12-31'), COUNT(*)
+    FROM tasks
+    GROUP BY user_id, COALESCE(completed, FALSE), COALESCE(priority, 'medium'), COALESCE(due_date, '9999-12-31')
+    ON DUPLICATE KEY UPDATE count = VALUES(count);
+
+DROP INDEX idx_user_id ON tasks;
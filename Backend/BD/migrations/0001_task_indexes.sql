@@ -0,0 +1,26 @@
+-- Índices de tasks alineados con GET /tasks (routes.build_tasks_query).
+--
+-- Todas las consultas filtran primero por user_id y ordenan por
+-- (created_at DESC, id DESC). Cada combinación de filtros tiene un índice que
+-- empieza por user_id, sigue con las columnas filtradas por igualdad y
+-- termina en (created_at, id): MySQL recorre el índice ya en orden y corta en
+-- el LIMIT, sin filesort.
+--
+--   sin filtros              -> idx_user_created (migración 0000)
+--   completed                -> idx_user_completed_created
+--   priority                 -> idx_user_priority_created
+--   completed + priority     -> idx_user_completed_priority_created
+--
+-- Se eliminan índices que ninguna consulta usa y que se mantienen en cada
+-- INSERT/UPDATE: idx_email e idx_username duplican las claves UNIQUE de
+-- users, e idx_completed/idx_priority tienen dos o tres valores distintos y
+-- nunca ganan a los índices que empiezan por user_id.
+
+CREATE INDEX idx_user_completed_created ON tasks(user_id, completed, created_at, id);
+CREATE INDEX idx_user_priority_created ON tasks(user_id, priority, created_at, id);
+CREATE INDEX idx_user_completed_priority_created ON tasks(user_id, completed, priority, created_at, id);
+
+DROP INDEX idx_completed ON tasks;
+DROP INDEX idx_priority ON tasks;
+DROP INDEX idx_email ON users;
+DROP INDEX idx_username ON users;
@@ -0,0 +1,56 @@
+-- Archivo de tareas completadas (archive.py).
+--
+-- Las tareas completadas sin cambios desde hace ARCHIVE_AFTER_DAYS se mueven
+-- de tasks a tasks_archive, así los índices que recorre GET /tasks solo
+-- contienen las tareas vivas. Los ids no cambian: InnoDB (MySQL 8) no
+-- reutiliza valores de AUTO_INCREMENT aunque la fila ya no esté en tasks.
+--
+-- Mover filas entre tablas no es crear ni borrar tareas: durante el
+-- movimiento archive.py fija @task_archiving y los triggers de abajo no
+-- tocan task_counters (las estadísticas siguen contando las archivadas) ni
+-- escriben lápidas (los clientes de GET /tasks/changes las conservan).
+-- Las tablas task_counters y task_tombstones que escriben los triggers las
+-- crea la migración 0000, que migrate.py aplica antes que esta.
+
+CREATE TABLE IF NOT EXISTS tasks_archive (
+    id INT PRIMARY KEY,
+    user_id INT NOT NULL,
+    title VARCHAR(255) NOT NULL,
+    description TEXT,
+    completed BOOLEAN DEFAULT FALSE,
+    priority ENUM('low', 'medium', 'high') DEFAULT 'medium',
+    due_date DATE,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    archived_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
+
+CREATE INDEX idx_archive_user_created ON tasks_archive(user_id, created_at, id);
+CREATE INDEX idx_archive_user_priority_created ON tasks_archive(user_id, priority, created_at, id);
+
+DROP TRIGGER IF EXISTS tasks_tombstone_delete;
+DROP TRIGGER IF EXISTS tasks_counters_delete;
+DROP TRIGGER IF EXISTS tasks_counters_insert;
+
+CREATE TRIGGER tasks_counters_insert AFTER INSERT ON tasks FOR EACH ROW
+    INSERT INTO task_counters (user_id, completed, priority, due_date, count)
+    SELECT NEW.user_id, COALESCE(NEW.completed, FALSE), COALESCE(NEW.priority, 'medium'),
+           COALESCE(NEW.due_date, '9999-12-31'), 1
+    FROM DUAL
+    WHERE @task_archiving IS NULL
+    ON DUPLICATE KEY UPDATE count = count + 1;
+
+CREATE TRIGGER tasks_counters_delete AFTER DELETE ON tasks FOR EACH ROW
+    UPDATE task_counters SET count = count - 1
+    WHERE user_id = OLD.user_id
+      AND completed = COALESCE(OLD.completed, FALSE)
+      AND priority = COALESCE(OLD.priority, 'medium')
+      AND due_date = COALESCE(OLD.due_date, '9999-12-31')
+      AND @task_archiving IS NULL;
+
+CREATE TRIGGER tasks_tombstone_delete AFTER DELETE ON tasks FOR EACH ROW FOLLOWS tasks_counters_delete
+    INSERT INTO task_tombstones (user_id, task_id, deleted_at)
+    SELECT OLD.user_id, OLD.id, CURRENT_TIMESTAMP
+    FROM DUAL
+    WHERE @task_archiving IS NULL;
@@ -0,0 +1,9 @@
+-- Índice de tasks_archive para GET /tasks/changes (sync_routes.py).
+--
+-- Las tareas archivadas siguen existiendo para los clientes de la
+-- sincronización (0002 no escribe lápidas al archivar), así que la descarga
+-- inicial también las entrega. Cada consulta de cambios lee tasks_archive
+-- desde la marca (updated_at, id), igual que tasks con idx_user_updated: una
+-- tarea archivada no cambia, y con el cliente al día el rango sale vacío.
+
+CREATE INDEX idx_archive_user_updated ON tasks_archive(user_id, updated_at, id);
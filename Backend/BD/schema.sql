@@ -10,9 +10,6 @@ CREATE TABLE IF NOT EXISTS users (
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
 );
 
-CREATE INDEX idx_email ON users(email);
-CREATE INDEX idx_username ON users(username);
-
 CREATE TABLE tasks (
     id INT AUTO_INCREMENT PRIMARY KEY,
     user_id INT NOT NULL,
@@ -26,7 +23,140 @@ CREATE TABLE tasks (
     FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
 );
 
-CREATE INDEX idx_user_id ON tasks(user_id);
-CREATE INDEX idx_completed ON tasks(completed);
-CREATE INDEX idx_priority ON tasks(priority);
-CREATE INDEX idx_due_date ON tasks(due_date);
\ No newline at end of file
+-- Listado por usuario ordenado por fecha: permite paginar por keyset (created_at, id)
+-- recorriendo el índice en orden. También cubre la FOREIGN KEY sobre user_id.
+CREATE INDEX idx_user_created ON tasks(user_id, created_at, id);
+-- Sincronización incremental (GET /tasks/changes): cambios por usuario en orden de updated_at
+CREATE INDEX idx_user_updated ON tasks(user_id, updated_at, id);
+-- Listado filtrado por completed y/o priority con el mismo orden (created_at, id)
+CREATE INDEX idx_user_completed_created ON tasks(user_id, completed, created_at, id);
+CREATE INDEX idx_user_priority_created ON tasks(user_id, priority, created_at, id);
+CREATE INDEX idx_user_completed_priority_created ON tasks(user_id, completed, priority, created_at, id);
+-- Carga de recordatorios por ventana de due_date (reminders.py)
+CREATE INDEX idx_due_date ON tasks(due_date);
+
+-- Búsqueda de texto (GET /tasks/search): MATCH(title, description) AGAINST (... IN BOOLEAN MODE)
+CREATE FULLTEXT INDEX ft_tasks_text ON tasks(title, description);
+
+-- Contadores por usuario para GET /tasks/stats: número de tareas por
+-- (completed, priority, due_date). Los triggers de abajo los actualizan en la
+-- misma transacción que cada INSERT/UPDATE/DELETE sobre tasks. Las tareas sin
+-- due_date se cuentan con due_date = '9999-12-31' (la columna forma parte de
+-- la clave primaria). Reconstrucción: python stats_routes.py --rebuild
+CREATE TABLE task_counters (
+    user_id INT NOT NULL,
+    completed BOOLEAN NOT NULL,
+    priority ENUM('low', 'medium', 'high') NOT NULL,
+    due_date DATE NOT NULL,
+    count INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, completed, priority, due_date),
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
+
+CREATE TRIGGER tasks_counters_insert AFTER INSERT ON tasks FOR EACH ROW
+    INSERT INTO task_counters (user_id, completed, priority, due_date, count)
+    SELECT NEW.user_id, COALESCE(NEW.completed, FALSE), COALESCE(NEW.priority, 'medium'),
+           COALESCE(NEW.due_date, '9999-12-31'), 1
+    FROM DUAL
+    WHERE @task_archiving IS NULL
+    ON DUPLICATE KEY UPDATE count = count + 1;
+
+CREATE TRIGGER tasks_counters_delete AFTER DELETE ON tasks FOR EACH ROW
+    UPDATE task_counters SET count = count - 1
+    WHERE user_id = OLD.user_id
+      AND completed = COALESCE(OLD.completed, FALSE)
+      AND priority = COALESCE(OLD.priority, 'medium')
+      AND due_date = COALESCE(OLD.due_date, '9999-12-31')
+      AND @task_archiving IS NULL;
+
+-- Un UPDATE solo mueve el contador si cambia alguna columna contada
+-- (editar el título o la descripción no toca task_counters)
+CREATE TRIGGER tasks_counters_update_old AFTER UPDATE ON tasks FOR EACH ROW
+    UPDATE task_counters SET count = count - 1
+    WHERE user_id = OLD.user_id
+      AND completed = COALESCE(OLD.completed, FALSE)
+      AND priority = COALESCE(OLD.priority, 'medium')
+      AND due_date = COALESCE(OLD.due_date, '9999-12-31')
+      AND (OLD.user_id <> NEW.user_id OR NOT (OLD.completed <=> NEW.completed)
+           OR NOT (OLD.priority <=> NEW.priority) OR NOT (OLD.due_date <=> NEW.due_date));
+
+CREATE TRIGGER tasks_counters_update_new AFTER UPDATE ON tasks FOR EACH ROW FOLLOWS tasks_counters_update_old
+    INSERT INTO task_counters (user_id, completed, priority, due_date, count)
+    SELECT NEW.user_id, COALESCE(NEW.completed, FALSE), COALESCE(NEW.priority, 'medium'),
+           COALESCE(NEW.due_date, '9999-12-31'), 1
+    FROM DUAL
+    WHERE OLD.user_id <> NEW.user_id OR NOT (OLD.completed <=> NEW.completed)
+          OR NOT (OLD.priority <=> NEW.priority) OR NOT (OLD.due_date <=> NEW.due_date)
+    ON DUPLICATE KEY UPDATE count = count + 1;
+
+
+-- Lápidas de tareas borradas para GET /tasks/changes. Las escribe el trigger
+-- tasks_tombstone_delete y se purgan pasados SYNC_TOMBSTONE_RETENTION_DAYS
+-- (tarea de fondo de la API o python sync_routes.py --purge)
+CREATE TABLE task_tombstones (
+    user_id INT NOT NULL,
+    task_id INT NOT NULL,
+    deleted_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (user_id, deleted_at, task_id),
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
+
+CREATE INDEX idx_tombstones_deleted ON task_tombstones(deleted_at);
+
+CREATE TRIGGER tasks_tombstone_delete AFTER DELETE ON tasks FOR EACH ROW FOLLOWS tasks_counters_delete
+    INSERT INTO task_tombstones (user_id, task_id, deleted_at)
+    SELECT OLD.user_id, OLD.id, CURRENT_TIMESTAMP
+    FROM DUAL
+    WHERE @task_archiving IS NULL;
+
+-- Recordatorios ya enviados (reminders.py): la clave evita repetirlos tras un
+-- reinicio o entre workers. batch_id identifica las filas de cada disparo.
+CREATE TABLE reminder_log (
+    task_id INT NOT NULL,
+    due_date DATE NOT NULL,
+    user_id INT NOT NULL,
+    fired_at TIMESTAMP NOT NULL,
+    batch_id CHAR(32) NOT NULL,
+    PRIMARY KEY (task_id, due_date),
+    FOREIGN KEY (task_id) REFERENCES tasks(id) ON DELETE CASCADE
+);
+
+-- Tareas completadas archivadas por archive.py (mismo id que tenían en tasks).
+-- Mientras archive.py mueve filas fija @task_archiving, y los triggers de
+-- tasks no tocan task_counters ni escriben lápidas: una tarea archivada
+-- sigue existiendo para las estadísticas y para GET /tasks/changes.
+CREATE TABLE tasks_archive (
+    id INT PRIMARY KEY,
+    user_id INT NOT NULL,
+    title VARCHAR(255) NOT NULL,
+    description TEXT,
+    completed BOOLEAN DEFAULT FALSE,
+    priority ENUM('low', 'medium', 'high') DEFAULT 'medium',
+    due_date DATE,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    archived_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
+
+-- GET /tasks?include_archived=true (las archivadas están completadas: el filtro completed=false no las lee)
+CREATE INDEX idx_archive_user_created ON tasks_archive(user_id, created_at, id);
+CREATE INDEX idx_archive_user_priority_created ON tasks_archive(user_id, priority, created_at, id);
+-- GET /tasks/changes (las archivadas también se sincronizan)
+CREATE INDEX idx_archive_user_updated ON tasks_archive(user_id, updated_at, id);
+
+-- Migraciones aplicadas por migrate.py (BD/migrations/NNNN_nombre.sql). Este
+-- archivo ya incluye sus cambios, así que una base nueva creada con él las
+-- registra como aplicadas. Al añadir una migración, reflejarla también aquí.
+CREATE TABLE schema_migrations (
+    version INT PRIMARY KEY,
+    name VARCHAR(255) NOT NULL,
+    checksum CHAR(64) NOT NULL,
+    applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+INSERT INTO schema_migrations (version, name, checksum) VALUES
+    (0, 'baseline', '2cca3d85de4b2c3fc886867c6fec7108fc2cfd15176a1e0f28387ac9fe136228'),
+    (1, 'task_indexes', '338a7698944454f78ba61b4ec97ec13715f7c7d1f7f5f8d8396912756ceca012'),
+    (2, 'task_archive', '63979214c4e5713c8c9205a1bae7a34687e9ca369f0304a7f778d1f3e3e5b991'),
+    (3, 'archive_sync_index', '73bbd2b6b09ba74b9a7e93ccd528397ed60e439de26fbdc81e4ae9edefb4427c');
@@ -0,0 +1,153 @@
+"""Archivo de tareas completadas: mueve de tasks a tasks_archive las antiguas.
+
+Una tarea completada y sin cambios desde hace ARCHIVE_AFTER_DAYS se mueve a
+tasks_archive (migración 0002) con el mismo id. Así los índices de tasks que
+recorre GET /tasks solo contienen las tareas vivas y el listado de una
+cuenta con años de historial cuesta lo mismo que el de una cuenta nueva.
+
+El barrido recorre tasks por rangos de clave primaria (ARCHIVE_SCAN_ROWS ids
+por rango) y no necesita un índice más en la tabla viva. Cada lote de
+hasta ARCHIVE_BATCH_SIZE tareas se mueve en su propia transacción corta:
+
+1. Lectura sin bloqueo de los candidatos del rango y SELECT ... FOR UPDATE
+   por id que vuelve a comprobar el filtro: solo quedan bloqueadas las
+   filas del lote, y una tarea modificada mientras tanto se queda en tasks
+2. INSERT INTO tasks_archive ... SELECT y DELETE FROM tasks con
+   @task_archiving fijado: los triggers no tocan task_counters ni escriben
+   lápidas (ver la migración)
+3. commit, aviso a task_events de los usuarios afectados (caché de
+   listados e índice de búsqueda) y pausa de ARCHIVE_PAUSE segundos para no
+   competir con el tráfico
+
+Lo archivado sigue disponible: GET /tasks?include_archived=true lee las dos
+tablas, GET /tasks/{id} busca también en el archivo, GET /tasks/export las
+incluye, y cualquier escritura sobre una tarea archivada (PUT, DELETE,
+POST /tasks/batch) la devuelve antes a tasks (routes.restore_archived_tasks).
+La búsqueda solo cubre las vivas.
+
+    python archive.py --run             # archiva con ARCHIVE_AFTER_DAYS
+    python archive.py --run --days 30
+
+Con ARCHIVE_INTERVAL > 0 la API lo lanza también cada ARCHIVE_INTERVAL
+segundos (cada worker de serve.py; los lotes de dos workers no se pisan
+gracias al FOR UPDATE).
+"""
+from fastapi.concurrency import run_in_threadpool
+from database import db_connection
+from routes import TASK_FIELDS, RESTORE_DONE_QUERY
+from config import ARCHIVE_AFTER_DAYS, ARCHIVE_BATCH_SIZE, ARCHIVE_SCAN_ROWS, ARCHIVE_PAUSE, ARCHIVE_INTERVAL
+import argparse
+import asyncio
+import logging
+import time
+import task_events
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = ", ".join(TASK_FIELDS)
+
+CANDIDATES_QUERY = """
+    SELECT id, user_id FROM tasks
+    WHERE id > %s AND id <= %s AND completed = TRUE AND updated_at < %s
+    ORDER BY id
+    LIMIT %s
+"""
+
+
+def lock_candidates_query(ids: list, cutoff):
+    """Bloquea por clave primaria los candidatos que siguen cumpliendo el filtro"""
+    placeholders = ", ".join(["%s"] * len(ids))
+    return (f"SELECT id, user_id FROM tasks WHERE id IN ({placeholders}) "
+            f"AND completed = TRUE AND updated_at < %s FOR UPDATE", (*ids, cutoff))
+
+
+def archive_batch(cursor, ids: list):
+    """Mueve a tasks_archive las tareas `ids` (ya bloqueadas) dentro de la transacción de `cursor`"""
+    placeholders = ", ".join(["%s"] * len(ids))
+    try:
+        cursor.execute("SET @task_archiving = 1")
+        cursor.execute(
+            f"INSERT INTO tasks_archive ({COLUMNS}, archived_at) "
+            f"SELECT {COLUMNS}, CURRENT_TIMESTAMP FROM tasks WHERE id IN ({placeholders})",
+            tuple(ids)
+        )
+        cursor.execute(f"DELETE FROM tasks WHERE id IN ({placeholders})", tuple(ids))
+    finally:
+        cursor.execute(RESTORE_DONE_QUERY)
+
+
+def archive_completed(age_days: int = ARCHIVE_AFTER_DAYS, batch_size: int = ARCHIVE_BATCH_SIZE,
+                      scan_rows: int = ARCHIVE_SCAN_ROWS, pause: float = ARCHIVE_PAUSE) -> int:
+    """Archiva las tareas completadas sin cambios desde hace `age_days` días; retorna cuántas"""
+    with db_connection() as connection:
+        cursor = connection.cursor()
+        # Límite con el reloj de MySQL, el que escribe updated_at
+        cursor.execute("SELECT MAX(id), CURRENT_TIMESTAMP - INTERVAL %s DAY FROM tasks", (age_days,))
+        max_id, cutoff = cursor.fetchone()
+        max_id = max_id or 0
+        connection.commit()
+        cursor.close()
+
+    archived = 0
+    last_id = 0
+    start = time.perf_counter()
+    while last_id < max_id:
+        window_end = min(last_id + scan_rows, max_id)
+        with db_connection() as connection:
+            cursor = connection.cursor()
+            try:
+                cursor.execute(CANDIDATES_QUERY, (last_id, window_end, cutoff, batch_size))
+                candidates = [row[0] for row in cursor.fetchall()]
+                rows = []
+                if candidates:
+                    cursor.execute(*lock_candidates_query(candidates, cutoff))
+                    rows = cursor.fetchall()
+                if rows:
+                    archive_batch(cursor, [row[0] for row in rows])
+                connection.commit()
+            except Exception:
+                connection.rollback()
+                raise
+            finally:
+                cursor.close()
+        # Lote lleno: puede quedar más en esta ventana, se sigue desde el último candidato
+        last_id = candidates[-1] if len(candidates) == batch_size else window_end
+        if not rows:
+            continue
+        archived += len(rows)
+        for user_id in {row[1] for row in rows}:
+            task_events.tasks_changed(user_id)
+        if pause > 0:
+            time.sleep(pause)
+
+    if archived:
+        logger.info("🗄️ Tareas archivadas: %d en %.1f s", archived, time.perf_counter() - start)
+    return archived
+
+
+async def archive_periodically(interval: float = ARCHIVE_INTERVAL):
+    """Tarea de fondo del lifespan: archiva cada `interval` segundos"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await run_in_threadpool(archive_completed)
+        except Exception as e:
+            logger.warning("No se pudieron archivar las tareas: %s", e)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archivo de tareas completadas antiguas (tasks_archive)")
+    parser.add_argument("--run", action="store_true", help="mover a tasks_archive las tareas completadas antiguas")
+    parser.add_argument("--days", type=int, default=ARCHIVE_AFTER_DAYS)
+    parser.add_argument("--batch-size", type=int, default=ARCHIVE_BATCH_SIZE)
+    parser.add_argument("--pause", type=float, default=ARCHIVE_PAUSE)
+    args = parser.parse_args()
+    if not args.run:
+        parser.print_help()
+        return
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    print(f"✅ Tareas archivadas: {archive_completed(args.days, args.batch_size, pause=args.pause)}")
+
+
+if __name__ == "__main__":
+    main()
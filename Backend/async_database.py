@@ -0,0 +1,101 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+
+import aiomysql
+from pymysql.constants import CLIENT
+from config import DB_CONFIG, DB_POOL_CONFIG, METRICS_ENABLED
+from database import PoolTimeoutError
+from metrics import AsyncInstrumentedConnection, POOL_WAIT_SECONDS
+
+_pool = None
+_stats = {
+    "waiting": 0,
+    "checkouts": 0,
+    "timeouts": 0,
+    "wait_total": 0.0,
+    "wait_max": 0.0,
+}
+
+
+async def init_async_pool():
+    """Crea el pool de aiomysql (llamar al arrancar la aplicación)"""
+    global _pool
+    if _pool is None:
+        _pool = await aiomysql.create_pool(
+            host=DB_CONFIG["host"],
+            user=DB_CONFIG["user"],
+            password=DB_CONFIG["password"],
+            db=DB_CONFIG["database"],
+            port=int(DB_CONFIG["port"]),
+            autocommit=False,
+            init_command="SET time_zone = '+00:00'",
+            client_flag=CLIENT.FOUND_ROWS,
+            minsize=DB_POOL_CONFIG["size"],
+            maxsize=DB_POOL_CONFIG["size"] + DB_POOL_CONFIG["max_overflow"],
+            pool_recycle=int(DB_POOL_CONFIG["recycle"]) if DB_POOL_CONFIG["recycle"] else -1,
+        )
+    return _pool
+
+
+async def close_async_pool():
+    """Cierra el pool de aiomysql esperando a que se devuelvan las conexiones"""
+    global _pool
+    if _pool is not None:
+        _pool.close()
+        await _pool.wait_closed()
+        _pool = None
+
+
+@asynccontextmanager
+async def async_db_connection():
+    """Context manager asíncrono que presta una conexión del pool de aiomysql"""
+    pool = _pool or await init_async_pool()
+    start = time.monotonic()
+    _stats["waiting"] += 1
+    try:
+        connection = await asyncio.wait_for(pool.acquire(), timeout=DB_POOL_CONFIG["timeout"])
+    except asyncio.TimeoutError:
+        _stats["timeouts"] += 1
+        raise PoolTimeoutError(DB_POOL_CONFIG["timeout"])
+    finally:
+        _stats["waiting"] -= 1
+    waited = time.monotonic() - start
+    POOL_WAIT_SECONDS.observe(waited)
+    _stats["checkouts"] += 1
+    _stats["wait_total"] += waited
+    _stats["wait_max"] = max(_stats["wait_max"], waited)
+    try:
+        yield AsyncInstrumentedConnection(connection) if METRICS_ENABLED else connection
+    finally:
+        # aiomysql cierra la conexión si se devuelve con una transacción abierta
+        if not connection.closed and connection.get_transaction_status():
+            try:
+                await connection.rollback()
+            except Exception:
+                connection.close()
+        pool.release(connection)
+
+
+def get_async_pool_waiting() -> int:
+    return _stats["waiting"]
+
+
+def get_async_pool_stats() -> dict:
+    """Estado del pool asíncrono, con las mismas claves que el pool síncrono"""
+    checkouts = _stats["checkouts"]
+    size = _pool.size if _pool else 0
+    free = _pool.freesize if _pool else 0
+    return {
+        "size": DB_POOL_CONFIG["size"],
+        "max_overflow": DB_POOL_CONFIG["max_overflow"],
+        "open": size,
+        "in_use": size - free,
+        "idle": free,
+        "waiting": _stats["waiting"],
+        "overflow": max(0, size - DB_POOL_CONFIG["size"]),
+        "checkouts": checkouts,
+        "timeouts": _stats["timeouts"],
+        "checkout_wait_avg_ms": round(_stats["wait_total"] / checkouts * 1000, 3) if checkouts else 0.0,
+        "checkout_wait_max_ms": round(_stats["wait_max"] * 1000, 3),
+    }
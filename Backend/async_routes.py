@@ -0,0 +1,330 @@
+"""Versiones asíncronas (aiomysql) de las rutas de tareas y autenticación.
+
+Se usan cuando DB_MODE=async. Comparten con routes.py y auth_routes.py la
+construcción de consultas y el formateo de filas, de modo que solo cambia
+el driver y el event loop deja de bloquearse esperando a MySQL.
+"""
+from fastapi import HTTPException
+from models import TaskCreate, TaskUpdate, UserCreate, UserLogin, UserResponse
+from async_database import async_db_connection
+from routes import (
+    ARCHIVED_TASK_BY_ID_QUERY,
+    DELETE_TASK_QUERY,
+    RESTORE_DONE_QUERY,
+    TASK_BY_ID_QUERY,
+    TASK_TIMESTAMPS_QUERY,
+    archived_ids_query,
+    build_restore_queries,
+    build_created_task,
+    build_insert_query,
+    build_tasks_page,
+    build_tasks_queries,
+    build_update_query,
+    encode_export_chunk,
+    export_queries,
+    merge_task_rows,
+    page_limit,
+    parse_fields,
+)
+from config import EXPORT_BATCH_SIZE
+from serialization import task_row
+from auth_routes import (
+    DUPLICATE_ENTRY,
+    INSERT_USER_QUERY,
+    UPDATE_PASSWORD_QUERY,
+    USER_ID_BY_EMAIL_QUERY,
+    USER_ID_BY_USERNAME_QUERY,
+    USER_LOGIN_QUERY,
+    USER_PROFILE_QUERY,
+    create_access_token,
+    duplicate_user_error,
+    format_datetime,
+    format_user_profile,
+    invalidate_user,
+    user_cache,
+    verify_token,
+)
+from hashing import hash_password_async, verify_password_async, needs_rehash, HashingBusyError
+from typing import Optional
+import aiomysql
+import pymysql
+import task_events
+import logging
+
+logger = logging.getLogger(__name__)
+
+# ===== TAREAS =====
+
+async def restore_archived_tasks(cursor, user_id: int, task_ids) -> set:
+    """Versión asíncrona de routes.restore_archived_tasks"""
+    task_ids = sorted(set(task_ids))
+    if not task_ids:
+        return set()
+    await cursor.execute(*archived_ids_query(user_id, task_ids))
+    found = sorted(row["id"] if isinstance(row, dict) else row[0] for row in await cursor.fetchall())
+    if not found:
+        return set()
+    try:
+        for query, params in build_restore_queries(user_id, found):
+            await cursor.execute(query, params)
+    finally:
+        await cursor.execute(RESTORE_DONE_QUERY)
+    return set(found)
+
+async def get_tasks_route(user_id: int, completed: Optional[bool] = None, priority: Optional[str] = None,
+                          limit: Optional[int] = None, cursor: Optional[str] = None, fields: Optional[str] = None,
+                          include_archived: bool = False):
+    """Obtiene las tareas del usuario con filtros opcionales, paginación y proyección"""
+    try:
+        columns = parse_fields(fields)
+        limit = page_limit(limit, cursor)
+        queries = build_tasks_queries(user_id, completed, priority, limit, cursor, columns, include_archived)
+        results = []
+        async with async_db_connection() as connection:
+            async with connection.cursor(aiomysql.DictCursor) as cursor_db:
+                for query, params in queries:
+                    await cursor_db.execute(query, tuple(params))
+                    results.append(await cursor_db.fetchall())
+        
+        return build_tasks_page(merge_task_rows(results), limit, columns)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("❌ Error en get_tasks_route: %s", e)
+        raise HTTPException(status_code=500, detail=f"Error al obtener tareas: {str(e)}")
+
+async def create_task_route(user_id: int, task: TaskCreate) -> dict:
+    """Crea una nueva tarea (INSERT y lectura de sus fechas por clave primaria antes del commit)"""
+    try:
+        query, params = build_insert_query(user_id, task)
+        async with async_db_connection() as connection:
+            async with connection.cursor(aiomysql.DictCursor) as cursor:
+                await cursor.execute(query, params)
+                task_id = cursor.lastrowid
+                await cursor.execute(TASK_TIMESTAMPS_QUERY, (task_id,))
+                timestamps = await cursor.fetchone()
+                await connection.commit()
+        new_task = build_created_task(task_id, user_id, task, timestamps)
+        await task_events.tasks_changed_async(user_id, [task_events.created(new_task)])
+        
+        return new_task
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("❌ Error en create_task_route: %s", e)
+        raise HTTPException(status_code=500, detail=f"Error al crear tarea: {str(e)}")
+
+async def get_task_route(user_id: int, task_id: int) -> dict:
+    """Obtiene una tarea específica"""
+    try:
+        async with async_db_connection() as connection:
+            async with connection.cursor(aiomysql.DictCursor) as cursor:
+                await cursor.execute(TASK_BY_ID_QUERY, (task_id, user_id))
+                task = await cursor.fetchone()
+                if not task:
+                    await cursor.execute(ARCHIVED_TASK_BY_ID_QUERY, (task_id, user_id))
+                    task = await cursor.fetchone()
+        
+        if not task:
+            raise HTTPException(status_code=404, detail="Tarea no encontrada")
+        
+        return task_row(task)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("❌ Error en get_task_route: %s", e)
+        raise HTTPException(status_code=500, detail=f"Error al obtener tarea: {str(e)}")
+
+async def update_task_route(user_id: int, task_id: int, task: TaskUpdate) -> dict:
+    """Actualiza una tarea existente (UPDATE + lectura en la misma transacción; restaura las archivadas)"""
+    try:
+        update = build_update_query(user_id, task_id, task)
+        async with async_db_connection() as connection:
+            async with connection.cursor(aiomysql.DictCursor) as cursor:
+                if update:
+                    query, params = update
+                    await cursor.execute(query, tuple(params))
+                    if cursor.rowcount == 0:
+                        if not await restore_archived_tasks(cursor, user_id, [task_id]):
+                            raise HTTPException(status_code=404, detail="Tarea no encontrada")
+                        await cursor.execute(query, tuple(params))
+                
+                await cursor.execute(TASK_BY_ID_QUERY, (task_id, user_id))
+                updated_task = await cursor.fetchone()
+                if not updated_task and not update:
+                    await cursor.execute(ARCHIVED_TASK_BY_ID_QUERY, (task_id, user_id))
+                    updated_task = await cursor.fetchone()
+                if not updated_task:
+                    raise HTTPException(status_code=404, detail="Tarea no encontrada")
+                
+                if update:
+                    await connection.commit()
+        updated_task = task_row(updated_task)
+        if update:
+            await task_events.tasks_changed_async(user_id, [task_events.updated(updated_task)])
+        
+        return updated_task
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("❌ Error en update_task_route: %s", e)
+        raise HTTPException(status_code=500, detail=f"Error al actualizar tarea: {str(e)}")
+
+async def delete_task_route(user_id: int, task_id: int) -> dict:
+    """Elimina una tarea (un solo DELETE; 0 filas afectadas = no existe o no es del usuario)"""
+    try:
+        async with async_db_connection() as connection:
+            async with connection.cursor() as cursor:
+                await cursor.execute(DELETE_TASK_QUERY, (task_id, user_id))
+                if cursor.rowcount == 0 and await restore_archived_tasks(cursor, user_id, [task_id]):
+                    await cursor.execute(DELETE_TASK_QUERY, (task_id, user_id))
+                if cursor.rowcount == 0:
+                    raise HTTPException(status_code=404, detail="Tarea no encontrada")
+                await connection.commit()
+        await task_events.tasks_changed_async(user_id, [task_events.deleted(task_id)])
+        
+        return {"message": "Tarea eliminada exitosamente"}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("❌ Error en delete_task_route: %s", e)
+        raise HTTPException(status_code=500, detail=f"Error al eliminar tarea: {str(e)}")
+
+async def export_tasks_route(user_id: int, fmt: str = "ndjson"):
+    """Exporta todas las tareas del usuario con un cursor de servidor (SSDictCursor).
+
+    Primero tasks y después tasks_archive, una consulta por tabla (ver routes.export_tasks_route).
+    """
+    async with async_db_connection() as connection:
+        if fmt == "json":
+            yield b"["
+        first = True
+        for query, params in export_queries(user_id):
+            async with connection.cursor(aiomysql.SSDictCursor) as cursor:
+                await cursor.execute(query, tuple(params))
+                while True:
+                    rows = await cursor.fetchmany(EXPORT_BATCH_SIZE)
+                    if not rows:
+                        break
+                    yield encode_export_chunk(list(rows), fmt, first)
+                    first = False
+        if fmt == "json":
+            yield b"]"
+
+# ===== AUTENTICACIÓN =====
+
+async def rehash_password(user_id: int, password: str):
+    """Actualiza el hash de la contraseña al coste configurado (best-effort)"""
+    try:
+        new_hash = await hash_password_async(password)
+        async with async_db_connection() as connection:
+            async with connection.cursor() as cursor:
+                await cursor.execute(UPDATE_PASSWORD_QUERY, (new_hash, user_id))
+                await connection.commit()
+        invalidate_user(user_id)
+    except HashingBusyError:
+        pass  # se reintentará en el próximo login
+    except Exception as e:
+        logger.warning("No se pudo re-hashear la contraseña de user_id %s: %s", user_id, e)
+
+async def register_user_route(user: UserCreate) -> UserResponse:
+    """Registra un nuevo usuario (duplicados antes de hashear, ver auth_routes.register_user_route)"""
+    try:
+        async with async_db_connection() as connection:
+            async with connection.cursor(aiomysql.DictCursor) as cursor:
+                # Verificar si el email ya existe
+                await cursor.execute(USER_ID_BY_EMAIL_QUERY, (user.email,))
+                if await cursor.fetchone():
+                    raise HTTPException(status_code=400, detail="El email ya está registrado")
+                
+                # Verificar si el username ya existe
+                await cursor.execute(USER_ID_BY_USERNAME_QUERY, (user.username,))
+                if await cursor.fetchone():
+                    raise HTTPException(status_code=400, detail="El nombre de usuario ya existe")
+        
+        # bcrypt se ejecuta en el pool de hashing, sin conexión prestada
+        hashed_password = await hash_password_async(user.password)
+        
+        async with async_db_connection() as connection:
+            async with connection.cursor(aiomysql.DictCursor) as cursor:
+                try:
+                    await cursor.execute(
+                        INSERT_USER_QUERY,
+                        (user.email, user.username, hashed_password)
+                    )
+                except pymysql.err.IntegrityError as e:
+                    if e.args[0] == DUPLICATE_ENTRY:
+                        raise duplicate_user_error(str(e.args[1]))
+                    raise
+                await connection.commit()
+                user_id = cursor.lastrowid
+                
+                await cursor.execute(USER_PROFILE_QUERY, (user_id,))
+                new_user = await cursor.fetchone()
+        
+        token = create_access_token(new_user['id'], new_user['email'])
+        
+        return UserResponse(
+            id=new_user['id'],
+            email=new_user['email'],
+            username=new_user['username'],
+            created_at=format_datetime(new_user.get('created_at')),
+            token=token
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+async def login_user_route(user: UserLogin) -> UserResponse:
+    """Autentica un usuario y retorna un token"""
+    try:
+        async with async_db_connection() as connection:
+            async with connection.cursor(aiomysql.DictCursor) as cursor:
+                await cursor.execute(USER_LOGIN_QUERY, (user.email,))
+                db_user = await cursor.fetchone()
+        
+        if not db_user or not await verify_password_async(user.password, db_user['password']):
+            raise HTTPException(status_code=401, detail="Email o contraseña incorrectos")
+        
+        # Re-hashear si el hash guardado usa un coste distinto al configurado
+        if needs_rehash(db_user['password']):
+            await rehash_password(db_user['id'], user.password)
+        
+        token = create_access_token(db_user['id'], db_user['email'])
+        
+        return UserResponse(
+            id=db_user['id'],
+            email=db_user['email'],
+            username=db_user['username'],
+            created_at=format_datetime(db_user.get('created_at')),
+            token=token
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+async def verify_user_token_route(token: str) -> dict:
+    """Verifica si un token es válido"""
+    try:
+        payload = verify_token(token)
+        profile = user_cache.get(payload['user_id'])
+        if profile is not None:
+            return profile
+        
+        async with async_db_connection() as connection:
+            async with connection.cursor(aiomysql.DictCursor) as cursor:
+                await cursor.execute(USER_PROFILE_QUERY, (payload['user_id'],))
+                user = await cursor.fetchone()
+        
+        if not user:
+            raise HTTPException(status_code=401, detail="Usuario no encontrado")
+        
+        profile = format_user_profile(user)
+        user_cache.set(user['id'], profile)
+        return profile
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
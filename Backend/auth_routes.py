@@ -1,24 +1,37 @@
-import bcrypt
 import jwt
 import os
+import hashlib
+import logging
 from datetime import datetime, timedelta, timezone
 from fastapi import HTTPException
 from models import UserCreate, UserLogin, UserResponse
-from database import get_db_connection
+from database import db_connection
+from hashing import hash_password, verify_password, needs_rehash, HashingBusyError
+from cache import TTLCache
+from metrics import JWT_SECONDS
+from time import perf_counter
+from config import TOKEN_CACHE_SIZE, TOKEN_CACHE_TTL, USER_CACHE_SIZE, USER_CACHE_TTL
 from mysql.connector import Error
 
+logger = logging.getLogger(__name__)
+
 SECRET_KEY = os.getenv("SECRET_KEY", "tu_clave_secreta_super_segura_cambiar_en_produccion")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 10080
 
-def hash_password(password: str) -> str:
-    """Hashea una contraseña usando bcrypt"""
-    salt = bcrypt.gensalt()
-    return bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
+# Consultas sobre users (compartidas con async_routes; migrate.py --explain las revisa)
+USER_ID_BY_EMAIL_QUERY = "SELECT id FROM users WHERE email = %s"
+USER_ID_BY_USERNAME_QUERY = "SELECT id FROM users WHERE username = %s"
+INSERT_USER_QUERY = "INSERT INTO users (email, username, password) VALUES (%s, %s, %s)"
+USER_PROFILE_QUERY = "SELECT id, email, username, created_at FROM users WHERE id = %s"
+USER_LOGIN_QUERY = "SELECT id, email, username, password, created_at FROM users WHERE email = %s"
+UPDATE_PASSWORD_QUERY = "UPDATE users SET password = %s WHERE id = %s"
+
+DUPLICATE_ENTRY = 1062  # ER_DUP_ENTRY: otro registro con el mismo email/username ganó la carrera
 
-def verify_password(password: str, hashed_password: str) -> bool:
-    """Verifica una contraseña contra su hash"""
-    return bcrypt.checkpw(password.encode('utf-8'), hashed_password.encode('utf-8'))
+# Tokens ya verificados (clave: sha256 del token) y perfiles de usuario para /auth/verify
+token_cache = TTLCache(TOKEN_CACHE_SIZE, TOKEN_CACHE_TTL)
+user_cache = TTLCache(USER_CACHE_SIZE, USER_CACHE_TTL)
 
 def create_access_token(user_id: int, email: str) -> str:
     """Crea un token JWT"""
@@ -30,16 +43,55 @@ def create_access_token(user_id: int, email: str) -> str:
     token = jwt.encode(payload, SECRET_KEY, algorithm=ALGORITHM)
     return token
 
+def _token_key(token: str) -> bytes:
+    return hashlib.sha256(token.encode('utf-8')).digest()
+
 def verify_token(token: str) -> dict:
-    """Verifica y decodifica un token JWT"""
+    """Verifica y decodifica un token JWT.
+
+    Los tokens válidos se guardan en token_cache hasta su `exp` (o TOKEN_CACHE_TTL),
+    así las peticiones siguientes evitan la verificación HMAC y el parseo.
+    La caché no alarga la validez de nada: sin ella el JWT también se acepta
+    hasta su `exp`, porque la API no tiene lista de revocación ni logout. El
+    perfil de /auth/verify (user_cache) puede ir hasta USER_CACHE_TTL
+    segundos por detrás de la tabla users (p. ej. un usuario borrado).
+    El payload devuelto es compartido: no modificarlo.
+    """
+    start = perf_counter()
+    key = _token_key(token)
+    payload = token_cache.get(key)
+    if payload is not None:
+        JWT_SECONDS.observe(perf_counter() - start, "hit")
+        return payload
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        token_cache.set(key, payload, expires_at=payload.get("exp"))
+        JWT_SECONDS.observe(perf_counter() - start, "miss")
         return payload
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token expirado")
     except jwt.InvalidTokenError:
         raise HTTPException(status_code=401, detail="Token inválido")
 
+def invalidate_user(user_id: int):
+    """Quita de las cachés los tokens y el perfil de un usuario (p. ej. al cambiar la contraseña).
+
+    Solo afecta a las cachés: un JWT sigue siendo válido hasta su `exp`.
+    """
+    token_cache.discard_if(lambda key, payload: payload.get("user_id") == user_id)
+    user_cache.pop(user_id)
+
+def get_auth_cache_stats() -> dict:
+    return {"tokens": token_cache.stats(), "users": user_cache.stats()}
+
+def format_user_profile(user: dict) -> dict:
+    return {
+        "id": user['id'],
+        "email": user['email'],
+        "username": user['username'],
+        "created_at": format_datetime(user.get('created_at'))
+    }
+
 def format_datetime(dt):
     """Convierte datetime a string ISO de forma segura"""
     if dt is None:
@@ -50,42 +102,76 @@ def format_datetime(dt):
         return dt
     return str(dt)
 
-def register_user_route(user: UserCreate) -> UserResponse:
-    """Registra un nuevo usuario"""
+def rehash_password(user_id: int, password: str):
+    """Actualiza el hash de la contraseña al coste configurado (best-effort)"""
     try:
-        connection = get_db_connection()
-        cursor = connection.cursor(dictionary=True)
-        
-        # Verificar si el email ya existe
-        cursor.execute("SELECT id FROM users WHERE email = %s", (user.email,))
-        if cursor.fetchone():
+        new_hash = hash_password(password)
+        with db_connection() as connection:
+            cursor = connection.cursor()
+            cursor.execute(UPDATE_PASSWORD_QUERY, (new_hash, user_id))
+            connection.commit()
             cursor.close()
-            connection.close()
-            raise HTTPException(status_code=400, detail="El email ya está registrado")
-        
-        # Verificar si el username ya existe
-        cursor.execute("SELECT id FROM users WHERE username = %s", (user.username,))
-        if cursor.fetchone():
+        invalidate_user(user_id)
+    except HashingBusyError:
+        pass  # se reintentará en el próximo login
+    except Exception as e:
+        # Best-effort: PoolTimeoutError y compañía no deben convertir un login válido en error
+        logger.warning("No se pudo re-hashear la contraseña de user_id %s: %s", user_id, e)
+
+def duplicate_user_error(message: str) -> HTTPException:
+    """400 de registro duplicado a partir del mensaje de ER_DUP_ENTRY (clave users.email o users.username)"""
+    if "username" in message:
+        return HTTPException(status_code=400, detail="El nombre de usuario ya existe")
+    return HTTPException(status_code=400, detail="El email ya está registrado")
+
+def register_user_route(user: UserCreate) -> UserResponse:
+    """Registra un nuevo usuario.
+
+    Los duplicados se rechazan antes de hashear: un registro repetido no paga
+    bcrypt ni ocupa el pool de hashing. El hash se calcula sin conexión
+    prestada, y si otro registro con el mismo email o username entra entre
+    la comprobación y el INSERT, la clave UNIQUE lo rechaza (400).
+    """
+    try:
+        with db_connection() as connection:
+            cursor = connection.cursor(dictionary=True)
+            
+            # Verificar si el email ya existe
+            cursor.execute(USER_ID_BY_EMAIL_QUERY, (user.email,))
+            if cursor.fetchone():
+                cursor.close()
+                raise HTTPException(status_code=400, detail="El email ya está registrado")
+            
+            # Verificar si el username ya existe
+            cursor.execute(USER_ID_BY_USERNAME_QUERY, (user.username,))
+            if cursor.fetchone():
+                cursor.close()
+                raise HTTPException(status_code=400, detail="El nombre de usuario ya existe")
             cursor.close()
-            connection.close()
-            raise HTTPException(status_code=400, detail="El nombre de usuario ya existe")
         
-        # Hashear contraseña
         hashed_password = hash_password(user.password)
         
-        # Insertar nuevo usuario
-        cursor.execute(
-            "INSERT INTO users (email, username, password) VALUES (%s, %s, %s)",
-            (user.email, user.username, hashed_password)
-        )
-        connection.commit()
-        user_id = cursor.lastrowid
-        
-        # Obtener el usuario creado
-        cursor.execute("SELECT id, email, username, created_at FROM users WHERE id = %s", (user_id,))
-        new_user = cursor.fetchone()
-        cursor.close()
-        connection.close()
+        with db_connection() as connection:
+            cursor = connection.cursor(dictionary=True)
+            
+            # Insertar nuevo usuario
+            try:
+                cursor.execute(
+                    INSERT_USER_QUERY,
+                    (user.email, user.username, hashed_password)
+                )
+            except Error as e:
+                cursor.close()
+                if e.errno == DUPLICATE_ENTRY:
+                    raise duplicate_user_error(e.msg)
+                raise
+            connection.commit()
+            user_id = cursor.lastrowid
+            
+            # Obtener el usuario creado
+            cursor.execute(USER_PROFILE_QUERY, (user_id,))
+            new_user = cursor.fetchone()
+            cursor.close()
         
         # Crear token
         token = create_access_token(new_user['id'], new_user['email'])
@@ -105,18 +191,21 @@ def register_user_route(user: UserCreate) -> UserResponse:
 def login_user_route(user: UserLogin) -> UserResponse:
     """Autentica un usuario y retorna un token"""
     try:
-        connection = get_db_connection()
-        cursor = connection.cursor(dictionary=True)
-        
-        # Buscar usuario por email
-        cursor.execute("SELECT id, email, username, password, created_at FROM users WHERE email = %s", (user.email,))
-        db_user = cursor.fetchone()
-        cursor.close()
-        connection.close()
+        with db_connection() as connection:
+            cursor = connection.cursor(dictionary=True)
+            
+            # Buscar usuario por email
+            cursor.execute(USER_LOGIN_QUERY, (user.email,))
+            db_user = cursor.fetchone()
+            cursor.close()
         
         if not db_user or not verify_password(user.password, db_user['password']):
             raise HTTPException(status_code=401, detail="Email o contraseña incorrectos")
         
+        # Re-hashear si el hash guardado usa un coste distinto al configurado
+        if needs_rehash(db_user['password']):
+            rehash_password(db_user['id'], user.password)
+        
         # Crear token
         token = create_access_token(db_user['id'], db_user['email'])
         
@@ -136,22 +225,22 @@ def verify_user_token_route(token: str) -> dict:
     """Verifica si un token es válido"""
     try:
         payload = verify_token(token)
-        connection = get_db_connection()
-        cursor = connection.cursor(dictionary=True)
-        cursor.execute("SELECT id, email, username, created_at FROM users WHERE id = %s", (payload['user_id'],))
-        user = cursor.fetchone()
-        cursor.close()
-        connection.close()
+        profile = user_cache.get(payload['user_id'])
+        if profile is not None:
+            return profile
+        
+        with db_connection() as connection:
+            cursor = connection.cursor(dictionary=True)
+            cursor.execute(USER_PROFILE_QUERY, (payload['user_id'],))
+            user = cursor.fetchone()
+            cursor.close()
         
         if not user:
             raise HTTPException(status_code=401, detail="Usuario no encontrado")
         
-        return {
-            "id": user['id'],
-            "email": user['email'],
-            "username": user['username'],
-            "created_at": format_datetime(user.get('created_at'))
-        }
+        profile = format_user_profile(user)
+        user_cache.set(user['id'], profile)
+        return profile
     except HTTPException:
         raise
     except Error as e:
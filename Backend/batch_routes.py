@@ -0,0 +1,293 @@
+"""Operaciones por lote sobre tareas: POST /tasks/batch.
+
+Un lote mezcla creaciones, actualizaciones y borrados (más el atajo
+`complete`) y se ejecuta en una sola conexión y transacción agrupando las
+operaciones en sentencias multi-fila:
+
+- creaciones: INSERT ... VALUES (...), (...) en trozos de BATCH_INSERT_CHUNK
+  (los ids de cada INSERT son consecutivos, ver _insert_creates)
+- actualizaciones y `complete`: primero se fusionan por tarea en el orden
+  de la petición (gana el último valor de cada campo) y después las tareas
+  que acaban con los mismos campos/valores van en un UPDATE ... WHERE id IN (...)
+- borrados: un único DELETE ... WHERE id IN (...)
+
+Agrupar no cambia el resultado respecto a aplicar las operaciones en orden:
+las creaciones no pueden referirse a otras operaciones del lote, cada tarea
+recibe un solo UPDATE con su estado final y nada puede seguir a un borrado
+de la misma tarea (_validate lo rechaza).
+
+Con atomic=True cualquier error revierte el lote completo; con atomic=False
+cada sentencia va protegida por un SAVEPOINT y solo fallan sus elementos.
+"""
+from fastapi import HTTPException
+from models import TaskUpdate, BatchRequest
+from database import db_connection
+from routes import build_update_assignments, restore_archived_tasks
+from serialization import task_row
+from config import BATCH_MAX_OPERATIONS, BATCH_INSERT_CHUNK
+from mysql.connector import Error
+from datetime import date
+import logging
+import task_events
+
+logger = logging.getLogger(__name__)
+
+PRIORITIES = ("low", "medium", "high")  # ENUM de tasks.priority
+
+
+def _in_clause(ids) -> str:
+    return ", ".join(["%s"] * len(ids))
+
+
+def normalize_batch(request: BatchRequest) -> list:
+    """Convierte la petición en una lista de operaciones con índice"""
+    operations = [
+        {"index": i, "op": item.op, "id": item.id, "data": item.data}
+        for i, item in enumerate(request.operations)
+    ]
+    offset = len(operations)
+    operations.extend(
+        {"index": offset + i, "op": "complete", "id": task_id, "data": None}
+        for i, task_id in enumerate(request.complete)
+    )
+    return operations
+
+
+def validate_task_data(op: str, data) -> str:
+    """Error de los datos de una creación o actualización que MySQL rechazaría (None si son válidos)"""
+    if op == "create" and (data is None or not data.title):
+        return "El título es obligatorio"
+    if data is None:
+        return None
+    if data.priority is not None and data.priority not in PRIORITIES:
+        return f"Prioridad inválida: {data.priority}"
+    if data.due_date is not None:
+        try:
+            date.fromisoformat(data.due_date)
+        except ValueError:
+            return f"Fecha inválida: {data.due_date}"
+    return None
+
+
+def _validate(cursor, user_id: int, operations: list, errors: dict):
+    """Valida las operaciones y comprueba la propiedad de las tareas en una sola consulta (más el archivo si faltan)"""
+    referenced = set()
+    for op in operations:
+        error = validate_task_data(op["op"], op["data"]) if op["op"] in ("create", "update") else None
+        if error is not None:
+            errors[op["index"]] = error
+        elif op["op"] == "create":
+            continue
+        elif op["id"] is None:
+            errors[op["index"]] = "Falta el id de la tarea"
+        else:
+            referenced.add(op["id"])
+    
+    owned = set()
+    if referenced:
+        ids = sorted(referenced)
+        cursor.execute(
+            f"SELECT id FROM tasks WHERE user_id = %s AND id IN ({_in_clause(ids)}) FOR UPDATE",
+            (user_id, *ids)
+        )
+        owned = {row["id"] for row in cursor.fetchall()}
+        # Las tareas archivadas vuelven a tasks para poder modificarlas
+        owned |= restore_archived_tasks(cursor, user_id, referenced - owned)
+    
+    deleted = set()
+    for op in operations:
+        if op["index"] in errors or op["op"] == "create":
+            continue
+        if op["id"] not in owned:
+            errors[op["index"]] = "Tarea no encontrada"
+        elif op["id"] in deleted:
+            errors[op["index"]] = "La tarea se elimina antes en este lote"
+        elif op["op"] == "delete":
+            deleted.add(op["id"])
+
+
+def _run_group(cursor, items: list, atomic: bool, errors: dict, statements):
+    """Ejecuta las sentencias de un grupo; en modo best-effort un fallo solo afecta a sus elementos"""
+    if not atomic:
+        cursor.execute("SAVEPOINT batch_group")
+    try:
+        result = statements()
+    except Error as e:
+        if atomic:
+            raise
+        cursor.execute("ROLLBACK TO SAVEPOINT batch_group")
+        for op in items:
+            errors[op["index"]] = str(e)
+        return None
+    if not atomic:
+        cursor.execute("RELEASE SAVEPOINT batch_group")
+    return result
+
+
+INSERT_TASK_QUERY = "INSERT INTO tasks (user_id, title, description, priority, completed, due_date) VALUES "
+INSERT_TASK_ROW = "(%s, %s, %s, %s, %s, %s)"
+
+def _insert_creates(cursor, user_id: int, creates: list):
+    """Inserta las creaciones en INSERT multi-fila y asigna su id a cada operación.
+
+    Un INSERT ... VALUES con todas sus filas es un "simple insert" para
+    InnoDB: conoce de antemano cuántos ids necesita y los reserva
+    consecutivos con cualquier innodb_autoinc_lock_mode (también el 2, el de
+    MySQL 8). Solo los "bulk inserts" (INSERT ... SELECT, LOAD DATA) pueden
+    intercalarse con otros. lastrowid es el id de la primera fila.
+    """
+    rows = [(user_id, op["data"].title, op["data"].description, op["data"].priority or "medium",
+             bool(op["data"].completed), op["data"].due_date) for op in creates]
+    for start in range(0, len(creates), BATCH_INSERT_CHUNK):
+        chunk = rows[start:start + BATCH_INSERT_CHUNK]
+        cursor.execute(INSERT_TASK_QUERY + ", ".join([INSERT_TASK_ROW] * len(chunk)),
+                       tuple(value for row in chunk for value in row))
+        first_id = cursor.lastrowid
+        for offset, op in enumerate(creates[start:start + BATCH_INSERT_CHUNK]):
+            op["id"] = first_id + offset
+
+
+def merge_updates(previous: TaskUpdate, update: TaskUpdate) -> TaskUpdate:
+    """Fusiona dos actualizaciones de la misma tarea: los campos enviados en la segunda ganan"""
+    return previous.model_copy(update=update.model_dump(exclude_none=True))
+
+
+def merge_task_writes(operations: list) -> list:
+    """[(TaskUpdate final, operaciones)] por tarea: updates y completes fusionados en orden de petición"""
+    merged = {}
+    for op in operations:
+        if op["op"] == "update":
+            data = op["data"] or TaskUpdate()
+        elif op["op"] == "complete":
+            data = TaskUpdate(completed=True)
+        else:
+            continue
+        if op["id"] in merged:
+            previous, items = merged[op["id"]]
+            merged[op["id"]] = (merge_updates(previous, data), items + [op])
+        else:
+            merged[op["id"]] = (data, [op])
+    return list(merged.values())
+
+
+def _group_updates(merged: list) -> dict:
+    """Agrupa las tareas cuyo estado final asigna exactamente los mismos campos y valores"""
+    groups = {}
+    for data, items in merged:
+        fields, params = build_update_assignments(data)
+        if not fields:
+            continue
+        key = (tuple(fields), tuple(params))
+        groups.setdefault(key, []).extend(items)
+    return groups
+
+
+def apply_batch(cursor, user_id: int, operations: list, atomic: bool = True) -> dict:
+    """Aplica las operaciones dentro de la transacción abierta en `cursor`.
+
+    No hace commit ni rollback: devuelve {índice: error} y el llamador decide.
+    Las operaciones creadas reciben su id en op["id"].
+    """
+    errors = {}
+    _validate(cursor, user_id, operations, errors)
+    if atomic and errors:
+        return errors
+    
+    valid = [op for op in operations if op["index"] not in errors]
+    creates = [op for op in valid if op["op"] == "create"]
+    deletes = [op for op in valid if op["op"] == "delete"]
+    
+    if creates:
+        _run_group(cursor, creates, atomic, errors, lambda: _insert_creates(cursor, user_id, creates))
+    
+    for (fields, params), items in _group_updates(merge_task_writes(valid)).items():
+        ids = sorted({op["id"] for op in items})
+        query = (f"UPDATE tasks SET {', '.join(fields)}, updated_at = CURRENT_TIMESTAMP "
+                 f"WHERE user_id = %s AND id IN ({_in_clause(ids)})")
+        _run_group(cursor, items, atomic, errors,
+                   lambda q=query, p=(*params, user_id, *ids): cursor.execute(q, p))
+    
+    if deletes:
+        ids = [op["id"] for op in deletes]
+        query = f"DELETE FROM tasks WHERE user_id = %s AND id IN ({_in_clause(ids)})"
+        _run_group(cursor, deletes, atomic, errors, lambda: cursor.execute(query, (user_id, *ids)))
+    
+    return errors
+
+
+def fetch_batch_tasks(cursor, user_id: int, operations: list, errors: dict) -> dict:
+    """Lee en una sola consulta las tareas creadas/actualizadas para devolverlas"""
+    ids = sorted({op["id"] for op in operations
+                  if op["op"] != "delete" and op["index"] not in errors and op["id"] is not None})
+    if not ids:
+        return {}
+    cursor.execute(f"SELECT * FROM tasks WHERE user_id = %s AND id IN ({_in_clause(ids)})", (user_id, *ids))
+    return {row["id"]: task_row(row) for row in cursor.fetchall()}
+
+
+def build_batch_events(operations: list, errors: dict, tasks: dict) -> list:
+    """Eventos de task_events para las operaciones aplicadas de un lote confirmado"""
+    events = []
+    for op in operations:
+        if op["index"] in errors:
+            continue
+        if op["op"] == "delete":
+            events.append(task_events.deleted(op["id"]))
+        elif op["id"] in tasks:
+            make_event = task_events.created if op["op"] == "create" else task_events.updated
+            events.append(make_event(tasks[op["id"]]))
+    return events
+
+
+def build_batch_results(operations: list, errors: dict, tasks: dict, committed: bool) -> list:
+    """Resultado por operación con la forma de BatchItemResult (sin revalidar las filas)"""
+    results = []
+    for op in operations:
+        if op["index"] in errors:
+            status, error = "error", errors[op["index"]]
+        elif not committed:
+            status, error = "skipped", None
+        else:
+            status, error = "ok", None
+        results.append({
+            "index": op["index"],
+            "op": op["op"],
+            "id": op["id"] if committed or op["op"] != "create" else None,
+            "status": status,
+            "error": error,
+            "task": tasks.get(op["id"]) if status == "ok" and op["op"] != "delete" else None,
+        })
+    return results
+
+
+def batch_tasks_route(user_id: int, request: BatchRequest) -> dict:
+    """Ejecuta un lote de operaciones de tareas en una sola transacción"""
+    operations = normalize_batch(request)
+    if len(operations) > BATCH_MAX_OPERATIONS:
+        raise HTTPException(status_code=413, detail=f"Máximo {BATCH_MAX_OPERATIONS} operaciones por lote")
+    if not operations:
+        return {"committed": True, "results": []}
+    
+    try:
+        logger.info("📦 Lote de %d operaciones", len(operations), extra={"user_id": user_id})
+        with db_connection() as connection:
+            cursor = connection.cursor(dictionary=True)
+            try:
+                errors = apply_batch(cursor, user_id, operations, request.atomic)
+                committed = not (request.atomic and errors)
+                if committed:
+                    tasks = fetch_batch_tasks(cursor, user_id, operations, errors)
+                    connection.commit()
+                    task_events.tasks_changed(user_id, build_batch_events(operations, errors, tasks))
+                else:
+                    tasks = {}
+                    connection.rollback()
+            finally:
+                cursor.close()
+        
+        return {"committed": committed, "results": build_batch_results(operations, errors, tasks, committed)}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("❌ Error en batch_tasks_route: %s", e)
+        raise HTTPException(status_code=500, detail=f"Error al procesar el lote: {str(e)}")
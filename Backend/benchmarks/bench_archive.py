@@ -0,0 +1,225 @@
+"""Latencia de GET /tasks de una cuenta con mucho historial, antes y después de archivar.
+
+Siembra en el MySQL de .env un usuario con --tasks tareas (1M por defecto):
+--live tareas vivas recientes (una de cada cuatro completada) y el resto
+completadas hace entre ARCHIVE_AFTER_DAYS y --years años, con INSERT
+multi-fila. Levanta `uvicorn main:app` sin caché de listados
+(TASK_CACHE_BACKEND=none) y mide p50/p95 de cada consulta:
+
+- lista completa: GET /tasks sin limit (lo que pide el frontend)
+- primera página, pendientes, completadas, alta prioridad: páginas de 50
+- con archivo: la primera página con include_archived=true (solo después)
+
+Después lanza archive.archive_completed (sin pausa entre lotes; el tiempo
+y las tareas por segundo también se muestran) y repite las medidas.
+
+    python benchmarks/bench_archive.py --tasks 1000000 --output archive.json
+
+El usuario sembrado se borra al terminar, con sus tareas, salvo con --keep.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from archive import archive_completed  # noqa: E402
+from auth_routes import create_access_token  # noqa: E402
+from config import ARCHIVE_AFTER_DAYS  # noqa: E402
+from database import _create_connection  # noqa: E402
+from common import run_server, percentile  # noqa: E402
+
+INSERT_CHUNK = 5000    # filas por INSERT multi-fila
+COMMIT_EVERY = 50000
+DELETE_CHUNK = 10000
+WORDS = ("informe", "reunión", "compra", "revisar", "llamar", "factura", "viaje", "correo")
+PRIORITIES = ("low", "medium", "high")
+
+QUERIES = {
+    "lista completa": "/tasks",
+    "primera página": "/tasks?limit=50",
+    "pendientes": "/tasks?completed=false&limit=50",
+    "completadas": "/tasks?completed=true&limit=50",
+    "alta prioridad": "/tasks?priority=high&limit=50",
+}
+ARCHIVED_QUERIES = {
+    "con archivo": "/tasks?include_archived=true&limit=50",
+    "con archivo, completadas": "/tasks?include_archived=true&completed=true&limit=50",
+}
+
+
+# ===== SIEMBRA =====
+
+def seed(total: int, live: int, years: float) -> dict:
+    """Crea el usuario y sus tareas; retorna {"id", "email"}"""
+    suffix = uuid.uuid4().hex[:12]
+    email = f"archive_{suffix}@example.com"
+    connection = _create_connection()
+    cursor = connection.cursor()
+    try:
+        cursor.execute("INSERT INTO users (email, username, password) VALUES (%s, %s, %s)",
+                       (email, f"archive_{suffix}", "x"))
+        user_id = cursor.lastrowid
+        now = datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0)
+        newest_old = now - timedelta(days=ARCHIVE_AFTER_DAYS + 1)
+        span = max(1.0, years * 365 * 86400 - (ARCHIVE_AFTER_DAYS + 1) * 86400)
+        old = total - live
+        rows = []
+        inserted = 0
+        for i in range(total):
+            if i < old:
+                # Historial: completadas, de la más antigua a la más reciente
+                created = newest_old - timedelta(seconds=span * (old - i) / old)
+                updated = created + timedelta(hours=random.randint(0, 48))
+                updated = min(updated, newest_old)
+                completed = True
+            else:
+                created = now - timedelta(minutes=random.randint(1, 30 * 24 * 60))
+                updated = created
+                completed = i % 4 == 0
+            rows.append((user_id, f"{random.choice(WORDS).capitalize()} {i}", " ".join(random.choices(WORDS, k=6)),
+                         completed, PRIORITIES[i % 3], created, updated))
+            if len(rows) >= INSERT_CHUNK:
+                inserted += _insert_tasks(cursor, rows)
+                if inserted % COMMIT_EVERY == 0:
+                    connection.commit()
+        inserted += _insert_tasks(cursor, rows)
+        connection.commit()
+        cursor.execute("ANALYZE TABLE tasks")
+        cursor.fetchall()
+        return {"id": user_id, "email": email}
+    finally:
+        cursor.close()
+        connection.close()
+
+
+def _insert_tasks(cursor, rows: list) -> int:
+    count = len(rows)
+    if rows:
+        # executemany de mysql-connector convierte el INSERT en uno solo multi-fila
+        cursor.executemany(
+            "INSERT INTO tasks (user_id, title, description, completed, priority, created_at, updated_at) "
+            "VALUES (%s, %s, %s, %s, %s, %s, %s)",
+            rows
+        )
+        rows.clear()
+    return count
+
+
+def cleanup(user_id: int):
+    """Borra las tareas por trozos y después el usuario (cascada a contadores y lápidas)"""
+    connection = _create_connection()
+    cursor = connection.cursor()
+    try:
+        # Con @task_archiving los triggers no escriben un millón de lápidas que se borrarían igual
+        cursor.execute("SET @task_archiving = 1")
+        for table in ("tasks", "tasks_archive"):
+            while True:
+                cursor.execute(f"DELETE FROM {table} WHERE user_id = %s LIMIT %s", (user_id, DELETE_CHUNK))
+                connection.commit()
+                if cursor.rowcount < DELETE_CHUNK:
+                    break
+        cursor.execute("DELETE FROM users WHERE id = %s", (user_id,))
+        connection.commit()
+    finally:
+        cursor.close()
+        connection.close()
+
+
+# ===== MEDIDAS =====
+
+def measure(base_url: str, headers: dict, queries: dict, repeat: int, full_repeat: int, timeout: float) -> dict:
+    """p50/p95 en ms, filas y bytes de cada consulta (peticiones secuenciales)"""
+    results = {}
+    with httpx.Client(base_url=base_url, headers=headers, timeout=timeout) as client:
+        for name, path in queries.items():
+            count = full_repeat if "limit=" not in path else repeat
+            client.get(path).raise_for_status()  # calentamiento (buffer pool, planes)
+            timings = []
+            for _ in range(count):
+                start = time.perf_counter()
+                response = client.get(path)
+                timings.append(time.perf_counter() - start)
+                response.raise_for_status()
+            results[name] = {
+                "p50_ms": round(percentile(timings, 50) * 1000, 2),
+                "p95_ms": round(percentile(timings, 95) * 1000, 2),
+                "rows": len(response.json()),
+                "bytes": len(response.content),
+            }
+            print(f"  {name:<26}{results[name]['p50_ms']:>12.2f}{results[name]['p95_ms']:>12.2f}"
+                  f"{results[name]['rows']:>12,}{results[name]['bytes']:>16,}")
+    return results
+
+
+def print_header(title: str):
+    print(f"\n{title}")
+    print(f"  {'consulta':<26}{'p50 ms':>12}{'p95 ms':>12}{'filas':>12}{'bytes':>16}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, default=1_000_000, help="tareas totales de la cuenta")
+    parser.add_argument("--live", type=int, default=500, help="tareas recientes que no se archivan")
+    parser.add_argument("--years", type=float, default=5.0, help="antigüedad de la tarea más antigua")
+    parser.add_argument("--repeat", type=int, default=50, help="peticiones por consulta paginada")
+    parser.add_argument("--full-repeat", type=int, default=3, help="peticiones de la lista completa")
+    parser.add_argument("--batch-size", type=int, default=None, help="ARCHIVE_BATCH_SIZE del archivado")
+    parser.add_argument("--timeout", type=float, default=600.0)
+    parser.add_argument("--port", type=int, default=8768)
+    parser.add_argument("--output", default=None)
+    parser.add_argument("--keep", action="store_true", help="no borrar el usuario sembrado")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    if args.live >= args.tasks:
+        parser.error("--live debe ser menor que --tasks")
+
+    random.seed(args.seed)
+    start = time.perf_counter()
+    user = seed(args.tasks, args.live, args.years)
+    print(f"Sembradas {args.tasks:,} tareas ({args.live:,} vivas) en {time.perf_counter() - start:.1f}s "
+          f"(user_id {user['id']})")
+
+    headers = {"Authorization": f"Bearer {create_access_token(user['id'], user['email'])}"}
+    env = {"LOG_LEVEL": "WARNING", "TASK_CACHE_BACKEND": "none", "ARCHIVE_INTERVAL": "0"}
+    results = {"config": vars(args)}
+    try:
+        with run_server(args.port, env) as base_url:
+            print_header("Antes de archivar")
+            results["before"] = measure(base_url, headers, QUERIES, args.repeat, args.full_repeat, args.timeout)
+
+            start = time.perf_counter()
+            batch = {"batch_size": args.batch_size} if args.batch_size else {}
+            archived = archive_completed(pause=0, **batch)
+            elapsed = time.perf_counter() - start
+            results["archive"] = {"tasks": archived, "seconds": round(elapsed, 2),
+                                  "tasks_per_second": round(archived / elapsed) if elapsed else 0}
+            print(f"\nArchivadas {archived:,} tareas en {elapsed:.1f}s ({results['archive']['tasks_per_second']:,}/s)")
+
+            print_header("Después de archivar")
+            results["after"] = measure(base_url, headers, {**QUERIES, **ARCHIVED_QUERIES},
+                                       args.repeat, args.full_repeat, args.timeout)
+    finally:
+        if not args.keep:
+            cleanup(user["id"])
+
+    print("\nMejora de p50 (antes / después)")
+    for name in QUERIES:
+        before, after = results["before"][name]["p50_ms"], results["after"][name]["p50_ms"]
+        print(f"  {name:<26}{before / after if after else 0:>10.1f}x")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        print(f"\nResultados guardados en {args.output}")
+
+
+if __name__ == "__main__":
+    main()
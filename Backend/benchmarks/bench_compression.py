@@ -0,0 +1,107 @@
+"""Bytes enviados y coste de CPU de comprimir respuestas de GET /tasks.
+
+Genera listados de N tareas con textos variados, los serializa como la API
+(serialization.dumps) y, para cada codificación disponible (gzip siempre;
+br y zstd si están instalados `brotli` / `zstandard`) y varios niveles,
+mide el tamaño comprimido y los microsegundos de CPU por respuesta. La
+columna "ms a 10 Mbit/s" estima el tiempo de transferencia del cuerpo.
+
+No necesita MySQL. Con --output guarda los resultados en JSON.
+
+    python benchmarks/bench_compression.py --sizes 10,100,1000,10000
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from response_compression import BrotliEncoder, GzipEncoder, ZstdEncoder  # noqa: E402
+from serialization import dumps, task_row  # noqa: E402
+
+WORDS = ("revisar", "informe", "llamar", "cliente", "comprar", "pan", "preparar", "reunión", "enviar",
+         "factura", "actualizar", "documentación", "pagar", "alquiler", "estudiar", "examen", "lunes",
+         "proyecto", "correo", "equipo", "presupuesto", "médico", "cita", "entrega", "código")
+LEVELS = {"gzip": (1, 5, 6, 9), "br": (1, 4, 6, 11), "zstd": (1, 3, 9, 19)}
+ENCODERS = {"gzip": GzipEncoder, "br": BrotliEncoder, "zstd": ZstdEncoder}
+BANDWIDTH = 10_000_000 / 8  # bytes por segundo a 10 Mbit/s
+
+
+def make_tasks(count: int) -> list:
+    now = datetime(2025, 1, 1, 12, 0, 0)
+    rows = []
+    for i in range(count):
+        created = now - timedelta(minutes=i * 7)
+        rows.append(task_row({
+            "id": i + 1,
+            "user_id": 1,
+            "title": " ".join(random.choices(WORDS, k=random.randint(2, 6))).capitalize(),
+            "description": " ".join(random.choices(WORDS, k=random.randint(0, 30))) or None,
+            "completed": random.random() < 0.4,
+            "priority": random.choice(("low", "medium", "high")),
+            "due_date": (created + timedelta(days=random.randint(1, 30))).date() if random.random() < 0.6 else None,
+            "created_at": created,
+            "updated_at": created + timedelta(minutes=random.randint(0, 600)),
+        }))
+    return rows
+
+
+def cpu_us(fn, data: bytes, repeat: int) -> float:
+    """Mediana de microsegundos de CPU (process_time) por llamada"""
+    number = max(1, 200_000 // max(1, len(data)))
+    samples = []
+    for _ in range(repeat):
+        start = time.process_time()
+        for _ in range(number):
+            fn(data)
+        samples.append((time.process_time() - start) / number * 1e6)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10,100,1000,10000", help="número de tareas por respuesta")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    encoders = {}
+    for name, cls in ENCODERS.items():
+        for level in LEVELS[name]:
+            try:
+                encoders[f"{name}-{level}"] = cls(level)
+            except ImportError:
+                break
+    missing = sorted(set(ENCODERS) - {key.split("-")[0] for key in encoders})
+    if missing:
+        print(f"(no instalados: {', '.join(missing)})")
+
+    results = {}
+    for size in (int(value) for value in args.sizes.split(",") if value.strip()):
+        body = dumps(make_tasks(size))
+        results[size] = {"identity": {"bytes": len(body), "ratio": 1.0, "cpu_us": 0.0}}
+        print(f"\n{size} tareas: {len(body):,} bytes sin comprimir "
+              f"({len(body) / BANDWIDTH * 1000:.1f} ms a 10 Mbit/s)")
+        print(f"{'codificación':<14}{'bytes':>12}{'ratio':>8}{'CPU µs':>12}{'µs/KB':>8}{'ms a 10 Mbit/s':>16}")
+        for key, encoder in encoders.items():
+            compressed = encoder.compress(body)
+            cpu = cpu_us(encoder.compress, body, args.repeat)
+            results[size][key] = {"bytes": len(compressed), "ratio": round(len(body) / len(compressed), 2),
+                                  "cpu_us": round(cpu, 1)}
+            print(f"{key:<14}{len(compressed):>12,}{len(body) / len(compressed):>8.1f}{cpu:>12.1f}"
+                  f"{cpu / (len(body) / 1024):>8.2f}{len(compressed) / BANDWIDTH * 1000:>16.2f}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
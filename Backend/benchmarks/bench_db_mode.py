@@ -0,0 +1,74 @@
+"""Compara requests/segundo entre DB_MODE=sync y DB_MODE=async.
+
+Levanta un worker de uvicorn por modo, crea un usuario con algunas tareas y
+lanza N peticiones GET /tasks/{id} con C peticiones en vuelo a la vez.
+"""
+import argparse
+import asyncio
+import json
+import time
+
+import httpx
+
+from common import run_server, register_user, percentile
+
+
+async def drive(base_url, headers, task_ids, total, concurrency):
+    latencies = []
+    errors = 0
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, headers=headers, limits=limits, timeout=60) as client:
+        queue = asyncio.Queue()
+        for i in range(total):
+            queue.put_nowait(task_ids[i % len(task_ids)])
+
+        async def worker():
+            nonlocal errors
+            while not queue.empty():
+                task_id = queue.get_nowait()
+                start = time.perf_counter()
+                response = await client.get(f"/tasks/{task_id}")
+                latencies.append(time.perf_counter() - start)
+                if response.status_code != 200:
+                    errors += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    return {
+        "requests": total,
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "rps": round(total / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+    }
+
+
+def bench_mode(mode, args):
+    with run_server(port=args.port, env={"DB_MODE": mode}) as base_url:
+        headers = register_user(base_url)
+        task_ids = []
+        for i in range(args.tasks):
+            response = httpx.post(base_url + "/tasks", headers=headers, json={"title": f"bench {i}"})
+            response.raise_for_status()
+            task_ids.append(response.json()["id"])
+        # Calentar el pool antes de medir
+        asyncio.run(drive(base_url, headers, task_ids, args.concurrency, args.concurrency))
+        return asyncio.run(drive(base_url, headers, task_ids, args.requests, args.concurrency))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=10000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--tasks", type=int, default=50)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    results = {mode: bench_mode(mode, args) for mode in ("sync", "async")}
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
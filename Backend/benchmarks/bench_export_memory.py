@@ -0,0 +1,86 @@
+"""Comprueba que la exportación en streaming mantiene la memoria plana.
+
+Genera N filas sintéticas (1M por defecto) con la forma de la tabla tasks y
+las pasa por routes.iter_export_chunks lote a lote, igual que hace
+GET /tasks/export con el cursor sin buffer. Muestra el RSS del proceso cada
+100k filas y, para comparar, el RSS al materializar la lista completa como
+hacía GET /tasks con fetchall().
+"""
+import argparse
+import os
+import sys
+from datetime import datetime, date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from routes import iter_export_chunks  # noqa: E402
+
+
+def rss_mb() -> float:
+    """RSS actual del proceso en MB (Linux: /proc/self/statm)"""
+    with open("/proc/self/statm") as statm:
+        pages = int(statm.read().split()[1])
+    return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+
+def synthetic_row(i: int) -> dict:
+    return {
+        "id": i,
+        "user_id": 1,
+        "title": f"Tarea sintética {i}",
+        "description": "Descripción de prueba " * 8,
+        "completed": i % 3 == 0,
+        "priority": ("low", "medium", "high")[i % 3],
+        "due_date": date(2026, 1, 1 + i % 28),
+        "created_at": datetime(2025, 1, 1, 12, 0, 0),
+        "updated_at": datetime(2025, 1, 1, 12, 0, 0),
+    }
+
+
+def bench_streaming(total: int, batch: int, fmt: str):
+    produced = 0
+
+    def fetch_batch():
+        nonlocal produced
+        size = min(batch, total - produced)
+        rows = [synthetic_row(produced + i) for i in range(size)]
+        produced += size
+        return rows
+
+    baseline = rss_mb()
+    written = 0
+    next_report = 100_000
+    samples = []
+    for chunk in iter_export_chunks(iter(fetch_batch, []), fmt):
+        written += len(chunk)  # el socket recibiría el chunk y se libera
+        if produced >= next_report:
+            samples.append((produced, round(rss_mb() - baseline, 1)))
+            next_report += 100_000
+    return baseline, written, samples
+
+
+def bench_materialized(total: int):
+    baseline = rss_mb()
+    rows = [synthetic_row(i) for i in range(total)]
+    growth = rss_mb() - baseline
+    del rows
+    return round(growth, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--batch", type=int, default=1000)
+    parser.add_argument("--format", choices=("ndjson", "json"), default="ndjson")
+    args = parser.parse_args()
+
+    baseline, written, samples = bench_streaming(args.rows, args.batch, args.format)
+    print(f"RSS base: {baseline:.1f} MB, bytes exportados: {written / (1024 * 1024):.1f} MB")
+    print("filas      crecimiento RSS (MB)")
+    for rows, growth in samples:
+        print(f"{rows:>9}  {growth:>8}")
+    print(f"fetchall() equivalente: +{bench_materialized(args.rows)} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,379 @@
+"""Prueba de carga de la API con mezclas de tráfico realistas.
+
+Siembra directamente en el MySQL de .env U usuarios con T tareas cada uno,
+levanta `uvicorn main:app` (o usa --base-url) y lanza los escenarios
+pedidos, cada uno durante --duration segundos con --users usuarios
+virtuales concurrentes:
+
+- login: tormenta de POST /auth/login (bcrypt en HASH_WORKERS)
+- read: listados, detalle, estadísticas y búsqueda
+- write: ráfagas de creación, edición y borrado
+- mixed: 80 % lecturas, 15 % escrituras, 5 % logins
+
+Por endpoint muestra peticiones, errores (por código), req/s y latencias
+p50/p95/p99; por escenario, las consultas que recibió MySQL (SHOW GLOBAL
+STATUS, así que incluye cualquier otro cliente del mismo servidor) y las
+consultas por petición. Con --output se guarda todo en JSON, y
+`--compare antes.json despues.json` muestra la diferencia entre dos
+ejecuciones:
+
+    python benchmarks/bench_load.py --users 200 --tasks-per-user 100 --output base.json
+    python benchmarks/bench_load.py --scenarios read,write --db-mode async --output async.json
+    python benchmarks/bench_load.py --compare base.json async.json
+
+Los usuarios sembrados (prefijo `load_<id de ejecución>_`) se borran al
+terminar, con sus tareas, salvo con --keep.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+import uuid
+from collections import Counter, defaultdict
+from contextlib import nullcontext
+from datetime import date, datetime, timedelta, timezone
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from auth_routes import create_access_token  # noqa: E402
+from database import _create_connection  # noqa: E402
+from hashing import hash_password  # noqa: E402
+from common import BACKEND_DIR, run_server, percentile  # noqa: E402
+
+PASSWORD = "load-password"
+SEED_CHUNK = 1000
+STATUS_VARIABLES = ("Questions", "Com_select", "Com_insert", "Com_update", "Com_delete")
+SEARCH_WORDS = ("informe", "reunión", "compra", "revisar", "llamar", "factura", "viaje", "correo")
+
+
+# ===== SIEMBRA =====
+
+def seed(users: int, tasks_per_user: int, run_id: str) -> list:
+    """Inserta usuarios y tareas; retorna [{"id", "email", "task_ids"}]"""
+    hashed = hash_password(PASSWORD)  # un solo hash compartido: sembrar no debe costar U bcrypts
+    prefix = f"load_{run_id}_"
+    connection = _create_connection()
+    cursor = connection.cursor()
+    try:
+        for start in range(0, users, SEED_CHUNK):
+            cursor.executemany(
+                "INSERT INTO users (email, username, password) VALUES (%s, %s, %s)",
+                [(f"{prefix}{i}@example.com", f"{prefix}{i}", hashed)
+                 for i in range(start, min(users, start + SEED_CHUNK))]
+            )
+            connection.commit()
+        cursor.execute("SELECT id, email FROM users WHERE username LIKE %s ORDER BY id", (prefix + "%",))
+        seeded = [{"id": user_id, "email": email, "task_ids": []} for user_id, email in cursor.fetchall()]
+
+        today = date.today()
+        rows = []
+        for user in seeded:
+            for i in range(tasks_per_user):
+                rows.append((
+                    user["id"],
+                    f"{random.choice(SEARCH_WORDS).capitalize()} {i}",
+                    " ".join(random.choices(SEARCH_WORDS, k=6)),
+                    i % 4 == 0,
+                    ("low", "medium", "high")[i % 3],
+                    today + timedelta(days=random.randint(-10, 30)) if i % 2 else None,
+                ))
+                if len(rows) >= SEED_CHUNK:
+                    _insert_tasks(cursor, rows)
+                    connection.commit()
+        _insert_tasks(cursor, rows)
+        connection.commit()
+
+        by_user = {user["id"]: user for user in seeded}
+        for start in range(0, len(seeded), SEED_CHUNK):
+            ids = [user["id"] for user in seeded[start:start + SEED_CHUNK]]
+            placeholders = ", ".join(["%s"] * len(ids))
+            cursor.execute(f"SELECT id, user_id FROM tasks WHERE user_id IN ({placeholders})", ids)
+            for task_id, user_id in cursor.fetchall():
+                by_user[user_id]["task_ids"].append(task_id)
+        return seeded
+    finally:
+        cursor.close()
+        connection.close()
+
+
+def _insert_tasks(cursor, rows: list):
+    if rows:
+        cursor.executemany(
+            "INSERT INTO tasks (user_id, title, description, completed, priority, due_date) "
+            "VALUES (%s, %s, %s, %s, %s, %s)",
+            rows
+        )
+        rows.clear()
+
+
+def cleanup(run_id: str):
+    """Borra los usuarios sembrados (sus tareas caen por ON DELETE CASCADE)"""
+    connection = _create_connection()
+    cursor = connection.cursor()
+    try:
+        while True:
+            cursor.execute("DELETE FROM users WHERE username LIKE %s LIMIT %s", (f"load_{run_id}_%", SEED_CHUNK))
+            connection.commit()
+            if cursor.rowcount < SEED_CHUNK:
+                return
+    finally:
+        cursor.close()
+        connection.close()
+
+
+def mysql_status() -> dict:
+    connection = _create_connection()
+    cursor = connection.cursor()
+    try:
+        placeholders = ", ".join(["%s"] * len(STATUS_VARIABLES))
+        cursor.execute(f"SHOW GLOBAL STATUS WHERE Variable_name IN ({placeholders})", STATUS_VARIABLES)
+        return {name: int(value) for name, value in cursor.fetchall()}
+    finally:
+        cursor.close()
+        connection.close()
+
+
+# ===== OPERACIONES =====
+
+class VirtualUser:
+    def __init__(self, user: dict):
+        self.id = user["id"]
+        self.email = user["email"]
+        self.task_ids = list(user["task_ids"])
+        self.created = []
+        self.headers = {"Authorization": f"Bearer {create_access_token(user['id'], user['email'])}"}
+
+    def any_task(self):
+        pool = self.task_ids or self.created
+        return random.choice(pool) if pool else 0
+
+
+async def op_login(client, vu):
+    return "POST /auth/login", await client.post("/auth/login", json={"email": vu.email, "password": PASSWORD})
+
+
+async def op_list(client, vu):
+    params = random.choice(({}, {"completed": "false"}, {"priority": "high"}, {"limit": "50"}))
+    return "GET /tasks", await client.get("/tasks", params=params, headers=vu.headers)
+
+
+async def op_get(client, vu):
+    return "GET /tasks/{id}", await client.get(f"/tasks/{vu.any_task()}", headers=vu.headers)
+
+
+async def op_stats(client, vu):
+    return "GET /tasks/stats", await client.get("/tasks/stats", headers=vu.headers)
+
+
+async def op_search(client, vu):
+    q = random.choice(SEARCH_WORDS)[:random.randint(3, 6)]
+    return "GET /tasks/search", await client.get("/tasks/search", params={"q": q}, headers=vu.headers)
+
+
+async def op_create(client, vu):
+    response = await client.post("/tasks", headers=vu.headers, json={
+        "title": f"{random.choice(SEARCH_WORDS).capitalize()} nueva",
+        "priority": random.choice(("low", "medium", "high")),
+        "due_date": (date.today() + timedelta(days=random.randint(0, 14))).isoformat(),
+    })
+    if response.status_code == 200:
+        vu.created.append(response.json()["id"])
+    return "POST /tasks", response
+
+
+async def op_update(client, vu):
+    body = random.choice(({"completed": True}, {"completed": False}, {"priority": "high"}, {"title": "Editada"}))
+    return "PUT /tasks/{id}", await client.put(f"/tasks/{vu.any_task()}", headers=vu.headers, json=body)
+
+
+async def op_delete(client, vu):
+    if not vu.created:
+        return await op_create(client, vu)
+    return "DELETE /tasks/{id}", await client.delete(f"/tasks/{vu.created.pop()}", headers=vu.headers)
+
+
+SCENARIOS = {
+    "login": [(op_login, 1)],
+    "read": [(op_list, 50), (op_get, 30), (op_stats, 10), (op_search, 10)],
+    "write": [(op_create, 40), (op_update, 40), (op_delete, 20)],
+    "mixed": [(op_list, 40), (op_get, 25), (op_stats, 8), (op_search, 7),
+              (op_create, 7), (op_update, 6), (op_delete, 2), (op_login, 5)],
+}
+
+
+# ===== EJECUCIÓN =====
+
+async def run_scenario(base_url: str, name: str, vus: list, duration: float, timeout: float) -> dict:
+    operations, weights = zip(*SCENARIOS[name])
+    latencies = defaultdict(list)
+    statuses = defaultdict(Counter)
+    limits = httpx.Limits(max_connections=len(vus), max_keepalive_connections=len(vus))
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=timeout) as client:
+        deadline = time.perf_counter() + duration
+
+        async def virtual_user(vu):
+            while time.perf_counter() < deadline:
+                operation = random.choices(operations, weights)[0]
+                start = time.perf_counter()
+                try:
+                    label, response = await operation(client, vu)
+                    status = response.status_code
+                except httpx.HTTPError as e:
+                    label, status = operation.__name__, type(e).__name__
+                latencies[label].append(time.perf_counter() - start)
+                statuses[label][status] += 1
+
+        before = mysql_status()
+        start = time.perf_counter()
+        await asyncio.gather(*(virtual_user(vu) for vu in vus))
+        elapsed = time.perf_counter() - start
+        after = mysql_status()
+
+    endpoints = {}
+    for label, samples in sorted(latencies.items()):
+        errors = sum(count for status, count in statuses[label].items() if not _is_success(status))
+        endpoints[label] = {
+            "requests": len(samples),
+            "errors": errors,
+            "status": {str(status): count for status, count in statuses[label].items()},
+            "rps": round(len(samples) / elapsed, 1),
+            "p50_ms": round(percentile(samples, 50) * 1000, 2),
+            "p95_ms": round(percentile(samples, 95) * 1000, 2),
+            "p99_ms": round(percentile(samples, 99) * 1000, 2),
+        }
+    total = sum(endpoint["requests"] for endpoint in endpoints.values())
+    queries = {name: after[name] - before[name] for name in before}
+    return {
+        "seconds": round(elapsed, 2),
+        "users": len(vus),
+        "requests": total,
+        "errors": sum(endpoint["errors"] for endpoint in endpoints.values()),
+        "rps": round(total / elapsed, 1),
+        "db_queries": queries,
+        "db_queries_per_request": round(queries.get("Questions", 0) / total, 2) if total else 0.0,
+        "endpoints": endpoints,
+    }
+
+
+def _is_success(status) -> bool:
+    return isinstance(status, int) and (200 <= status < 300 or status == 304)
+
+
+def print_scenario(name: str, result: dict):
+    print(f"\n== {name}: {result['requests']} peticiones en {result['seconds']}s, {result['users']} usuarios, "
+          f"{result['rps']} req/s, {result['errors']} errores, "
+          f"{result['db_queries_per_request']} consultas MySQL por petición")
+    print(f"{'endpoint':<22}{'req':>8}{'err':>6}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for label, endpoint in result["endpoints"].items():
+        print(f"{label:<22}{endpoint['requests']:>8}{endpoint['errors']:>6}{endpoint['rps']:>9}"
+              f"{endpoint['p50_ms']:>9}{endpoint['p95_ms']:>9}{endpoint['p99_ms']:>9}")
+
+
+def compare(before_path: str, after_path: str):
+    """Diferencia de req/s y p95 por endpoint entre dos ficheros de --output"""
+    with open(before_path) as f:
+        before = json.load(f)["scenarios"]
+    with open(after_path) as f:
+        after = json.load(f)["scenarios"]
+
+    def change(old, new):
+        return f"{(new - old) / old * 100:+.0f}%" if old else "-"
+
+    for name in (name for name in before if name in after):
+        old, new = before[name], after[name]
+        print(f"\n== {name}: {old['rps']} → {new['rps']} req/s ({change(old['rps'], new['rps'])}), "
+              f"consultas por petición {old['db_queries_per_request']} → {new['db_queries_per_request']}")
+        print(f"{'endpoint':<22}{'req/s':>24}{'p95 ms':>26}")
+        for label, old_endpoint in old["endpoints"].items():
+            new_endpoint = new["endpoints"].get(label)
+            if new_endpoint is None:
+                continue
+            rps = f"{old_endpoint['rps']} → {new_endpoint['rps']} ({change(old_endpoint['rps'], new_endpoint['rps'])})"
+            p95 = (f"{old_endpoint['p95_ms']} → {new_endpoint['p95_ms']} "
+                   f"({change(old_endpoint['p95_ms'], new_endpoint['p95_ms'])})")
+            print(f"{label:<22}{rps:>24}{p95:>26}")
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", default="login,read,write,mixed",
+                        help=f"separados por comas: {', '.join(SCENARIOS)}")
+    parser.add_argument("--users", type=int, default=100, help="usuarios virtuales concurrentes")
+    parser.add_argument("--seed-users", type=int, default=None, help="usuarios sembrados (default: --users)")
+    parser.add_argument("--tasks-per-user", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=30.0, help="segundos por escenario")
+    parser.add_argument("--warmup", type=float, default=3.0, help="segundos de calentamiento sin medir")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--db-mode", choices=("sync", "async"), default=None, help="DB_MODE del servidor")
+    parser.add_argument("--workers", type=int, default=1, help="workers de uvicorn")
+    parser.add_argument("--port", type=int, default=8767)
+    parser.add_argument("--base-url", default=None, help="usar un servidor ya arrancado en lugar de levantar uno")
+    parser.add_argument("--output", default=None, help="guardar los resultados en este JSON")
+    parser.add_argument("--keep", action="store_true", help="no borrar los usuarios sembrados")
+    parser.add_argument("--seed", type=int, default=1, help="semilla de random (mezclas reproducibles)")
+    parser.add_argument("--compare", nargs=2, metavar=("ANTES", "DESPUES"), help="comparar dos --output y salir")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = set(scenarios) - SCENARIOS.keys()
+    if unknown:
+        parser.error(f"escenarios desconocidos: {', '.join(sorted(unknown))}")
+    random.seed(args.seed)
+
+    run_id = uuid.uuid4().hex[:8]
+    seed_users = max(args.seed_users or args.users, 1)
+    start = time.perf_counter()
+    users = seed(seed_users, args.tasks_per_user, run_id)
+    print(f"Sembrados {len(users)} usuarios y {len(users) * args.tasks_per_user} tareas "
+          f"en {time.perf_counter() - start:.1f}s (ejecución {run_id})")
+
+    env = {"LOG_LEVEL": "WARNING"}
+    if args.db_mode:
+        env["DB_MODE"] = args.db_mode
+    server = (nullcontext(args.base_url) if args.base_url
+              else run_server(args.port, env, ("--workers", str(args.workers))))
+    results = {
+        "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git": git_revision(),
+        "config": {key: value for key, value in vars(args).items() if key not in ("compare", "output")},
+        "scenarios": {},
+    }
+    try:
+        with server as base_url:
+            vus = [VirtualUser(users[i % len(users)]) for i in range(args.users)]
+            for name in scenarios:
+                if args.warmup > 0:
+                    asyncio.run(run_scenario(base_url, name, vus, args.warmup, args.timeout))
+                result = asyncio.run(run_scenario(base_url, name, vus, args.duration, args.timeout))
+                results["scenarios"][name] = result
+                print_scenario(name, result)
+    finally:
+        if not args.keep:
+            cleanup(run_id)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        print(f"\nResultados guardados en {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Micro-benchmarks en proceso de las piezas que se ejecutan en cada petición.
+
+- format_datetime (auth_routes) con datetime, str y None
+- Construcción de models.Task: formateando la fila de la BD y validándola
+  (lo que hacían las rutas antes de serialization.task_row), solo
+  validando, y sin validar (model_construct)
+- verify_token: verificación completa del JWT (caché vacía) frente a un
+  acierto de token_cache
+
+No necesita MySQL. Con --output guarda los resultados en JSON.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import timeit
+from datetime import datetime, date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from auth_routes import create_access_token, format_datetime, token_cache, verify_token  # noqa: E402
+from models import Task  # noqa: E402
+
+NOW = datetime(2025, 1, 1, 12, 30, 15)
+NATIVE_ROW = {
+    "id": 1,
+    "user_id": 1,
+    "title": "Tarea de prueba",
+    "description": "Descripción de prueba " * 4,
+    "completed": False,
+    "priority": "medium",
+    "due_date": date(2026, 1, 31),
+    "created_at": NOW,
+    "updated_at": NOW,
+}
+STRING_ROW = dict(NATIVE_ROW, due_date="2026-01-31", created_at=NOW.isoformat(), updated_at=NOW.isoformat())
+
+
+def to_strings(row: dict) -> dict:
+    row = dict(row)
+    for field in ("due_date", "created_at", "updated_at"):
+        row[field] = format_datetime(row[field])
+    return row
+
+
+def bench(fn, number: int, repeat: int) -> dict:
+    """Microsegundos por llamada (mediana y mínimo de `repeat` tandas de `number` llamadas)"""
+    samples = [total / number * 1e6 for total in timeit.repeat(fn, number=number, repeat=repeat)]
+    return {"median_us": round(statistics.median(samples), 3), "min_us": round(min(samples), 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--number", type=int, default=20_000, help="llamadas por tanda")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    token = create_access_token(1, "bench@example.com")
+
+    def verify_uncached():
+        token_cache.clear()
+        verify_token(token)
+
+    def verify_cached():
+        verify_token(token)
+
+    cases = {
+        "format_datetime(datetime)": lambda: format_datetime(NOW),
+        "format_datetime(str)": lambda: format_datetime("2025-01-01T12:30:15"),
+        "format_datetime(None)": lambda: format_datetime(None),
+        "format_datetime + Task(**fila)": lambda: Task(**to_strings(NATIVE_ROW)),
+        "Task(**fila)": lambda: Task(**STRING_ROW),
+        "Task.model_construct(**fila)": lambda: Task.model_construct(**STRING_ROW),
+        "verify_token (sin caché)": verify_uncached,
+        "verify_token (caché)": verify_cached,
+    }
+
+    results = {}
+    print(f"{'caso':<34}{'mediana µs':>12}{'mín µs':>10}")
+    for name, fn in cases.items():
+        results[name] = bench(fn, args.number, args.repeat)
+        print(f"{name:<34}{results[name]['median_us']:>12}{results[name]['min_us']:>10}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Latencia de create/update/delete: secuencia anterior vs. la actual.
+
+Antes: INSERT + COMMIT + SELECT; SELECT + UPDATE + COMMIT + SELECT; SELECT +
+DELETE + COMMIT. Ahora: INSERT + COMMIT; UPDATE + SELECT + COMMIT; DELETE +
+COMMIT (ver routes.py). Ambas variantes usan la misma conexión persistente
+para medir solo el efecto de los viajes de ida y vuelta, contra el MySQL
+configurado en .env.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import _create_connection  # noqa: E402
+from routes import utc_now  # noqa: E402
+from common import percentile  # noqa: E402
+
+
+def legacy_cycle(cursor, connection, user_id, timings):
+    start = time.perf_counter()
+    cursor.execute("INSERT INTO tasks (user_id, title, description, priority, due_date) VALUES (%s, %s, %s, %s, %s)",
+                   (user_id, "bench", None, "medium", None))
+    connection.commit()
+    task_id = cursor.lastrowid
+    cursor.execute("SELECT * FROM tasks WHERE id = %s", (task_id,))
+    cursor.fetchone()
+    timings["create"].append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    cursor.execute("SELECT * FROM tasks WHERE id = %s AND user_id = %s", (task_id, user_id))
+    cursor.fetchone()
+    cursor.execute("UPDATE tasks SET completed = %s, updated_at = CURRENT_TIMESTAMP WHERE id = %s AND user_id = %s",
+                   (True, task_id, user_id))
+    connection.commit()
+    cursor.execute("SELECT * FROM tasks WHERE id = %s", (task_id,))
+    cursor.fetchone()
+    timings["update"].append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    cursor.execute("SELECT * FROM tasks WHERE id = %s AND user_id = %s", (task_id, user_id))
+    cursor.fetchone()
+    cursor.execute("DELETE FROM tasks WHERE id = %s AND user_id = %s", (task_id, user_id))
+    connection.commit()
+    timings["delete"].append(time.perf_counter() - start)
+
+
+def current_cycle(cursor, connection, user_id, timings):
+    start = time.perf_counter()
+    now = utc_now()
+    cursor.execute("INSERT INTO tasks (user_id, title, description, priority, due_date, created_at, updated_at) "
+                   "VALUES (%s, %s, %s, %s, %s, %s, %s)", (user_id, "bench", None, "medium", None, now, now))
+    connection.commit()
+    task_id = cursor.lastrowid
+    timings["create"].append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    cursor.execute("UPDATE tasks SET completed = %s, updated_at = %s WHERE id = %s AND user_id = %s",
+                   (True, utc_now(), task_id, user_id))
+    assert cursor.rowcount == 1
+    cursor.execute("SELECT * FROM tasks WHERE id = %s AND user_id = %s", (task_id, user_id))
+    cursor.fetchone()
+    connection.commit()
+    timings["update"].append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    cursor.execute("DELETE FROM tasks WHERE id = %s AND user_id = %s", (task_id, user_id))
+    assert cursor.rowcount == 1
+    connection.commit()
+    timings["delete"].append(time.perf_counter() - start)
+
+
+def run(cycle, iterations):
+    connection = _create_connection()
+    cursor = connection.cursor(dictionary=True)
+    suffix = uuid.uuid4().hex[:12]
+    cursor.execute("INSERT INTO users (email, username, password) VALUES (%s, %s, %s)",
+                   (f"bench_{suffix}@example.com", f"bench_{suffix}", "x"))
+    connection.commit()
+    user_id = cursor.lastrowid
+    timings = {"create": [], "update": [], "delete": []}
+    try:
+        for _ in range(iterations):
+            cycle(cursor, connection, user_id, timings)
+    finally:
+        cursor.execute("DELETE FROM users WHERE id = %s", (user_id,))
+        connection.commit()
+        cursor.close()
+        connection.close()
+    return {
+        op: {
+            "mean_ms": round(sum(values) / len(values) * 1000, 3),
+            "p50_ms": round(percentile(values, 50) * 1000, 3),
+            "p99_ms": round(percentile(values, 99) * 1000, 3),
+        }
+        for op, values in timings.items()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+    print(json.dumps({
+        "before": run(legacy_cycle, args.iterations),
+        "after": run(current_cycle, args.iterations),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Micro-benchmark de la serialización de GET /tasks.
+
+Compara, para N filas sintéticas (10k por defecto) con la forma de la tabla
+tasks, el camino anterior (format_datetime a string → Task(**fila) →
+jsonable_encoder → json.dumps) con el actual (task_row → serialization.dumps,
+que usa orjson si está instalado). No necesita MySQL.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from models import Task  # noqa: E402
+from serialization import dumps, orjson, task_row  # noqa: E402
+
+
+def synthetic_row(i: int) -> dict:
+    return {
+        "id": i,
+        "user_id": 1,
+        "title": f"Tarea sintética {i}",
+        "description": "Descripción de prueba " * 4,
+        "completed": i % 3 == 0,
+        "priority": ("low", "medium", "high")[i % 3],
+        "due_date": date(2026, 1, 1 + i % 28),
+        "created_at": datetime(2025, 1, 1, 12, 0, i % 60),
+        "updated_at": datetime(2025, 1, 1, 12, 0, i % 60),
+    }
+
+
+def legacy_path(rows: list) -> bytes:
+    """Lo que hacían routes.py y FastAPI antes: formatear, validar y volver a codificar"""
+    tasks = []
+    for row in rows:
+        row = dict(row)
+        row["created_at"] = row["created_at"].isoformat()
+        row["updated_at"] = row["updated_at"].isoformat()
+        row["due_date"] = row["due_date"].isoformat()
+        tasks.append(Task(**row))
+    return json.dumps(jsonable_encoder(tasks), ensure_ascii=False).encode("utf-8")
+
+
+def fast_path(rows: list) -> bytes:
+    return dumps([task_row(dict(row)) for row in rows])
+
+
+def timed(fn, rows: list, repeat: int) -> list:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(rows)
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    rows = [synthetic_row(i) for i in range(args.rows)]
+    assert json.loads(legacy_path(rows)) == json.loads(fast_path(rows)), "las salidas no coinciden"
+
+    print(f"{args.rows} tareas, {args.repeat} repeticiones, encoder: {'orjson' if orjson else 'json'}")
+    print("camino       mediana (ms)   mín (ms)   bytes")
+    for name, fn in (("anterior", legacy_path), ("rápido", fast_path)):
+        samples = timed(fn, rows, args.repeat)
+        print(f"{name:<10} {statistics.median(samples):>12.1f} {min(samples):>10.1f} {len(fn(rows)):>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Mide el coste de N conexiones SSE ociosas (GET /tasks/stream) en un worker.
+
+Levanta un worker de uvicorn, abre N conexiones con sockets asyncio (10k por
+defecto), espera a que todas reciban la cabecera `retry:` y muestra el RSS y
+el número de hilos del servidor antes y después, junto a las conexiones que
+reporta GET /health. El token se firma localmente con SECRET_KEY, así que no
+necesita MySQL.
+
+Con muchas conexiones hace falta subir el límite de descriptores (ulimit -n);
+el script intenta subirlo hasta el máximo permitido.
+"""
+import argparse
+import asyncio
+import os
+import resource
+import sys
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from auth_routes import create_access_token  # noqa: E402
+from common import run_server_process  # noqa: E402
+
+
+def process_usage(pid: int):
+    """(RSS en MB, hilos) de un proceso (Linux: /proc)"""
+    with open(f"/proc/{pid}/status") as status:
+        fields = dict(line.split(":", 1) for line in status)
+    return int(fields["VmRSS"].split()[0]) / 1024, int(fields["Threads"])
+
+
+async def open_stream(port: int, token: str, ready: asyncio.Event, opened: list):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(
+        f"GET /tasks/stream?access_token={token} HTTP/1.1\r\nHost: 127.0.0.1\r\n"
+        "Accept: text/event-stream\r\n\r\n".encode()
+    )
+    await writer.drain()
+    while b"retry:" not in await reader.readline():
+        pass
+    opened.append(writer)
+    await ready.wait()
+    writer.close()
+
+
+async def run(port: int, connections: int, hold: float, base_url: str, pid: int, token: str):
+    before = process_usage(pid)
+    ready = asyncio.Event()
+    opened = []
+    start = time.perf_counter()
+    tasks = [asyncio.create_task(open_stream(port, token, ready, opened)) for _ in range(connections)]
+    while len(opened) < connections:
+        failed = [task for task in tasks if task.done() and task.exception()]
+        if failed:
+            raise failed[0].exception()
+        await asyncio.sleep(0.1)
+    elapsed = time.perf_counter() - start
+    await asyncio.sleep(hold)  # deja pasar algún heartbeat
+
+    after = process_usage(pid)
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        events = (await client.get("/health")).json()["events"]
+    ready.set()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    print(f"{connections} conexiones abiertas en {elapsed:.1f}s (reportadas por /health: {events['connections']})")
+    print(f"RSS: {before[0]:.1f} MB -> {after[0]:.1f} MB "
+          f"({(after[0] - before[0]) * 1024 / connections:.1f} KB por conexión)")
+    print(f"Hilos del servidor: {before[1]} -> {after[1]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--connections", type=int, default=10_000)
+    parser.add_argument("--hold", type=float, default=3.0, help="segundos con todas las conexiones abiertas")
+    parser.add_argument("--port", type=int, default=8766)
+    args = parser.parse_args()
+
+    _, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))  # el servidor lo hereda
+
+    token = create_access_token(1, "bench@example.com")
+    env = {"SSE_HEARTBEAT": "1", "LOG_LEVEL": "WARNING"}
+    with run_server_process(args.port, env, ("--backlog", "4096")) as (process, base_url):
+        asyncio.run(run(args.port, args.connections, args.hold, base_url, process.pid, token))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""Compara req/s y latencia de serve.py con 1 worker y con N workers.
+
+Siembra usuarios y tareas como bench_load.py y, para cada número de
+workers, arranca `python serve.py --workers W` y lanza el mismo escenario
+(read por defecto) durante --duration segundos. La carga la generan
+--clients procesos para que el cliente no sea el cuello de botella con
+muchos workers; conviene dejarle al menos la mitad de las CPU de la
+máquina. Con --output guarda los resultados en JSON.
+
+    python benchmarks/bench_workers.py --workers 1,4 --users 200 --clients 4
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+import uuid
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_load import SCENARIOS, VirtualUser, seed, cleanup  # noqa: E402
+from common import BACKEND_DIR, run_server_process, percentile  # noqa: E402
+
+
+def client_process(base_url: str, users: list, scenario: str, duration: float, seed_value: int) -> tuple:
+    """Un proceso cliente: ejecuta el escenario con sus usuarios virtuales y devuelve (latencias, códigos)"""
+    random.seed(seed_value)
+    return asyncio.run(_drive(base_url, users, scenario, duration))
+
+
+async def _drive(base_url: str, users: list, scenario: str, duration: float) -> tuple:
+    operations, weights = zip(*SCENARIOS[scenario])
+    vus = [VirtualUser(user) for user in users]
+    latencies = []
+    statuses = Counter()
+    limits = httpx.Limits(max_connections=len(vus), max_keepalive_connections=len(vus))
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        deadline = time.perf_counter() + duration
+
+        async def virtual_user(vu):
+            while time.perf_counter() < deadline:
+                operation = random.choices(operations, weights)[0]
+                start = time.perf_counter()
+                try:
+                    _, response = await operation(client, vu)
+                    statuses[response.status_code] += 1
+                except httpx.HTTPError as e:
+                    statuses[type(e).__name__] += 1
+                latencies.append(time.perf_counter() - start)
+
+        await asyncio.gather(*(virtual_user(vu) for vu in vus))
+    return latencies, dict(statuses)
+
+
+def run_load(executor, base_url: str, users: list, scenario: str, duration: float, clients: int, seed_value: int) -> dict:
+    shares = [users[i::clients] for i in range(clients)]
+    start = time.perf_counter()
+    futures = [executor.submit(client_process, base_url, share, scenario, duration, seed_value + i)
+               for i, share in enumerate(shares) if share]
+    latencies = []
+    statuses = defaultdict(int)
+    for future in futures:
+        samples, codes = future.result()
+        latencies.extend(samples)
+        for code, count in codes.items():
+            statuses[str(code)] += count
+    elapsed = time.perf_counter() - start
+    errors = sum(count for code, count in statuses.items() if not code.isdigit() or int(code) >= 400)
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "status": dict(statuses),
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", default=f"1,{os.cpu_count() or 1}", help="números de workers a comparar")
+    parser.add_argument("--scenario", default="read", choices=sorted(SCENARIOS))
+    parser.add_argument("--users", type=int, default=200, help="usuarios virtuales concurrentes (en total)")
+    parser.add_argument("--tasks-per-user", type=int, default=50)
+    parser.add_argument("--clients", type=int, default=max(1, (os.cpu_count() or 2) // 2), help="procesos cliente")
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--warmup", type=float, default=3.0)
+    parser.add_argument("--port", type=int, default=8768)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    worker_counts = [int(value) for value in args.workers.split(",") if value.strip()]
+    random.seed(args.seed)
+    run_id = uuid.uuid4().hex[:8]
+    users = seed(args.users, args.tasks_per_user, run_id)
+    results = {}
+    try:
+        with ProcessPoolExecutor(max_workers=args.clients) as executor:
+            for workers in worker_counts:
+                command = [sys.executable, os.path.join(BACKEND_DIR, "serve.py"),
+                           "--workers", str(workers), "--port", str(args.port)]
+                env = {"LOG_LEVEL": "WARNING", "REMINDERS_ENABLED": "false"}
+                with run_server_process(args.port, env, command=command) as (_, base_url):
+                    if args.warmup > 0:
+                        run_load(executor, base_url, users, args.scenario, args.warmup, args.clients, args.seed)
+                    results[workers] = run_load(executor, base_url, users, args.scenario, args.duration,
+                                                args.clients, args.seed)
+                print(f"{workers:>3} worker(s): {results[workers]['rps']:>9} req/s  "
+                      f"p50 {results[workers]['p50_ms']} ms  p95 {results[workers]['p95_ms']} ms  "
+                      f"p99 {results[workers]['p99_ms']} ms  errores {results[workers]['errors']}")
+    finally:
+        cleanup(run_id)
+
+    baseline = results.get(worker_counts[0])
+    if baseline and baseline["rps"]:
+        for workers in worker_counts[1:]:
+            print(f"{workers} workers vs {worker_counts[0]}: x{results[workers]['rps'] / baseline['rps']:.2f} req/s")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"scenario": args.scenario, "cpus": os.cpu_count(), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Utilidades compartidas por los benchmarks: levantar uvicorn, crear usuarios y medir.
+
+Los benchmarks se ejecutan desde la carpeta Backend contra un MySQL local
+configurado en .env (con BD/schema.sql aplicado), por ejemplo:
+
+    python benchmarks/bench_db_mode.py --requests 20000 --concurrency 500
+
+Requieren `httpx` además de requirements.txt.
+"""
+import os
+import subprocess
+import sys
+import time
+import uuid
+from contextlib import contextmanager
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@contextmanager
+def run_server(port=8765, env=None, args=()):
+    """Arranca `uvicorn main:app` en un subproceso y lo detiene al salir"""
+    with run_server_process(port, env, args) as (_, base_url):
+        yield base_url
+
+
+@contextmanager
+def run_server_process(port=8765, env=None, args=(), command=None):
+    """Como run_server, pero devuelve también el Popen (para medir el proceso).
+
+    `command` sustituye al `uvicorn main:app` por defecto (p. ej. serve.py).
+    """
+    # Los benchmarks miden la API, no los límites: sin 429 ni 503 salvo que se pidan en env
+    server_env = dict(os.environ, RATE_LIMIT_ENABLED="false", SHED_MAX_IN_FLIGHT="0", SHED_MAX_DB_BACKLOG="0")
+    server_env.update(env or {})
+    if command is None:
+        command = [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning", *args]
+    process = subprocess.Popen(command, cwd=BACKEND_DIR, env=server_env)
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        wait_ready(base_url)
+        yield process, base_url
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def wait_ready(base_url, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(base_url + "/").status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"El servidor en {base_url} no respondió en {timeout}s")
+
+
+def register_user(base_url) -> dict:
+    """Registra un usuario desechable y devuelve los headers de autenticación"""
+    suffix = uuid.uuid4().hex[:12]
+    response = httpx.post(base_url + "/auth/register", json={
+        "email": f"bench_{suffix}@example.com",
+        "username": f"bench_{suffix}",
+        "password": "bench-password",
+    }, timeout=30)
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['token']}"}
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
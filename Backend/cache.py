@@ -0,0 +1,103 @@
+"""Caché en memoria LRU con expiración por entrada, segura entre hilos."""
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """Diccionario acotado a `maxsize` entradas; expulsa la menos usada y las expiradas.
+
+    Cada entrada expira a los `ttl` segundos o en el instante `expires_at`
+    (epoch) indicado al guardarla, lo que ocurra antes. Con `max_bytes` se
+    limita además la memoria total, midiendo cada valor con `sizeof`.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, max_bytes: int = None, sizeof=len):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._sizeof = sizeof if max_bytes else (lambda value: 0)
+        self._data = OrderedDict()  # clave -> (valor, expira_en, tamaño)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires_at, size = entry
+            if expires_at <= now:
+                del self._data[key]
+                self._bytes -= size
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, expires_at: float = None):
+        limit = time.time() + self.ttl
+        expires_at = min(expires_at, limit) if expires_at else limit
+        size = self._sizeof(value)
+        if self.maxsize <= 0 or (self.max_bytes and size > self.max_bytes):
+            return
+        with self._lock:
+            previous = self._data.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[2]
+            self._data[key] = (value, expires_at, size)
+            self._bytes += size
+            while len(self._data) > self.maxsize or (self.max_bytes and self._bytes > self.max_bytes):
+                _, (_, _, evicted_size) = self._data.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def pop(self, key):
+        with self._lock:
+            entry = self._data.pop(key, None)
+            if entry is None:
+                return None
+            self._bytes -= entry[2]
+            self.invalidations += 1
+            return entry[0]
+
+    def discard_if(self, predicate) -> int:
+        """Elimina las entradas para las que predicate(clave, valor) es cierto (O(n))"""
+        with self._lock:
+            keys = [key for key, (value, _, _) in self._data.items() if predicate(key, value)]
+            for key in keys:
+                self._bytes -= self._data.pop(key)[2]
+            self.invalidations += len(keys)
+            return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            stats = {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+            if self.max_bytes:
+                stats["bytes"] = self._bytes
+                stats["max_bytes"] = self.max_bytes
+            return stats
@@ -11,6 +11,25 @@ def get_port():
     except (ValueError, TypeError):
         return 3306
 
+# Helpers para leer variables numéricas/booleanas con valor por defecto
+def get_int(name, default):
+    try:
+        return int(os.getenv(name, default))
+    except (ValueError, TypeError):
+        return default
+
+def get_float(name, default):
+    try:
+        return float(os.getenv(name, default))
+    except (ValueError, TypeError):
+        return default
+
+def get_bool(name, default):
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
 DB_CONFIG = {
     "host": os.getenv("DB_HOST", "localhost"),
     "user": os.getenv("DB_USER", "root"),
@@ -18,3 +37,160 @@ DB_CONFIG = {
     "database": os.getenv("DB_NAME", "todo_db"),
     "port": get_port(),
 }
+
+# Aplicar las migraciones pendientes (migrate.py) al arrancar la API
+DB_MIGRATE_ON_STARTUP = get_bool("DB_MIGRATE_ON_STARTUP", False)
+
+# Modo de acceso a datos: "sync" (mysql-connector en el threadpool) o "async" (aiomysql)
+DB_MODE = os.getenv("DB_MODE", "sync").strip().lower()
+
+# Pool de conexiones a MySQL (se aplica a ambos modos)
+DB_POOL_CONFIG = {
+    "size": get_int("DB_POOL_SIZE", 5),                 # conexiones persistentes
+    "max_overflow": get_int("DB_POOL_MAX_OVERFLOW", 10),  # conexiones extra en picos
+    "timeout": get_float("DB_POOL_TIMEOUT", 10.0),      # segundos esperando una conexión libre
+    "recycle": get_float("DB_POOL_RECYCLE", 1800.0),    # segundos antes de reabrir una conexión
+    "ping_after": get_float("DB_POOL_PING_AFTER", 5.0), # ping si estuvo ociosa más de N segundos
+}
+
+# Pool síncrono (database.py). Con DB_MODE=async las rutas de tareas usan aiomysql,
+# pero batch, búsqueda, estadísticas, cambios, write-behind, recordatorios y
+# archivo siguen en mysql-connector: ese segundo pool se dimensiona aparte y
+# más pequeño para no duplicar las conexiones por worker.
+SYNC_POOL_CONFIG = dict(DB_POOL_CONFIG)
+if DB_MODE == "async":
+    SYNC_POOL_CONFIG["size"] = get_int("DB_SYNC_POOL_SIZE", 2)
+    SYNC_POOL_CONFIG["max_overflow"] = get_int("DB_SYNC_POOL_MAX_OVERFLOW", 3)
+
+def db_connections_per_worker() -> int:
+    """Conexiones a MySQL que puede abrir un worker (ambos pools con DB_MODE=async)"""
+    sync = SYNC_POOL_CONFIG["size"] + SYNC_POOL_CONFIG["max_overflow"]
+    if DB_MODE == "async":
+        return sync + DB_POOL_CONFIG["size"] + DB_POOL_CONFIG["max_overflow"]
+    return sync
+
+# Hashing de contraseñas (bcrypt) en un pool de procesos dedicado
+BCRYPT_ROUNDS = get_int("BCRYPT_ROUNDS", 12)                  # factor de coste
+HASH_WORKERS = get_int("HASH_WORKERS", os.cpu_count() or 1)   # 0 = hashear en el hilo de la petición
+HASH_MAX_PENDING = get_int("HASH_MAX_PENDING", max(1, HASH_WORKERS) * 8)  # cola máxima antes de responder 503
+
+# Paginación de GET /tasks
+TASKS_PAGE_DEFAULT_LIMIT = get_int("TASKS_PAGE_DEFAULT_LIMIT", 50)  # si llega cursor sin limit
+TASKS_PAGE_MAX_LIMIT = get_int("TASKS_PAGE_MAX_LIMIT", 500)
+
+# Exportación en streaming (GET /tasks/export): filas leídas de MySQL por lote
+EXPORT_BATCH_SIZE = get_int("EXPORT_BATCH_SIZE", 1000)
+
+# Operaciones por lote (POST /tasks/batch)
+BATCH_MAX_OPERATIONS = get_int("BATCH_MAX_OPERATIONS", 1000)
+BATCH_INSERT_CHUNK = get_int("BATCH_INSERT_CHUNK", 500)  # filas por INSERT multi-fila
+
+# Cachés de autenticación: tokens JWT ya verificados y perfiles para /auth/verify
+TOKEN_CACHE_SIZE = get_int("TOKEN_CACHE_SIZE", 10000)
+TOKEN_CACHE_TTL = get_float("TOKEN_CACHE_TTL", 300.0)   # nunca más allá del exp del token
+USER_CACHE_SIZE = get_int("USER_CACHE_SIZE", 10000)
+USER_CACHE_TTL = get_float("USER_CACHE_TTL", 60.0)
+
+# Caché de listados GET /tasks: "memory" (por proceso), "redis" (compartida entre workers) o "none"
+TASK_CACHE_BACKEND = os.getenv("TASK_CACHE_BACKEND", "memory").strip().lower()
+TASK_CACHE_TTL = get_float("TASK_CACHE_TTL", 60.0)
+TASK_CACHE_MAX_ENTRIES = get_int("TASK_CACHE_MAX_ENTRIES", 10000)
+TASK_CACHE_MAX_BYTES = get_int("TASK_CACHE_MAX_BYTES", 64 * 1024 * 1024)
+TASK_CACHE_REDIS_URL = os.getenv("TASK_CACHE_REDIS_URL", "redis://localhost:6379/0")
+
+# Logging (ver logging_config.py)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").strip().upper()
+LOG_LEVELS = os.getenv("LOG_LEVELS", "")              # "routes=WARNING,batch_routes=DEBUG"
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").strip().lower()  # "json" o "text"
+LOG_SAMPLE_RATES = os.getenv("LOG_SAMPLE_RATES", "")  # "routes.get_tasks_route=0.01,main=0.1"
+LOG_QUEUE_SIZE = get_int("LOG_QUEUE_SIZE", 10000)
+
+# Búsqueda GET /tasks/search: "fulltext" (índice FULLTEXT de MySQL) o "memory" (índice invertido en el proceso)
+TASK_SEARCH_BACKEND = os.getenv("TASK_SEARCH_BACKEND", "fulltext").strip().lower()
+TASK_SEARCH_MAX_TERMS = get_int("TASK_SEARCH_MAX_TERMS", 8)
+TASK_SEARCH_INDEX_USERS = get_int("TASK_SEARCH_INDEX_USERS", 1000)  # usuarios con índice en memoria
+# innodb_ft_min_token_size del servidor: las palabras más cortas no están en el índice FULLTEXT
+TASK_SEARCH_MIN_TOKEN_SIZE = get_int("TASK_SEARCH_MIN_TOKEN_SIZE", 3)
+# Hasta este número de tareas se busca con LIKE sobre las del usuario en lugar de FULLTEXT (0 = siempre FULLTEXT)
+TASK_SEARCH_LIKE_MAX_TASKS = get_int("TASK_SEARCH_LIKE_MAX_TASKS", 2000)
+
+# Sincronización incremental (GET /tasks/changes)
+SYNC_PAGE_LIMIT = get_int("SYNC_PAGE_LIMIT", 500)
+SYNC_SAFETY_LAG = get_float("SYNC_SAFETY_LAG", 5.0)  # segundos que se reenvían por transacciones lentas
+SYNC_TOMBSTONE_RETENTION_DAYS = get_int("SYNC_TOMBSTONE_RETENTION_DAYS", 30)
+SYNC_PURGE_INTERVAL = get_float("SYNC_PURGE_INTERVAL", 3600.0)  # 0 = no purgar desde la API
+
+# Push de cambios por Server-Sent Events (GET /tasks/stream)
+TASK_EVENTS_BACKEND = os.getenv("TASK_EVENTS_BACKEND", "local").strip().lower()  # "local" o "redis"
+TASK_EVENTS_REDIS_URL = os.getenv("TASK_EVENTS_REDIS_URL", TASK_CACHE_REDIS_URL)
+SSE_QUEUE_SIZE = get_int("SSE_QUEUE_SIZE", 256)        # eventos pendientes por conexión antes de "resync"
+SSE_REPLAY_SIZE = get_int("SSE_REPLAY_SIZE", 200)      # eventos recientes por usuario para Last-Event-ID
+SSE_REPLAY_USERS = get_int("SSE_REPLAY_USERS", 10000)
+SSE_REPLAY_TTL = get_float("SSE_REPLAY_TTL", 300.0)
+SSE_HEARTBEAT = get_float("SSE_HEARTBEAT", 15.0)
+SSE_RETRY_MS = get_int("SSE_RETRY_MS", 3000)
+
+# Recordatorios de due_date (reminders.py)
+REMINDERS_ENABLED = get_bool("REMINDERS_ENABLED", True)
+REMINDER_SINKS = os.getenv("REMINDER_SINKS", "log,events")  # "log", "webhook", "events" (GET /tasks/stream)
+REMINDER_WEBHOOK_URL = os.getenv("REMINDER_WEBHOOK_URL", "")
+REMINDER_LEAD_HOURS = get_float("REMINDER_LEAD_HOURS", 0.0)  # antelación respecto a las 00:00 UTC del due_date
+REMINDER_HORIZON_HOURS = get_float("REMINDER_HORIZON_HOURS", 24.0)  # cuánto por delante se carga en memoria
+REMINDER_MAX_LOADED = get_int("REMINDER_MAX_LOADED", 100000)
+REMINDER_BATCH = get_int("REMINDER_BATCH", 500)
+REMINDER_REFILL_INTERVAL = get_float("REMINDER_REFILL_INTERVAL", 60.0)
+REMINDER_WEBHOOK_TIMEOUT = get_float("REMINDER_WEBHOOK_TIMEOUT", 5.0)  # segundos por POST
+REMINDER_WEBHOOK_CONCURRENCY = get_int("REMINDER_WEBHOOK_CONCURRENCY", 8)  # hilos propios del webhook
+REMINDER_DELIVERY_DEADLINE = get_float("REMINDER_DELIVERY_DEADLINE", 30.0)  # espera máxima por lote enviado
+
+# Métricas Prometheus (GET /metrics) y registro de consultas lentas (metrics.py)
+METRICS_ENABLED = get_bool("METRICS_ENABLED", True)
+DB_SLOW_QUERY_MS = get_float("DB_SLOW_QUERY_MS", 0.0)  # 0 = no registrar consultas lentas
+
+# Servidor (serve.py): workers de uvicorn y threadpool de las rutas síncronas
+SERVER_HOST = os.getenv("SERVER_HOST", "0.0.0.0")
+SERVER_PORT = get_int("PORT", get_int("SERVER_PORT", 8000))  # PORT lo fijan Render y similares
+SERVER_WORKERS = get_int("SERVER_WORKERS", os.cpu_count() or 1)
+SERVER_BACKLOG = get_int("SERVER_BACKLOG", 2048)
+SERVER_KEEPALIVE = get_int("SERVER_KEEPALIVE", 5)              # segundos de keep-alive HTTP
+SERVER_GRACEFUL_TIMEOUT = get_int("SERVER_GRACEFUL_TIMEOUT", 30)  # espera a peticiones en curso al parar
+SERVER_MAX_REQUESTS = get_int("SERVER_MAX_REQUESTS", 0)         # reciclar el worker tras N peticiones (0 = nunca)
+SERVER_ACCESS_LOG = get_bool("SERVER_ACCESS_LOG", False)
+# Hilos para rutas síncronas (mysql-connector): tantos como conexiones puede prestar el pool
+THREADPOOL_SIZE = get_int("THREADPOOL_SIZE", SYNC_POOL_CONFIG["size"] + SYNC_POOL_CONFIG["max_overflow"])
+
+# Límites de peticiones por usuario/IP y load shedding (rate_limit.py)
+RATE_LIMIT_ENABLED = get_bool("RATE_LIMIT_ENABLED", True)
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory").strip().lower()  # "memory" o "redis"
+RATE_LIMIT_REDIS_URL = os.getenv("RATE_LIMIT_REDIS_URL", "redis://localhost:6379/0")
+RATE_LIMIT_MAX_KEYS = get_int("RATE_LIMIT_MAX_KEYS", 100000)  # buckets en memoria por worker
+RATE_LIMITS = os.getenv("RATE_LIMITS", "")  # "login.ip=10/60,read.user=0" (ver rate_limit.DEFAULT_LIMITS)
+# Conexiones con las que se atienden las rutas de tareas: aiomysql en modo async, el threadpool en sync
+ROUTE_CONCURRENCY = DB_POOL_CONFIG["size"] + DB_POOL_CONFIG["max_overflow"] if DB_MODE == "async" else THREADPOOL_SIZE
+SHED_MAX_IN_FLIGHT = get_int("SHED_MAX_IN_FLIGHT", 8 * ROUTE_CONCURRENCY)  # peticiones en curso por worker (0 = sin límite)
+SHED_MAX_DB_BACKLOG = get_int("SHED_MAX_DB_BACKLOG", 2 * ROUTE_CONCURRENCY)  # esperando conexión o hilo (0 = sin límite)
+SHED_RETRY_AFTER = get_int("SHED_RETRY_AFTER", 1)  # segundos en Retry-After de los 503
+
+# Compresión de respuestas (response_compression.py)
+COMPRESSION_ENABLED = get_bool("COMPRESSION_ENABLED", True)
+COMPRESSION_ENCODINGS = os.getenv("COMPRESSION_ENCODINGS", "zstd,br,gzip")  # orden de preferencia
+COMPRESSION_MIN_SIZE = get_int("COMPRESSION_MIN_SIZE", 1024)  # bytes; por debajo no compensa
+COMPRESSION_OFFLOAD_BYTES = get_int("COMPRESSION_OFFLOAD_BYTES", 32 * 1024)  # desde aquí, fuera del event loop
+COMPRESSION_THREADS = get_int("COMPRESSION_THREADS", os.cpu_count() or 1)
+COMPRESSION_GZIP_LEVEL = get_int("COMPRESSION_GZIP_LEVEL", 5)
+COMPRESSION_BROTLI_QUALITY = get_int("COMPRESSION_BROTLI_QUALITY", 4)
+COMPRESSION_ZSTD_LEVEL = get_int("COMPRESSION_ZSTD_LEVEL", 3)
+
+# Escrituras de tareas agrupadas con commit en grupo (write_behind.py)
+WRITE_BEHIND_ENABLED = get_bool("WRITE_BEHIND_ENABLED", False)
+WRITE_BEHIND_WINDOW_MS = get_float("WRITE_BEHIND_WINDOW_MS", 5.0)  # espera para agrupar tras la primera operación
+WRITE_BEHIND_MAX_BATCH = get_int("WRITE_BEHIND_MAX_BATCH", 500)    # operaciones por commit
+WRITE_BEHIND_MAX_PENDING = get_int("WRITE_BEHIND_MAX_PENDING", 10000)  # en cola antes de responder 503
+WRITE_BEHIND_TIMEOUT = get_float("WRITE_BEHIND_TIMEOUT", 30.0)  # segundos que la petición espera su commit antes del 504
+
+# Archivo de tareas completadas antiguas en tasks_archive (archive.py)
+ARCHIVE_AFTER_DAYS = get_int("ARCHIVE_AFTER_DAYS", 90)  # completadas sin cambios desde hace N días
+ARCHIVE_BATCH_SIZE = get_int("ARCHIVE_BATCH_SIZE", 500)  # tareas movidas por transacción
+ARCHIVE_SCAN_ROWS = get_int("ARCHIVE_SCAN_ROWS", 5000)   # ids de tasks recorridos por consulta
+ARCHIVE_PAUSE = get_float("ARCHIVE_PAUSE", 0.1)          # segundos entre lotes
+ARCHIVE_INTERVAL = get_int("ARCHIVE_INTERVAL", 0)        # segundos entre barridos desde la API (0 = desactivado)
@@ -1,22 +1,264 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
 import mysql.connector
 from mysql.connector import Error
-from config import DB_CONFIG
+from mysql.connector.constants import ClientFlag
+from fastapi import HTTPException
+from config import DB_CONFIG, SYNC_POOL_CONFIG, METRICS_ENABLED
+from metrics import InstrumentedConnection, POOL_WAIT_SECONDS, CONNECTIONS_OPENED, CONNECTIONS_CLOSED
 
-def get_db_connection():
-    try:
-        db_config = {
-            "host": DB_CONFIG["host"],
-            "user": DB_CONFIG["user"],
-            "password": DB_CONFIG["password"],
-            "database": DB_CONFIG["database"],
-            "port": int(DB_CONFIG["port"]) if isinstance(DB_CONFIG["port"], str) else DB_CONFIG["port"]
-        }
-        
-        print(f"DEBUG - Conectando con host: {db_config['host']}, port: {db_config['port']} (tipo: {type(db_config['port'])})")
-        
-        connection = mysql.connector.connect(**db_config)
-        print("Conexión exitosa a la BD")
+
+class PoolTimeoutError(HTTPException):
+    """No hay conexiones libres en el pool dentro del tiempo de espera"""
+    def __init__(self, timeout: float):
+        super().__init__(
+            status_code=503,
+            detail="Base de datos saturada, intenta de nuevo",
+            headers={"Retry-After": str(max(1, int(timeout)))},
+        )
+
+
+def _create_connection():
+    """Abre una conexión nueva a MySQL (handshake TCP + autenticación).
+
+    La sesión trabaja en UTC: las fechas de las tareas las pone siempre MySQL
+    (CURRENT_TIMESTAMP, un solo reloj) y se leen en UTC. Con FOUND_ROWS,
+    `rowcount` de un UPDATE cuenta las filas encontradas aunque los valores
+    no cambien.
+    """
+    return mysql.connector.connect(
+        host=DB_CONFIG["host"],
+        user=DB_CONFIG["user"],
+        password=DB_CONFIG["password"],
+        database=DB_CONFIG["database"],
+        port=int(DB_CONFIG["port"]),
+        autocommit=False,
+        time_zone="+00:00",
+        client_flags=[ClientFlag.FOUND_ROWS],
+    )
+
+
+class ConnectionPool:
+    """Pool acotado de conexiones MySQL reutilizables.
+
+    Mantiene hasta `size` conexiones ociosas y permite abrir `max_overflow`
+    conexiones adicionales en picos; las de overflow se cierran al devolverse
+    si el pool ya está lleno. Al entregar una conexión se recicla si superó
+    `recycle` segundos de vida y se le hace ping si estuvo ociosa más de
+    `ping_after` segundos.
+    """
+
+    def __init__(self, size=5, max_overflow=10, timeout=10.0, recycle=1800.0,
+                 ping_after=5.0, factory=_create_connection):
+        self.size = size
+        self.max_overflow = max_overflow
+        self.timeout = timeout
+        self.recycle = recycle
+        self.ping_after = ping_after
+        self._factory = factory
+        self._cond = threading.Condition()
+        self._idle = deque()       # (conexión, creada_en, devuelta_en)
+        self._created_at = {}      # id(conexión) -> creada_en
+        self._total = 0            # conexiones abiertas (ociosas + en uso)
+        self._in_use = 0
+        self._waiting = 0
+        self._closed = False
+        # Estadísticas
+        self._checkouts = 0
+        self._timeouts = 0
+        self._opened = 0
+        self._discarded = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def acquire(self):
+        """Obtiene una conexión del pool, esperando como máximo `timeout` segundos"""
+        start = time.monotonic()
+        deadline = start + self.timeout
+        entry = None
+        with self._cond:
+            self._waiting += 1
+            try:
+                while True:
+                    if self._closed:
+                        raise Error(msg="El pool de conexiones está cerrado")
+                    if self._idle:
+                        entry = self._idle.pop()
+                        break
+                    if self._total < self.size + self.max_overflow:
+                        self._total += 1
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._timeouts += 1
+                        raise PoolTimeoutError(self.timeout)
+                    self._cond.wait(remaining)
+            finally:
+                self._waiting -= 1
+
+        connection = self._validate(entry) if entry else None
+        if connection is None:
+            try:
+                connection = self._factory()
+            except Exception:
+                with self._cond:
+                    self._total -= 1
+                    self._cond.notify()
+                raise
+            with self._cond:
+                self._opened += 1
+                self._created_at[id(connection)] = time.monotonic()
+            CONNECTIONS_OPENED.inc()
+
+        waited = time.monotonic() - start
+        POOL_WAIT_SECONDS.observe(waited)
+        with self._cond:
+            self._in_use += 1
+            self._checkouts += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
         return connection
-    except Error as e:
-        print(f"Error al conectar a la BD: {e}")
-        raise
\ No newline at end of file
+
+    def _validate(self, entry):
+        """Devuelve la conexión ociosa si sigue sana, o None si hay que reabrirla"""
+        connection, created_at, returned_at = entry
+        now = time.monotonic()
+        healthy = True
+        if self.recycle and now - created_at > self.recycle:
+            healthy = False
+        elif self.ping_after is not None and now - returned_at > self.ping_after:
+            try:
+                connection.ping(reconnect=False)
+            except Error:
+                healthy = False
+        if healthy:
+            return connection
+        self._close_quietly(connection)
+        with self._cond:
+            self._created_at.pop(id(connection), None)
+            self._discarded += 1
+        return None
+
+    def release(self, connection):
+        """Devuelve una conexión al pool (o la cierra si sobra o está rota)"""
+        reusable = True
+        try:
+            if connection.in_transaction:
+                connection.rollback()
+        except Error:
+            reusable = False
+
+        with self._cond:
+            self._in_use -= 1
+            created_at = self._created_at.get(id(connection), time.monotonic())
+            if reusable and not self._closed and len(self._idle) < self.size:
+                self._idle.append((connection, created_at, time.monotonic()))
+                connection = None
+            else:
+                self._total -= 1
+                self._created_at.pop(id(connection), None)
+                if not reusable:
+                    self._discarded += 1
+            self._cond.notify()
+
+        if connection is not None:
+            self._close_quietly(connection)
+
+    def close(self):
+        """Cierra todas las conexiones ociosas; las que estén en uso se cierran al devolverse"""
+        with self._cond:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._total -= len(idle)
+            self._cond.notify_all()
+        for connection, _, _ in idle:
+            self._close_quietly(connection)
+
+    def waiting(self) -> int:
+        """Hilos esperando una conexión"""
+        with self._cond:
+            return self._waiting
+
+    def stats(self) -> dict:
+        """Estado actual del pool para monitoreo"""
+        with self._cond:
+            return {
+                "size": self.size,
+                "max_overflow": self.max_overflow,
+                "open": self._total,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "waiting": self._waiting,
+                "overflow": max(0, self._total - self.size),
+                "checkouts": self._checkouts,
+                "timeouts": self._timeouts,
+                "opened": self._opened,
+                "discarded": self._discarded,
+                "checkout_wait_avg_ms": round(self._wait_total / self._checkouts * 1000, 3) if self._checkouts else 0.0,
+                "checkout_wait_max_ms": round(self._wait_max * 1000, 3),
+            }
+
+    @staticmethod
+    def _close_quietly(connection):
+        CONNECTIONS_CLOSED.inc()
+        try:
+            connection.close()
+        except Error:
+            pass
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    """Devuelve el pool global, creándolo en el primer uso"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(**SYNC_POOL_CONFIG)
+    return _pool
+
+
+def close_pool():
+    """Cierra el pool global (al apagar la aplicación)"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+
+
+def get_pool_stats() -> dict:
+    return get_pool().stats()
+
+
+def get_pool_waiting() -> int:
+    """Hilos esperando una conexión (para el load shedding de rate_limit.py)"""
+    pool = _pool
+    return pool.waiting() if pool is not None else 0
+
+
+@contextmanager
+def db_connection():
+    """Context manager que presta una conexión del pool y la devuelve al salir.
+
+    Con METRICS_ENABLED la conexión se entrega envuelta para medir cada consulta.
+    """
+    pool = get_pool()
+    connection = pool.acquire()
+    try:
+        yield InstrumentedConnection(connection) if METRICS_ENABLED else connection
+    finally:
+        pool.release(connection)
+
+
+def get_db():
+    """Dependencia de FastAPI equivalente a `db_connection()`"""
+    with db_connection() as connection:
+        yield connection
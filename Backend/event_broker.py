@@ -0,0 +1,261 @@
+"""Pub/sub de cambios de tareas para GET /tasks/stream (Server-Sent Events).
+
+Las rutas publican por task_events y el broker reparte los eventos entre las
+conexiones abiertas de cada usuario. Todo el reparto ocurre en el event loop:
+cada conexión es una corrutina con su propia cola, sin hilo por conexión, así
+que miles de conexiones ociosas solo cuestan memoria (una cola vacía y un
+heartbeat cada SSE_HEARTBEAT segundos).
+
+- Cada evento se serializa una sola vez como trama SSE y la misma trama se
+  encola en todas las conexiones del usuario.
+- Contrapresión: si una conexión lenta acumula SSE_QUEUE_SIZE tramas, se
+  descartan y recibe un evento `resync` (debe recargar la lista), en lugar
+  de crecer sin límite.
+- Reanudación: se guardan los últimos SSE_REPLAY_SIZE eventos por usuario;
+  al reconectar con Last-Event-ID se reenvían los posteriores, o `resync`
+  si ese id ya no está en el buffer.
+
+Backends (TASK_EVENTS_BACKEND):
+- local: el evento vuelve directamente al broker del mismo proceso. Solo
+  sirve con un worker: con varios, un cliente conectado a otro worker no
+  recibe el cambio ni puede reanudar con Last-Event-ID (serve.py no arranca
+  con varios workers y `local`).
+- redis: se publica en un canal de Redis y cada worker lo recibe en un hilo
+  de escucha, así las conexiones de cualquier worker ven todos los cambios.
+  Requiere el paquete `redis`.
+- none: sin reparto; GET /tasks/stream responde 503 y los clientes siguen
+  con GET /tasks/changes. Es lo que usa serve.py con varios workers si
+  TASK_EVENTS_BACKEND no está fijado.
+"""
+from collections import deque
+from cache import TTLCache
+from serialization import dumps
+from config import (
+    TASK_EVENTS_BACKEND,
+    TASK_EVENTS_REDIS_URL,
+    SSE_QUEUE_SIZE,
+    SSE_REPLAY_SIZE,
+    SSE_REPLAY_USERS,
+    SSE_REPLAY_TTL,
+    SSE_HEARTBEAT,
+    SSE_RETRY_MS,
+)
+from typing import Optional
+import asyncio
+import itertools
+import json
+import logging
+import os
+import time
+import task_events
+
+logger = logging.getLogger(__name__)
+
+RESYNC_FRAME = b"event: resync\ndata: {}\n\n"
+HEARTBEAT_FRAME = b": ping\n\n"
+
+
+class LocalBackend:
+    blocking = False
+    enabled = True
+
+    def start(self, deliver):
+        self._deliver = deliver
+
+    def publish(self, message: bytes):
+        self._deliver(message)
+
+    def stop(self):
+        pass
+
+
+class DisabledBackend:
+    """TASK_EVENTS_BACKEND=none: los eventos no salen del proceso ni llegan a nadie"""
+    blocking = False
+    enabled = False
+
+    def start(self, deliver):
+        pass
+
+    def publish(self, message: bytes):
+        pass
+
+    def stop(self):
+        pass
+
+
+class RedisBackend:
+    blocking = True
+    enabled = True
+    channel = "tasks:events"
+
+    def __init__(self, url: str):
+        import redis  # dependencia opcional
+        self._redis = redis.Redis.from_url(url)
+        self._thread = None
+
+    def start(self, deliver):
+        pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(**{self.channel: lambda message: deliver(message["data"])})
+        self._thread = pubsub.run_in_thread(sleep_time=1.0, daemon=True)
+
+    def publish(self, message: bytes):
+        self._redis.publish(self.channel, message)
+
+    def stop(self):
+        if self._thread is not None:
+            self._thread.stop()
+            self._thread = None
+
+
+def create_backend(name: str = TASK_EVENTS_BACKEND):
+    if name == "redis":
+        return RedisBackend(TASK_EVENTS_REDIS_URL)
+    if name == "none":
+        return DisabledBackend()
+    return LocalBackend()
+
+
+def format_frame(event_id: str, event: dict) -> bytes:
+    return b"id: %s\nevent: %s\ndata: %s\n\n" % (event_id.encode(), event["type"].encode(), dumps(event))
+
+
+class Subscriber:
+    """Una conexión SSE abierta: cola acotada de tramas ya serializadas"""
+    __slots__ = ("user_id", "queue")
+
+    def __init__(self, user_id: int, size: int):
+        self.user_id = user_id
+        self.queue = asyncio.Queue(size)
+
+    def offer(self, frame: bytes) -> bool:
+        """Encola sin esperar; si la cola está llena la vacía y deja solo `resync`"""
+        try:
+            self.queue.put_nowait(frame)
+            return True
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC_FRAME)
+            return False
+
+
+class EventBroker:
+    def __init__(self, backend, queue_size: int = SSE_QUEUE_SIZE, replay_size: int = SSE_REPLAY_SIZE):
+        self.backend = backend
+        self._queue_size = queue_size
+        self._replay_size = replay_size
+        self._replay = TTLCache(SSE_REPLAY_USERS, SSE_REPLAY_TTL)
+        self._subscribers = {}  # user_id -> set(Subscriber)
+        self._loop = None
+        # Ids únicos entre workers: prefijo del proceso + contador
+        self._prefix = f"{os.getpid():x}.{time.time_ns():x}"
+        self._counter = itertools.count(1)
+        self.published = 0
+        self.delivered = 0
+        self.resyncs = 0
+
+    def start(self, loop: asyncio.AbstractEventLoop):
+        self._loop = loop
+        self.backend.start(self._receive)
+
+    def stop(self):
+        self.backend.stop()
+        self._loop = None
+
+    # Productores (cualquier hilo)
+
+    def publish(self, user_id: int, events: list):
+        """Listener de task_events: publica los eventos confirmados del usuario"""
+        if self._loop is None or not events or not self.backend.enabled:
+            return  # sin API en marcha (scripts, CLI) o sin reparto no hay a quién avisar
+        message = dumps({
+            "user_id": user_id,
+            "events": [[f"{self._prefix}.{next(self._counter)}", event] for event in events],
+        })
+        self.published += len(events)
+        self.backend.publish(message)
+
+    def _receive(self, message: bytes):
+        loop = self._loop
+        if loop is not None:
+            loop.call_soon_threadsafe(self._dispatch, message)
+
+    # Event loop
+
+    def _dispatch(self, message: bytes):
+        data = json.loads(message)
+        user_id = data["user_id"]
+        buffer = self._replay.get(user_id)
+        if buffer is None:
+            buffer = deque(maxlen=self._replay_size)
+        self._replay.set(user_id, buffer)  # renueva el TTL mientras el usuario tenga actividad
+        subscribers = self._subscribers.get(user_id, ())
+        for event_id, event in data["events"]:
+            frame = format_frame(event_id, event)
+            buffer.append((event_id, frame))
+            for subscriber in subscribers:
+                if subscriber.offer(frame):
+                    self.delivered += 1
+                else:
+                    self.resyncs += 1
+
+    def subscribe(self, user_id: int) -> Subscriber:
+        subscriber = Subscriber(user_id, self._queue_size)
+        self._subscribers.setdefault(user_id, set()).add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        subscribers = self._subscribers.get(subscriber.user_id)
+        if subscribers is not None:
+            subscribers.discard(subscriber)
+            if not subscribers:
+                del self._subscribers[subscriber.user_id]
+
+    def replay(self, user_id: int, last_event_id: str) -> Optional[list]:
+        """Tramas posteriores a last_event_id, o None si ya no está en el buffer"""
+        buffer = self._replay.get(user_id) or ()
+        frames = None
+        for event_id, frame in buffer:
+            if frames is not None:
+                frames.append(frame)
+            elif event_id == last_event_id:
+                frames = []
+        return frames
+
+    async def stream(self, user_id: int, last_event_id: Optional[str] = None):
+        """Generador de la respuesta SSE de una conexión"""
+        # subscribe() y replay() se ejecutan sin ceder el loop: ningún evento
+        # puede quedar entre el buffer y la cola, ni llegar dos veces
+        subscriber = self.subscribe(user_id)
+        frames = []
+        if last_event_id:
+            frames = self.replay(user_id, last_event_id)
+            if frames is None:
+                self.resyncs += 1
+                frames = [RESYNC_FRAME]
+        try:
+            yield b"retry: %d\n\n" % SSE_RETRY_MS
+            for frame in frames:
+                yield frame
+            while True:
+                try:
+                    yield await asyncio.wait_for(subscriber.queue.get(), SSE_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    yield HEARTBEAT_FRAME
+        finally:
+            self.unsubscribe(subscriber)
+
+    def stats(self) -> dict:
+        return {
+            "backend": TASK_EVENTS_BACKEND,
+            "users": len(self._subscribers),
+            "connections": sum(len(subscribers) for subscribers in self._subscribers.values()),
+            "published": self.published,
+            "delivered": self.delivered,
+            "resyncs": self.resyncs,
+        }
+
+
+broker = EventBroker(create_backend())
+task_events.subscribe(broker.publish, blocking=broker.backend.blocking, with_events=True)
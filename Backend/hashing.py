@@ -0,0 +1,178 @@
+"""Hashing de contraseñas con bcrypt en un pool de procesos acotado.
+
+bcrypt consume ~250 ms de CPU por operación; ejecutarlo en el hilo de la
+petición deja sin hilos al resto de rutas durante una ráfaga de logins.
+Aquí cada operación se envía a un ProcessPoolExecutor con un límite de
+trabajos pendientes: si la cola está llena se responde 503 de inmediato.
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import bcrypt
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+from config import BCRYPT_ROUNDS, HASH_WORKERS, HASH_MAX_PENDING
+from metrics import BCRYPT_SECONDS, BCRYPT_WAIT_SECONDS
+
+
+class HashingBusyError(HTTPException):
+    """La cola de hashing está llena"""
+    def __init__(self):
+        super().__init__(
+            status_code=503,
+            detail="Servicio de autenticación saturado, intenta de nuevo",
+            headers={"Retry-After": "1"},
+        )
+
+
+# Funciones de nivel de módulo para que se puedan enviar a otro proceso
+
+def _hashpw(password: str, rounds: int) -> str:
+    salt = bcrypt.gensalt(rounds=rounds)
+    return bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
+
+
+def _checkpw(password: str, hashed_password: str) -> bool:
+    return bcrypt.checkpw(password.encode('utf-8'), hashed_password.encode('utf-8'))
+
+
+def _timed(fn, *args):
+    """Ejecuta fn en el worker y devuelve (resultado, inicio, fin) en tiempo de pared"""
+    started = time.time()
+    result = fn(*args)
+    return result, started, time.time()
+
+
+def _operation(fn) -> str:
+    return "hash" if fn is _hashpw else "verify"
+
+
+def get_rounds(hashed_password: str) -> int:
+    """Extrae el factor de coste de un hash bcrypt ($2b$12$...)"""
+    try:
+        return int(hashed_password.split('$')[2])
+    except (IndexError, ValueError):
+        return 0
+
+
+def needs_rehash(hashed_password: str) -> bool:
+    return get_rounds(hashed_password) != BCRYPT_ROUNDS
+
+
+class HashingPool:
+    """Pool de procesos para bcrypt con control de admisión y métricas"""
+
+    def __init__(self, workers=HASH_WORKERS, max_pending=HASH_MAX_PENDING):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        # Estadísticas
+        self._completed = 0
+        self._rejected = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._hash_total = 0.0
+        self._hash_max = 0.0
+
+    def _get_executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    def submit(self, fn, *args):
+        """Encola fn en el pool; lanza HashingBusyError si la cola está llena"""
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self._rejected += 1
+                raise HashingBusyError()
+            self._pending += 1
+        enqueued = time.time()
+        try:
+            future = self._get_executor().submit(_timed, fn, *args)
+        except Exception:
+            with self._lock:
+                self._pending -= 1
+            raise
+        future.add_done_callback(lambda f: self._record(f, enqueued, _operation(fn)))
+        return future
+
+    def _record(self, future, enqueued, operation):
+        with self._lock:
+            self._pending -= 1
+            if future.cancelled() or future.exception() is not None:
+                return
+            _, started, finished = future.result()
+            wait, took = max(0.0, started - enqueued), finished - started
+            BCRYPT_WAIT_SECONDS.observe(wait)
+            BCRYPT_SECONDS.observe(took, operation)
+            self._completed += 1
+            self._wait_total += wait
+            self._wait_max = max(self._wait_max, wait)
+            self._hash_total += took
+            self._hash_max = max(self._hash_max, took)
+
+    @staticmethod
+    def _run_inline(fn, *args):
+        result, started, finished = _timed(fn, *args)
+        BCRYPT_SECONDS.observe(finished - started, _operation(fn))
+        return result
+
+    def run(self, fn, *args):
+        """Ejecuta fn bloqueando el hilo actual hasta tener el resultado"""
+        if self.workers <= 0:
+            return self._run_inline(fn, *args)
+        return self.submit(fn, *args).result()[0]
+
+    async def run_async(self, fn, *args):
+        """Ejecuta fn sin bloquear el event loop (sin workers, en el threadpool)"""
+        if self.workers <= 0:
+            return await run_in_threadpool(self._run_inline, fn, *args)
+        result = await asyncio.wrap_future(self.submit(fn, *args))
+        return result[0]
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            done = self._completed
+            return {
+                "workers": self.workers,
+                "rounds": BCRYPT_ROUNDS,
+                "pending": self._pending,
+                "max_pending": self.max_pending,
+                "completed": done,
+                "rejected": self._rejected,
+                "queue_wait_avg_ms": round(self._wait_total / done * 1000, 3) if done else 0.0,
+                "queue_wait_max_ms": round(self._wait_max * 1000, 3),
+                "hash_time_avg_ms": round(self._hash_total / done * 1000, 3) if done else 0.0,
+                "hash_time_max_ms": round(self._hash_max * 1000, 3),
+            }
+
+
+hashing_pool = HashingPool()
+
+
+def hash_password(password: str) -> str:
+    return hashing_pool.run(_hashpw, password, BCRYPT_ROUNDS)
+
+
+def verify_password(password: str, hashed_password: str) -> bool:
+    return hashing_pool.run(_checkpw, password, hashed_password)
+
+
+async def hash_password_async(password: str) -> str:
+    return await hashing_pool.run_async(_hashpw, password, BCRYPT_ROUNDS)
+
+
+async def verify_password_async(password: str, hashed_password: str) -> bool:
+    return await hashing_pool.run_async(_checkpw, password, hashed_password)
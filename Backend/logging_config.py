@@ -0,0 +1,144 @@
+"""Configuración de logging: JSON estructurado, escritura en segundo plano y muestreo.
+
+- Los hilos de las peticiones solo encolan el LogRecord (QueueHandler); un
+  QueueListener en otro hilo lo formatea y escribe en stdout, así el I/O y el
+  formateo del mensaje (`logger.info("... %s", valor)`) salen del camino
+  crítico. Si la cola se llena, los registros se descartan y se cuentan.
+- LOG_LEVEL fija el nivel global y LOG_LEVELS niveles por logger
+  ("routes=WARNING,batch_routes=DEBUG"); con el nivel por defecto los logs
+  de depuración se descartan antes de construir el registro.
+- LOG_SAMPLE_RATES muestrea los registros INFO/DEBUG por logger o por ruta
+  ("routes.get_tasks_route=0.01,main=0.1"); WARNING y superiores nunca se
+  muestrean.
+- Los registros emitidos durante una petición llevan su `trace_id` (ver
+  metrics.py).
+"""
+import json
+import logging
+import logging.handlers
+import queue
+import random
+from datetime import datetime, timezone
+
+from config import LOG_LEVEL, LOG_LEVELS, LOG_FORMAT, LOG_SAMPLE_RATES, LOG_QUEUE_SIZE
+from metrics import trace_id_var
+
+# Atributos estándar de LogRecord; el resto se considera contexto estructurado (extra=)
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "taskName"}
+
+
+def _parse_pairs(value: str) -> dict:
+    """Convierte "a=1,b=2" en {"a": "1", "b": "2"}"""
+    pairs = {}
+    for item in (value or "").split(","):
+        if "=" in item:
+            key, _, val = item.partition("=")
+            pairs[key.strip()] = val.strip()
+    return pairs
+
+
+class JsonFormatter(logging.Formatter):
+    """Una línea JSON por registro con los campos de `extra=` incluidos"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "func": record.funcName,
+            "msg": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """Deja pasar una fracción de los registros INFO/DEBUG según logger o logger.función"""
+
+    def __init__(self, rates: dict):
+        super().__init__()
+        # Las claves más específicas (más largas) primero
+        self.rates = sorted(((key, float(rate)) for key, rate in rates.items()), key=lambda kv: -len(kv[0]))
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or not self.rates:
+            return True
+        target = f"{record.name}.{record.funcName}"
+        for key, rate in self.rates:
+            if target == key or target.startswith(key + "."):
+                return rate >= 1 or random.random() < rate
+        return True
+
+
+class TraceFilter(logging.Filter):
+    """Añade el trace_id de la petición en curso (metrics.MetricsMiddleware) a cada registro"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        trace_id = trace_id_var.get()
+        if trace_id is not None:
+            record.trace_id = trace_id
+        return True
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler que no formatea en el hilo que registra y descarta si la cola está llena"""
+
+    dropped = 0
+
+    def prepare(self, record):
+        # El mensaje se formatea en el hilo del listener (los args quedan intactos)
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            NonBlockingQueueHandler.dropped += 1
+
+
+_listener = None
+
+
+def setup_logging():
+    """Instala el handler en cola en el logger raíz (idempotente)"""
+    global _listener
+    if _listener is not None:
+        return
+
+    output = logging.StreamHandler()
+    if LOG_FORMAT == "json":
+        output.setFormatter(JsonFormatter())
+    else:
+        output.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+
+    log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    handler = NonBlockingQueueHandler(log_queue)
+    handler.addFilter(SamplingFilter(_parse_pairs(LOG_SAMPLE_RATES)))
+    handler.addFilter(TraceFilter())  # en el hilo que registra, donde vive el contextvar
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(LOG_LEVEL)
+    for name, level in _parse_pairs(LOG_LEVELS).items():
+        logging.getLogger(name).setLevel(level.upper())
+
+    _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+
+
+def shutdown_logging():
+    """Vacía la cola y detiene el hilo escritor"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def get_logging_stats() -> dict:
+    return {"dropped": NonBlockingQueueHandler.dropped}
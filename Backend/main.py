@@ -1,28 +1,112 @@
-from fastapi import FastAPI, Header, HTTPException, Depends
+from fastapi import FastAPI, Header, HTTPException, Depends, Query, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from models import Task, TaskCreate, TaskUpdate, UserCreate, UserLogin, UserResponse
-from routes import (
-    get_tasks_route,
-    create_task_route,
-    get_task_route,
-    update_task_route,
-    delete_task_route
-)
-from auth_routes import (
-    register_user_route,
-    login_user_route,
-    verify_user_token_route,
-    verify_token as verify_jwt_token
-)
+from models import Task, TaskListItem, TaskSearchResult, TaskStats, TaskChanges, TaskCreate, TaskUpdate, BatchRequest, BatchResponse, UserCreate, UserLogin, UserResponse
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from config import DB_MODE, TASKS_PAGE_MAX_LIMIT, SYNC_PURGE_INTERVAL, REMINDERS_ENABLED, METRICS_ENABLED, THREADPOOL_SIZE, DB_MIGRATE_ON_STARTUP, WRITE_BEHIND_ENABLED, ARCHIVE_INTERVAL
+from auth_routes import verify_token as verify_jwt_token, get_auth_cache_stats
+from batch_routes import batch_tasks_route
+from search_routes import search_tasks_route, get_search_stats
+from stats_routes import get_task_stats_route
+from sync_routes import get_changes_route, purge_tombstones_periodically
+from archive import archive_periodically
+from event_broker import broker
+from reminders import scheduler
+from serialization import FastJSONResponse, dumps
+import task_cache
+from database import close_pool, get_pool_stats, get_pool_waiting
+from hashing import hashing_pool
+from migrate import migrate
+from logging_config import setup_logging, shutdown_logging, get_logging_stats
+import metrics
+from rate_limit import RateLimitMiddleware, limiter
+from response_compression import CompressionMiddleware
+from write_behind import writer
+from contextlib import asynccontextmanager
+from inspect import iscoroutinefunction
+from datetime import date
 from typing import List, Optional
+import anyio.to_thread
+import asyncio
 import logging
 
-# Configurar logging
-logging.basicConfig(level=logging.INFO)
+# Seleccionar la capa de datos según DB_MODE
+if DB_MODE == "async":
+    from async_database import init_async_pool, close_async_pool, get_async_pool_stats, get_async_pool_waiting
+    from async_routes import (
+        get_tasks_route,
+        create_task_route,
+        get_task_route,
+        update_task_route,
+        delete_task_route,
+        export_tasks_route,
+        register_user_route,
+        login_user_route,
+        verify_user_token_route
+    )
+else:
+    from routes import (
+        get_tasks_route,
+        create_task_route,
+        get_task_route,
+        update_task_route,
+        delete_task_route,
+        export_tasks_route
+    )
+    from auth_routes import (
+        register_user_route,
+        login_user_route,
+        verify_user_token_route
+    )
+
+# Configurar logging (JSON, en cola y con muestreo; ver logging_config.py)
+setup_logging()
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="Todo API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Hilos de run_in_threadpool: más hilos que conexiones solo esperarían en el pool
+    threadpool = anyio.to_thread.current_default_thread_limiter()
+    threadpool.total_tokens = THREADPOOL_SIZE
+    app.state.threadpool = threadpool
+    if DB_MIGRATE_ON_STARTUP:
+        await run_in_threadpool(migrate)
+    if DB_MODE == "async":
+        await init_async_pool()
+    broker.start(asyncio.get_running_loop())
+    if REMINDERS_ENABLED:
+        scheduler.start(asyncio.get_running_loop())
+    if WRITE_BEHIND_ENABLED:
+        writer.start()
+    purge_task = asyncio.create_task(purge_tombstones_periodically()) if SYNC_PURGE_INTERVAL > 0 else None
+    archive_task = asyncio.create_task(archive_periodically()) if ARCHIVE_INTERVAL > 0 else None
+    yield
+    if purge_task:
+        purge_task.cancel()
+    if archive_task:
+        archive_task.cancel()
+    scheduler.stop()
+    await run_in_threadpool(writer.stop)  # join del hilo: espera al último commit agrupado
+    broker.stop()
+    # Cerrar las conexiones del pool al apagar
+    if DB_MODE == "async":
+        await close_async_pool()
+    close_pool()
+    hashing_pool.shutdown()
+    shutdown_logging()
+
+app = FastAPI(title="Todo API", lifespan=lifespan, default_response_class=FastJSONResponse)
+
+def db_backlog() -> int:
+    """Peticiones esperando una conexión a MySQL; en modo sync también las que esperan un hilo (cada hilo presta una)"""
+    if DB_MODE == "async":
+        return get_async_pool_waiting()
+    return get_pool_waiting() + app.state.threadpool.statistics().tasks_waiting
+
+# Límites por usuario/IP y load shedding; dentro de CORS para que los 429/503 lleven sus cabeceras
+if limiter.limits or limiter.max_in_flight or limiter.max_db_backlog:
+    app.add_middleware(RateLimitMiddleware, db_backlog=db_backlog)
 
 # Configurar CORS
 app.add_middleware(
@@ -35,19 +119,72 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "X-Trace-Id", "Retry-After"],
 )
 
+# Compresión y Cache-Control/Vary; fuera de CORS y dentro de métricas (que mide los bytes enviados)
+app.add_middleware(CompressionMiddleware)
+
+# Métricas y traza por petición (el último middleware añadido es el más externo)
+if METRICS_ENABLED:
+    app.add_middleware(metrics.MetricsMiddleware)
+
 # Configurar seguridad Bearer
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
 
 @app.get("/")
 def read_root():
     return {"message": "Bienvenido a la API de ToDo"}
 
-def get_user_id_from_token(credentials: HTTPAuthorizationCredentials = Depends(security)) -> int:
-    """Extrae el user_id del token JWT del header Authorization"""
+@app.get("/health")
+def health():
+    """Estado del servicio y estadísticas de pools y cachés"""
+    pool_stats = get_async_pool_stats() if DB_MODE == "async" else get_pool_stats()
+    return {
+        "status": "ok",
+        "db_mode": DB_MODE,
+        "db_pool": pool_stats,
+        "sync_pool": get_pool_stats() if DB_MODE == "async" else None,
+        "threadpool": {"size": app.state.threadpool.total_tokens, "busy": app.state.threadpool.borrowed_tokens},
+        "hashing": hashing_pool.stats(),
+        "auth_cache": get_auth_cache_stats(),
+        "logging": get_logging_stats(),
+        "task_cache": task_cache.get_task_cache_stats(),
+        "rate_limit": limiter.stats(),
+        "write_behind": writer.stats() if WRITE_BEHIND_ENABLED else None,
+        "search": get_search_stats(),
+        "events": broker.stats(),
+        "reminders": scheduler.stats(),
+    }
+
+def pool_connections() -> dict:
+    stats = get_async_pool_stats() if DB_MODE == "async" else get_pool_stats()
+    return {(state,): stats[state] for state in ("open", "in_use", "idle", "waiting")}
+
+metrics.Gauge("db_pool_connections", "Conexiones del pool por estado", ("state",), function=pool_connections)
+metrics.Gauge("hashing_pending", "Operaciones de bcrypt en cola o en curso",
+              function=lambda: hashing_pool.stats()["pending"])
+metrics.Gauge("write_behind_pending", "Escrituras en cola esperando su commit agrupado",
+              function=lambda: writer.stats()["pending"])
+metrics.Gauge("sse_connections", "Conexiones abiertas en GET /tasks/stream",
+              function=lambda: broker.stats()["connections"])
+
+if METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    def get_metrics():
+        """Métricas en formato de texto de Prometheus"""
+        return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+async def call_route(route, *args):
+    """Ejecuta una ruta: las async se esperan en el event loop, las sync van al threadpool"""
+    if iscoroutinefunction(route):
+        return await route(*args)
+    return await run_in_threadpool(route, *args)
+
+def user_id_from_token(token: str) -> int:
+    """Verifica el JWT y devuelve su user_id (401 si no es válido)"""
     try:
-        token = credentials.credentials
         payload = verify_jwt_token(token)
         user_id = payload.get("user_id")
         
@@ -55,100 +192,209 @@ def get_user_id_from_token(credentials: HTTPAuthorizationCredentials = Depends(s
             logger.error("Token no contiene user_id")
             raise HTTPException(status_code=401, detail="Token inválido")
         
-        logger.info(f"✅ Token válido para user_id: {user_id}")
+        logger.debug("✅ Token válido para user_id: %s", user_id)
         return user_id
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"❌ Error al verificar token: {str(e)}")
+        logger.error("❌ Error al verificar token: %s", e)
         raise HTTPException(status_code=401, detail="Token inválido o expirado")
 
+async def get_user_id_from_token(credentials: HTTPAuthorizationCredentials = Depends(security)) -> int:
+    """Extrae el user_id del token JWT del header Authorization"""
+    return user_id_from_token(credentials.credentials)
+
+async def get_stream_user_id(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security),
+    access_token: Optional[str] = Query(None)
+) -> int:
+    """Como get_user_id_from_token, pero acepta ?access_token= (EventSource no permite cabeceras)"""
+    token = credentials.credentials if credentials else access_token
+    if not token:
+        raise HTTPException(status_code=403, detail="Not authenticated")
+    return user_id_from_token(token)
+
 # ===== RUTAS DE TAREAS =====
 
-@app.get("/tasks", response_model=List[Task])
-def get_tasks(
+@app.get("/tasks", response_model=List[TaskListItem], response_model_exclude_unset=True)
+async def get_tasks(
     completed: Optional[bool] = None, 
     priority: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=TASKS_PAGE_MAX_LIMIT),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    include_archived: bool = False,
+    if_none_match: Optional[str] = Header(None),
     user_id: int = Depends(get_user_id_from_token)
 ):
-    return get_tasks_route(user_id, completed, priority)
+    # Caché por usuario: 304 si el cliente ya tiene esta versión, o el JSON ya serializado
+    key, etag, cached = await task_cache.run(
+        task_cache.lookup, user_id, (completed, priority, limit, cursor, fields, include_archived)
+    )
+    if task_cache.etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    
+    if cached:
+        body, next_cursor = cached
+    else:
+        tasks, next_cursor = await call_route(get_tasks_route, user_id, completed, priority, limit, cursor, fields,
+                                              include_archived)
+        body = dumps(tasks)
+        await task_cache.run(task_cache.store, key, body, next_cursor)
+    
+    headers = {}
+    if etag:
+        headers["ETag"] = etag
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+    return Response(content=body, media_type="application/json", headers=headers)
 
 @app.post("/tasks", response_model=Task)
-def create_task(
+async def create_task(
     task: TaskCreate,
     user_id: int = Depends(get_user_id_from_token)
 ):
     try:
-        logger.info(f"📝 Creando tarea para user_id: {user_id}")
-        result = create_task_route(user_id, task)
-        logger.info(f"✅ Tarea creada exitosamente")
-        return result
+        logger.debug("📝 Creando tarea para user_id: %s", user_id)
+        if WRITE_BEHIND_ENABLED:
+            result = await writer.create(user_id, task)
+        else:
+            result = await call_route(create_task_route, user_id, task)
+        return FastJSONResponse(result)
     except Exception as e:
-        logger.error(f"❌ Error al crear tarea: {str(e)}")
+        logger.error("❌ Error al crear tarea: %s", e)
         raise
 
+@app.post("/tasks/batch", response_model=BatchResponse)
+async def batch_tasks(
+    request: BatchRequest,
+    user_id: int = Depends(get_user_id_from_token)
+):
+    """Crea, actualiza, completa y elimina varias tareas en una sola transacción"""
+    return FastJSONResponse(await call_route(batch_tasks_route, user_id, request))
+
+@app.get("/tasks/search", response_model=List[TaskSearchResult])
+async def search_tasks(
+    q: str = Query(..., min_length=1, max_length=200),
+    completed: Optional[bool] = None,
+    priority: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=TASKS_PAGE_MAX_LIMIT),
+    cursor: Optional[str] = None,
+    user_id: int = Depends(get_user_id_from_token)
+):
+    """Busca por texto en título y descripción, ordenado por relevancia"""
+    tasks, next_cursor = await call_route(search_tasks_route, user_id, q, completed, priority, limit, cursor)
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else None
+    return FastJSONResponse(tasks, headers=headers)
+
+@app.get("/tasks/stats", response_model=TaskStats)
+async def get_task_stats(
+    today: Optional[date] = None,
+    user_id: int = Depends(get_user_id_from_token)
+):
+    """Conteos por estado, prioridad, vencidas y que vencen esta semana (today = fecha local del cliente)"""
+    return FastJSONResponse(await call_route(get_task_stats_route, user_id, today))
+
+@app.get("/tasks/changes", response_model=TaskChanges)
+async def get_task_changes(
+    since: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=TASKS_PAGE_MAX_LIMIT),
+    user_id: int = Depends(get_user_id_from_token)
+):
+    """Tareas creadas/actualizadas y borradas desde la marca `since` (sin marca: todas)"""
+    return FastJSONResponse(await call_route(get_changes_route, user_id, since, limit))
+
+@app.get("/tasks/stream")
+async def stream_tasks(
+    last_event_id: Optional[str] = Header(None),
+    user_id: int = Depends(get_stream_user_id)
+):
+    """Canal Server-Sent Events con los cambios de tareas del usuario (created/updated/deleted)"""
+    if not broker.backend.enabled:
+        raise HTTPException(status_code=503, detail="Notificaciones desactivadas (TASK_EVENTS_BACKEND=none): "
+                                                    "usa GET /tasks/changes")
+    return StreamingResponse(
+        broker.stream(user_id, last_event_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "json": "application/json"}
+
+@app.get("/tasks/export")
+async def export_tasks(
+    format: str = Query("ndjson", pattern="^(ndjson|json)$"),
+    user_id: int = Depends(get_user_id_from_token)
+):
+    """Descarga todas las tareas del usuario en streaming (NDJSON o array JSON)"""
+    return StreamingResponse(
+        export_tasks_route(user_id, format),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="tasks.{format}"'},
+    )
+
 @app.get("/tasks/{task_id}", response_model=Task)
-def get_task(
+async def get_task(
     task_id: int,
     user_id: int = Depends(get_user_id_from_token)
 ):
-    return get_task_route(user_id, task_id)
+    return FastJSONResponse(await call_route(get_task_route, user_id, task_id))
 
 @app.put("/tasks/{task_id}", response_model=Task)
-def update_task(
+async def update_task(
     task_id: int, 
     task: TaskUpdate,
     user_id: int = Depends(get_user_id_from_token)
 ):
-    return update_task_route(user_id, task_id, task)
+    if WRITE_BEHIND_ENABLED:
+        return FastJSONResponse(await writer.update(user_id, task_id, task))
+    return FastJSONResponse(await call_route(update_task_route, user_id, task_id, task))
 
 @app.delete("/tasks/{task_id}")
-def delete_task(
+async def delete_task(
     task_id: int,
     user_id: int = Depends(get_user_id_from_token)
 ):
-    return delete_task_route(user_id, task_id)
+    if WRITE_BEHIND_ENABLED:
+        return await writer.delete(user_id, task_id)
+    return await call_route(delete_task_route, user_id, task_id)
 
 # ===== RUTAS DE AUTENTICACIÓN =====
 
 @app.post("/auth/register", response_model=UserResponse)
-def register(user: UserCreate):
+async def register(user: UserCreate):
     try:
-        logger.info(f"📨 Intento de registro para: {user.email}")
-        result = register_user_route(user)
-        logger.info(f"✅ Usuario registrado exitosamente: ID {result.id}")
+        logger.debug("📨 Intento de registro para: %s", user.email)
+        result = await call_route(register_user_route, user)
+        logger.info("✅ Usuario registrado exitosamente: ID %s", result.id)
         return result
     except HTTPException as e:
-        logger.error(f"❌ HTTPException en registro: {e.status_code} - {e.detail}")
+        logger.warning("❌ HTTPException en registro: %s - %s", e.status_code, e.detail)
         raise e
     except Exception as e:
-        logger.error(f"❌ Error inesperado en registro: {str(e)}")
-        import traceback
-        logger.error(traceback.format_exc())
+        logger.exception("❌ Error inesperado en registro: %s", e)
         raise HTTPException(status_code=500, detail=f"Error interno del servidor: {str(e)}")
 
 @app.post("/auth/login", response_model=UserResponse)
-def login(user: UserLogin):
+async def login(user: UserLogin):
     try:
-        logger.info(f"📨 Intento de login para: {user.email}")
-        result = login_user_route(user)
-        logger.info(f"✅ Login exitoso: {user.email}")
+        logger.debug("📨 Intento de login para: %s", user.email)
+        result = await call_route(login_user_route, user)
+        logger.info("✅ Login exitoso: %s", user.email)
         return result
     except HTTPException as e:
-        logger.error(f"❌ HTTPException en login: {e.status_code} - {e.detail}")
+        logger.warning("❌ HTTPException en login: %s - %s", e.status_code, e.detail)
         raise e
     except Exception as e:
-        logger.error(f"❌ Error inesperado en login: {str(e)}")
-        import traceback
-        logger.error(traceback.format_exc())
+        logger.exception("❌ Error inesperado en login: %s", e)
         raise HTTPException(status_code=500, detail=f"Error interno del servidor: {str(e)}")
 
 @app.post("/auth/verify")
-def verify_user_token_endpoint(token: str):
+async def verify_user_token_endpoint(token: str):
     try:
-        return verify_user_token_route(token)
+        return await call_route(verify_user_token_route, token)
     except HTTPException as e:
         raise e
     except Exception as e:
-        logger.error(f"❌ Error en verificación de token: {str(e)}")
+        logger.error("❌ Error en verificación de token: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,436 @@
+"""Métricas de rendimiento en formato Prometheus (GET /metrics) y traza por petición.
+
+Contadores e histogramas propios, sin dependencias; cada worker expone los
+suyos y Prometheus los agrega por instancia.
+
+- MetricsMiddleware (ASGI): latencia por endpoint (plantilla de la ruta,
+  p. ej. /tasks/{task_id}), método y código, tamaño de la respuesta y
+  peticiones en curso.
+- Capa de datos: db_connection() y async_db_connection() entregan la
+  conexión envuelta y cada execute() se mide por sentencia ("SELECT tasks",
+  "UPDATE tasks"...) con las filas leídas o afectadas. El tiempo es el de
+  execute(): hasta que MySQL empieza a devolver filas. Con
+  DB_SLOW_QUERY_MS > 0 las consultas más lentas se registran con su SQL.
+- Etapas: verificación del JWT (con y sin caché), bcrypt (cola y cálculo),
+  espera de una conexión del pool, aperturas y cierres de conexiones y
+  serialización JSON.
+- Traza: cada petición lleva un trace_id (el de la cabecera `traceparent`
+  del cliente o uno nuevo) y un span_id en contextvars, que acompañan a la
+  ruta también en el threadpool. Aparecen en los logs y se devuelven en las
+  cabeceras `traceparent` y `X-Trace-Id`.
+"""
+from bisect import bisect_left
+from contextvars import ContextVar
+from functools import lru_cache
+from time import perf_counter
+from typing import Optional
+import logging
+import os
+import re
+import threading
+
+from config import DB_SLOW_QUERY_MS
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+FAST_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+SIZE_BUCKETS = (128, 512, 2048, 8192, 32768, 131072, 524288, 2097152, 8388608)
+
+_registry = []
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._lock = threading.Lock()
+        self._values = {}
+        _registry.append(self)
+
+    def _labels(self, values: tuple, extra: tuple = ()) -> str:
+        pairs = [*zip(self.labelnames, values), *extra]
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted((labels, self._copy(value)) for labels, value in self._values.items())
+        for labels, value in items:
+            lines.extend(self._samples(labels, value))
+        return lines
+
+    @staticmethod
+    def _copy(value):
+        return value
+
+    def _samples(self, labels: tuple, value) -> list:
+        return [f"{self.name}{self._labels(labels)} {value}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+
+class Gauge(_Metric):
+    """Valor que sube y baja; con `function` se calcula al exponerlo ({labels: valor} o un número)"""
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), function=None):
+        super().__init__(name, documentation, labelnames)
+        self._function = function
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, *labels, amount: float = 1):
+        self.inc(*labels, amount=-amount)
+
+    def render(self) -> list:
+        if self._function is not None:
+            try:
+                values = self._function()
+            except Exception as e:
+                logger.debug("No se pudo calcular %s: %s", self.name, e)
+                values = {}
+            with self._lock:
+                self._values = values if isinstance(values, dict) else {(): values}
+        return super().render()
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, *labels):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                # [conteos por bucket (no acumulados; el último es +Inf), suma]
+                state = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][index] += 1
+            state[1] += value
+
+    @staticmethod
+    def _copy(value):
+        return list(value[0]), value[1]
+
+    def _samples(self, labels: tuple, value) -> list:
+        counts, total = value
+        lines = []
+        cumulative = 0
+        for bound, count in zip((*self.buckets, "+Inf"), counts):
+            cumulative += count
+            lines.append(f"{self.name}_bucket{self._labels(labels, (('le', bound),))} {cumulative}")
+        lines.append(f"{self.name}_sum{self._labels(labels)} {total}")
+        lines.append(f"{self.name}_count{self._labels(labels)} {cumulative}")
+        return lines
+
+
+def render() -> bytes:
+    """Todas las métricas en el formato de texto de Prometheus"""
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+# ===== MÉTRICAS =====
+
+REQUEST_SECONDS = Histogram("http_request_duration_seconds", "Latencia de las peticiones HTTP",
+                            ("method", "route", "status"))
+RESPONSE_BYTES = Histogram("http_response_size_bytes", "Tamaño del cuerpo de las respuestas",
+                           ("route",), SIZE_BUCKETS)
+REQUESTS_IN_FLIGHT = Gauge("http_requests_in_flight", "Peticiones en curso")
+RATE_LIMITED = Counter("http_rate_limited_total", "Peticiones rechazadas con 429 por presupuesto agotado",
+                       ("route_class", "scope"))
+SHED_REQUESTS = Counter("http_shed_total", "Peticiones rechazadas con 503 por sobrecarga", ("reason",))
+
+QUERY_SECONDS = Histogram("db_query_duration_seconds", "Duración de execute() por sentencia",
+                          ("statement",), FAST_BUCKETS)
+QUERY_ROWS = Counter("db_query_rows_total", "Filas leídas o afectadas por sentencia", ("statement",))
+SLOW_QUERIES = Counter("db_slow_queries_total", "Consultas por encima de DB_SLOW_QUERY_MS", ("statement",))
+POOL_WAIT_SECONDS = Histogram("db_pool_wait_seconds", "Espera hasta obtener una conexión del pool",
+                              buckets=FAST_BUCKETS)
+CONNECTIONS_OPENED = Counter("db_connections_opened_total", "Conexiones a MySQL abiertas por el pool")
+CONNECTIONS_CLOSED = Counter("db_connections_closed_total", "Conexiones a MySQL cerradas por el pool")
+
+JWT_SECONDS = Histogram("auth_jwt_verify_seconds", "Verificación de tokens JWT", ("cache",), FAST_BUCKETS)
+BCRYPT_SECONDS = Histogram("auth_bcrypt_seconds", "Tiempo de cálculo de bcrypt", ("operation",))
+BCRYPT_WAIT_SECONDS = Histogram("auth_bcrypt_queue_wait_seconds", "Espera en la cola del pool de bcrypt")
+WRITE_BEHIND_BATCH = Histogram("write_behind_batch_operations", "Operaciones aplicadas por commit agrupado",
+                               buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500, 1000))
+WRITE_BEHIND_LATENCY = Histogram("write_behind_latency_seconds", "Desde que se encola una escritura hasta su commit")
+WRITE_BEHIND_FLUSH_SECONDS = Histogram("write_behind_flush_seconds", "Duración de la transacción de cada grupo")
+WRITE_BEHIND_MERGED = Counter("write_behind_merged_total", "Actualizaciones fusionadas con otra de la misma tarea")
+SERIALIZE_SECONDS = Histogram("serialization_seconds", "Serialización de respuestas JSON", buckets=FAST_BUCKETS)
+
+
+# ===== TRAZA =====
+
+trace_id_var: ContextVar[Optional[str]] = ContextVar("trace_id", default=None)
+span_id_var: ContextVar[Optional[str]] = ContextVar("span_id", default=None)
+
+_TRACEPARENT = re.compile(r"^[0-9a-f]{2}-([0-9a-f]{32})-[0-9a-f]{16}-[0-9a-f]{2}$")
+
+
+def parse_traceparent(value: Optional[bytes]) -> Optional[str]:
+    """trace_id de una cabecera W3C traceparent, o None si no es válida"""
+    if not value:
+        return None
+    match = _TRACEPARENT.match(value.decode("latin-1").strip().lower())
+    if match is None or match.group(1) == "0" * 32:
+        return None
+    return match.group(1)
+
+
+def current_trace_id() -> Optional[str]:
+    return trace_id_var.get()
+
+
+class MetricsMiddleware:
+    """Middleware ASGI: traza de la petición, latencia y tamaño de la respuesta por endpoint"""
+
+    def __init__(self, app):
+        self.app = app
+        self._routes = None  # endpoint -> plantilla de la ruta
+
+    def _route(self, scope) -> str:
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "unmatched"  # 404 y similares: una sola serie, no una por URL
+        if self._routes is None:
+            self._routes = {route.endpoint: route.path for route in scope["app"].router.routes
+                            if hasattr(route, "endpoint")}
+        return self._routes.get(endpoint, "unmatched")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        headers = dict(scope["headers"])
+        trace_id = parse_traceparent(headers.get(b"traceparent")) or os.urandom(16).hex()
+        span_id = os.urandom(8).hex()
+        trace_token = trace_id_var.set(trace_id)
+        span_token = span_id_var.set(span_id)
+        status = 500
+        size = 0
+
+        async def send_wrapper(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message["headers"] = [
+                    *message.get("headers", ()),
+                    (b"traceparent", f"00-{trace_id}-{span_id}-01".encode()),
+                    (b"x-trace-id", trace_id.encode()),
+                ]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        REQUESTS_IN_FLIGHT.inc()
+        start = perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = perf_counter() - start
+            REQUESTS_IN_FLIGHT.dec()
+            route = self._route(scope)
+            REQUEST_SECONDS.observe(elapsed, scope["method"], route, str(status))
+            RESPONSE_BYTES.observe(size, route)
+            span_id_var.reset(span_token)
+            trace_id_var.reset(trace_token)
+
+
+# ===== CAPA DE DATOS =====
+
+_TABLE = re.compile(r"\b(?:FROM|INTO)\s+`?(\w+)", re.IGNORECASE)
+_SLOW_QUERY_SECONDS = DB_SLOW_QUERY_MS / 1000
+
+
+@lru_cache(maxsize=2048)
+def statement_label(query: str) -> str:
+    """Etiqueta de baja cardinalidad para una sentencia: verbo y primera tabla"""
+    words = query.split(None, 2)
+    if not words:
+        return "OTHER"
+    verb = words[0].upper()
+    if verb == "UPDATE" and len(words) > 1:
+        table = words[1].strip("`")
+    else:
+        match = _TABLE.search(query)
+        table = match.group(1) if match else ""
+    return f"{verb} {table}".strip()
+
+
+def observe_query(query, seconds: float, rows: Optional[int] = None) -> str:
+    label = statement_label(query if isinstance(query, str) else query.decode("utf-8", "replace"))
+    QUERY_SECONDS.observe(seconds, label)
+    if rows is not None and rows >= 0:
+        QUERY_ROWS.inc(label, amount=rows)
+    if _SLOW_QUERY_SECONDS and seconds >= _SLOW_QUERY_SECONDS:
+        SLOW_QUERIES.inc(label)
+        logger.warning("🐢 Consulta lenta (%.1f ms): %s", seconds * 1000, " ".join(str(query).split())[:500],
+                       extra={"statement": label})
+    return label
+
+
+def _affected_rows(cursor) -> Optional[int]:
+    """Filas afectadas de un INSERT/UPDATE/DELETE; None si hay filas que leer (se cuentan al leerlas)"""
+    return cursor.rowcount if cursor.description is None else None
+
+
+class InstrumentedCursor:
+    """Cursor de mysql-connector que mide cada execute() y cuenta las filas leídas"""
+    __slots__ = ("_cursor", "_label")
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self._label = "OTHER"
+
+    def execute(self, query, *args, **kwargs):
+        start = perf_counter()
+        try:
+            return self._cursor.execute(query, *args, **kwargs)
+        finally:
+            self._label = observe_query(query, perf_counter() - start, _affected_rows(self._cursor))
+
+    def executemany(self, query, *args, **kwargs):
+        start = perf_counter()
+        try:
+            return self._cursor.executemany(query, *args, **kwargs)
+        finally:
+            self._label = observe_query(query, perf_counter() - start, _affected_rows(self._cursor))
+
+    def _count(self, rows):
+        if rows:
+            QUERY_ROWS.inc(self._label, amount=len(rows))
+        return rows
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        if row is not None:
+            QUERY_ROWS.inc(self._label)
+        return row
+
+    def fetchmany(self, *args, **kwargs):
+        return self._count(self._cursor.fetchmany(*args, **kwargs))
+
+    def fetchall(self):
+        return self._count(self._cursor.fetchall())
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class InstrumentedConnection:
+    """Conexión de mysql-connector cuyos cursores se miden; el resto se delega"""
+    __slots__ = ("_connection",)
+
+    def __init__(self, connection):
+        self._connection = connection
+
+    def cursor(self, *args, **kwargs):
+        return InstrumentedCursor(self._connection.cursor(*args, **kwargs))
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+
+class AsyncInstrumentedCursor:
+    """Como InstrumentedCursor, para los cursores de aiomysql"""
+    __slots__ = ("_cursor", "_label")
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self._label = "OTHER"
+
+    async def execute(self, query, *args, **kwargs):
+        start = perf_counter()
+        try:
+            return await self._cursor.execute(query, *args, **kwargs)
+        finally:
+            self._label = observe_query(query, perf_counter() - start, _affected_rows(self._cursor))
+
+    async def executemany(self, query, *args, **kwargs):
+        start = perf_counter()
+        try:
+            return await self._cursor.executemany(query, *args, **kwargs)
+        finally:
+            self._label = observe_query(query, perf_counter() - start, _affected_rows(self._cursor))
+
+    async def fetchone(self):
+        row = await self._cursor.fetchone()
+        if row is not None:
+            QUERY_ROWS.inc(self._label)
+        return row
+
+    async def fetchmany(self, *args, **kwargs):
+        rows = await self._cursor.fetchmany(*args, **kwargs)
+        if rows:
+            QUERY_ROWS.inc(self._label, amount=len(rows))
+        return rows
+
+    async def fetchall(self):
+        rows = await self._cursor.fetchall()
+        if rows:
+            QUERY_ROWS.inc(self._label, amount=len(rows))
+        return rows
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class _AsyncCursorContext:
+    """`async with connection.cursor(...) as cursor` con el cursor instrumentado"""
+    __slots__ = ("_connection", "_args", "_cursor")
+
+    def __init__(self, connection, args):
+        self._connection = connection
+        self._args = args
+        self._cursor = None
+
+    async def __aenter__(self):
+        self._cursor = await self._connection.cursor(*self._args)
+        return AsyncInstrumentedCursor(self._cursor)
+
+    async def __aexit__(self, *exc_info):
+        await self._cursor.close()
+
+
+class AsyncInstrumentedConnection:
+    """Conexión de aiomysql cuyos cursores se miden; el resto se delega"""
+    __slots__ = ("_connection",)
+
+    def __init__(self, connection):
+        self._connection = connection
+
+    def cursor(self, *args):
+        return _AsyncCursorContext(self._connection, args)
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
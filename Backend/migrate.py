@@ -0,0 +1,303 @@
+"""Migraciones versionadas del esquema: BD/migrations/NNNN_nombre.sql.
+
+Cada archivo se aplica una vez, en orden de versión, y queda registrado en
+la tabla schema_migrations junto con el sha256 de su contenido (si un
+archivo ya aplicado cambia, se avisa). Las sentencias se separan por `;` al
+final de línea y se ejecutan de una en una: en MySQL el DDL no es
+transaccional, así que una migración a medias se puede volver a lanzar; los
+errores de "ya existe" / "no existe" de tablas, columnas e índices
+(IDEMPOTENT_ERRORS) se registran y se continúa.
+
+Se aplican desde la línea de comandos o al arrancar la API con
+DB_MIGRATE_ON_STARTUP=true. Un GET_LOCK de MySQL serializa a los workers de
+serve.py que arrancan a la vez.
+
+    python migrate.py             # aplica las pendientes
+    python migrate.py --status    # lista aplicadas y pendientes
+    python migrate.py --explain   # EXPLAIN de las consultas de routes.py y auth_routes.py
+
+La migración 0000 lleva una base creada con el schema.sql original (sin
+contadores, lápidas, recordatorios ni índice FULLTEXT) al esquema del que
+parten las demás.
+
+--explain falla (código de salida 1) si alguna consulta recorre la tabla
+entera o necesita filesort. Conviene lanzarlo contra una base con datos
+representativos (p. ej. tras `benchmarks/bench_load.py --keep`): con tablas
+casi vacías el optimizador puede preferir un recorrido completo.
+"""
+from database import _create_connection
+from mysql.connector import Error
+from routes import (
+    ARCHIVED_TASK_BY_ID_QUERY,
+    DELETE_TASK_QUERY,
+    TASK_BY_ID_QUERY,
+    TASK_TIMESTAMPS_QUERY,
+    build_tasks_queries,
+    build_update_query,
+    encode_cursor,
+    utc_now,
+)
+from auth_routes import (
+    UPDATE_PASSWORD_QUERY,
+    USER_ID_BY_EMAIL_QUERY,
+    USER_ID_BY_USERNAME_QUERY,
+    USER_LOGIN_QUERY,
+    USER_PROFILE_QUERY,
+)
+from models import TaskUpdate
+from sync_routes import build_changes_queries
+import argparse
+import hashlib
+import logging
+import os
+import re
+import sys
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "BD", "migrations")
+MIGRATION_FILE = re.compile(r"^(\d+)_(\w+)\.sql$")
+LOCK_NAME = "todo_schema_migrations"
+LOCK_TIMEOUT = 300  # segundos esperando a que otro proceso termine de migrar
+
+# 1050 tabla ya existe, 1060 columna duplicada, 1061 índice duplicado, 1091 no se puede eliminar (no existe)
+IDEMPOTENT_ERRORS = {1050, 1060, 1061, 1091}
+
+# EXPLAIN sin índice que no cuenta como fallo: la fila buscada por clave no existe
+NO_ROW_NOTES = ("no matching row in const table", "Impossible WHERE", "const row not found")
+
+CREATE_MIGRATIONS_TABLE = """CREATE TABLE IF NOT EXISTS schema_migrations (
+    version INT PRIMARY KEY,
+    name VARCHAR(255) NOT NULL,
+    checksum CHAR(64) NOT NULL,
+    applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+)"""
+
+
+def split_statements(sql: str) -> list:
+    """Sentencias de un archivo .sql: sin comentarios `--` y separadas por `;` al final de línea"""
+    lines = [line for line in sql.splitlines() if not line.strip().startswith("--")]
+    statements = re.split(r";\s*$", "\n".join(lines), flags=re.M)
+    return [statement.strip() for statement in statements if statement.strip()]
+
+
+def load_migrations(directory: str = MIGRATIONS_DIR) -> list:
+    """Migraciones disponibles ordenadas por versión: dicts con version, name, checksum y statements"""
+    migrations = []
+    for filename in sorted(os.listdir(directory)):
+        match = MIGRATION_FILE.match(filename)
+        if not match:
+            continue
+        with open(os.path.join(directory, filename), "rb") as f:
+            content = f.read()
+        migrations.append({
+            "version": int(match.group(1)),
+            "name": match.group(2),
+            "checksum": hashlib.sha256(content).hexdigest(),
+            "statements": split_statements(content.decode("utf-8")),
+        })
+    versions = [migration["version"] for migration in migrations]
+    if len(versions) != len(set(versions)):
+        raise ValueError(f"Versiones de migración repetidas en {directory}")
+    return sorted(migrations, key=lambda migration: migration["version"])
+
+
+def applied_migrations(cursor) -> dict:
+    """{version: checksum} de las migraciones registradas en schema_migrations"""
+    cursor.execute(CREATE_MIGRATIONS_TABLE)
+    cursor.execute("SELECT version, checksum FROM schema_migrations")
+    return dict(cursor.fetchall())
+
+
+def apply_migration(cursor, migration: dict):
+    for statement in migration["statements"]:
+        try:
+            cursor.execute(statement)
+        except Error as e:
+            if e.errno not in IDEMPOTENT_ERRORS:
+                raise
+            logger.warning("⏭️ Migración %04d: %s (ya aplicado)", migration["version"], e.msg)
+    cursor.execute(
+        "INSERT INTO schema_migrations (version, name, checksum) VALUES (%s, %s, %s)",
+        (migration["version"], migration["name"], migration["checksum"])
+    )
+
+
+def migrate() -> list:
+    """Aplica las migraciones pendientes en orden; retorna las versiones aplicadas"""
+    migrations = load_migrations()
+    connection = _create_connection()
+    connection.autocommit = True
+    cursor = connection.cursor()
+    try:
+        cursor.execute("SELECT GET_LOCK(%s, %s)", (LOCK_NAME, LOCK_TIMEOUT))
+        if cursor.fetchone()[0] != 1:
+            raise RuntimeError(f"No se obtuvo el lock {LOCK_NAME} en {LOCK_TIMEOUT} s")
+        try:
+            # Se lee con el lock tomado: otro worker puede haber migrado mientras esperábamos
+            applied = applied_migrations(cursor)
+            done = []
+            for migration in migrations:
+                checksum = applied.get(migration["version"])
+                if checksum is not None:
+                    if checksum != migration["checksum"]:
+                        logger.warning("⚠️ La migración %04d_%s cambió después de aplicarse",
+                                       migration["version"], migration["name"])
+                    continue
+                logger.info("🛠️ Aplicando migración %04d_%s", migration["version"], migration["name"])
+                apply_migration(cursor, migration)
+                done.append(migration["version"])
+            return done
+        finally:
+            cursor.execute("SELECT RELEASE_LOCK(%s)", (LOCK_NAME,))
+            cursor.fetchone()
+    finally:
+        cursor.close()
+        connection.close()
+
+
+def migration_status() -> list:
+    """(versión, nombre, estado) de cada migración: aplicada, pendiente o modificada"""
+    connection = _create_connection()
+    cursor = connection.cursor()
+    try:
+        applied = applied_migrations(cursor)
+        connection.commit()
+    finally:
+        cursor.close()
+        connection.close()
+    status = []
+    for migration in load_migrations():
+        checksum = applied.get(migration["version"])
+        state = "pendiente" if checksum is None else "aplicada" if checksum == migration["checksum"] else "modificada"
+        status.append((migration["version"], migration["name"], state))
+    return status
+
+
+def sample_values(cursor) -> dict:
+    """Usuario con más tareas (según task_counters) y una de sus tareas, para parametrizar los EXPLAIN"""
+    cursor.execute("SELECT user_id FROM task_counters GROUP BY user_id ORDER BY SUM(count) DESC LIMIT 1")
+    row = cursor.fetchone()
+    user_id = row["user_id"] if row else 1
+    cursor.execute("SELECT id, email, username FROM users WHERE id = %s", (user_id,))
+    user = cursor.fetchone() or {"id": user_id, "email": "explain@example.com", "username": "explain"}
+    cursor.execute("SELECT id, created_at FROM tasks WHERE user_id = %s ORDER BY created_at DESC, id DESC LIMIT 1",
+                   (user_id,))
+    task = cursor.fetchone() or {"id": 1, "created_at": utc_now()}
+    return {"user": user, "task": task}
+
+
+def tasks_query_shapes(cursor: str) -> list:
+    """Argumentos de build_tasks_queries para cada forma distinta de consulta de GET /tasks"""
+    shapes = []
+    for completed in (None, False, True):
+        for priority in (None, "high"):
+            for page_cursor in (None, cursor):
+                for limit in (None, 50):
+                    for include_archived in (False, True):
+                        if page_cursor and limit is None:
+                            continue  # con cursor siempre hay límite (page_limit)
+                        if include_archived and completed is False:
+                            continue  # no lee tasks_archive: la misma consulta que sin archivo
+                        shapes.append({"completed": completed, "priority": priority, "limit": limit,
+                                       "cursor": page_cursor, "include_archived": include_archived})
+    return shapes
+
+
+def explain_queries(sample: dict) -> list:
+    """(nombre, consulta, parámetros) de las consultas de routes.py y auth_routes.py"""
+    user, task = sample["user"], sample["task"]
+    queries = []
+    # Todas las combinaciones de filtros, paginación y archivo de GET /tasks
+    for shape in tasks_query_shapes(encode_cursor(task)):
+        name = (f"GET /tasks completed={shape['completed']} priority={shape['priority']} "
+                f"cursor={'sí' if shape['cursor'] else 'no'} limit={shape['limit']} "
+                f"include_archived={shape['include_archived']}")
+        for query, params in build_tasks_queries(user["id"], **shape):
+            queries.append((name, query, params))
+    # GET /tasks/changes: descarga inicial y desde una marca (tasks, tasks_archive y lápidas)
+    for position in (None, (task["created_at"], task["id"])):
+        name = f"GET /tasks/changes since={'sí' if position else 'no'}"
+        for changes_query in build_changes_queries(user["id"], position, 100):
+            if changes_query is not None:
+                queries.append((name, changes_query[0], tuple(changes_query[1])))
+    update_query, update_params = build_update_query(user["id"], task["id"], TaskUpdate(completed=True))
+    queries += [
+        ("GET /tasks/{id}", TASK_BY_ID_QUERY, (task["id"], user["id"])),
+        ("GET /tasks/{id} archivada", ARCHIVED_TASK_BY_ID_QUERY, (task["id"], user["id"])),
+        ("POST /tasks: fechas de la tarea creada", TASK_TIMESTAMPS_QUERY, (task["id"],)),
+        ("PUT /tasks/{id}", update_query, update_params),
+        ("DELETE /tasks/{id}", DELETE_TASK_QUERY, (task["id"], user["id"])),
+        ("registro: email", USER_ID_BY_EMAIL_QUERY, (user["email"],)),
+        ("registro: username", USER_ID_BY_USERNAME_QUERY, (user["username"],)),
+        ("login", USER_LOGIN_QUERY, (user["email"],)),
+        ("perfil", USER_PROFILE_QUERY, (user["id"],)),
+        ("rehash", UPDATE_PASSWORD_QUERY, ("x", user["id"])),
+    ]
+    return queries
+
+
+def explain_problems(plan: list, query: str = "") -> list:
+    """Problemas de un plan de EXPLAIN: tablas recorridas enteras o sin índice, y filesort.
+
+    La fila <unionN,M> de include_archived solo no cuenta si la consulta
+    exterior termina en LIMIT: entonces ordena como mucho las filas que las
+    dos ramas ya cortaron. Sin LIMIT materializa y ordena la cuenta entera.
+    """
+    bounded = re.search(r"\)\s*ORDER BY [^()]*LIMIT %s\s*$", query) is not None
+    problems = []
+    for row in plan:
+        extra = row.get("Extra") or ""
+        if any(note in extra for note in NO_ROW_NOTES):
+            continue
+        if str(row.get("table") or "").startswith("<union") and bounded:
+            continue
+        if row.get("type") == "ALL" or not row.get("key"):
+            problems.append(f"{row.get('table')}: sin índice (type={row.get('type')})")
+        if "Using filesort" in extra:
+            problems.append(f"{row.get('table')}: filesort")
+    return problems
+
+
+def explain_check() -> bool:
+    """Lanza EXPLAIN sobre cada consulta e imprime el índice usado; False si alguna tiene problemas"""
+    connection = _create_connection()
+    cursor = connection.cursor(dictionary=True)
+    ok = True
+    try:
+        for name, query, params in explain_queries(sample_values(cursor)):
+            cursor.execute(f"EXPLAIN {query}", tuple(params))
+            plan = cursor.fetchall()
+            problems = explain_problems(plan, query)
+            keys = ", ".join(str(row.get("key")) for row in plan)
+            if problems:
+                ok = False
+                print(f"❌ {name}: {'; '.join(problems)}\n   {' '.join(query.split())}")
+            else:
+                print(f"✅ {name}: {keys}")
+        connection.rollback()
+    finally:
+        cursor.close()
+        connection.close()
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migraciones del esquema de la base de datos")
+    parser.add_argument("--status", action="store_true", help="listar migraciones aplicadas y pendientes")
+    parser.add_argument("--explain", action="store_true",
+                        help="comprobar con EXPLAIN que las consultas usan índice y no filesort")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    if args.status:
+        for version, name, state in migration_status():
+            print(f"{version:04d}_{name}: {state}")
+        return
+    if args.explain:
+        sys.exit(0 if explain_check() else 1)
+    applied = migrate()
+    print(f"✅ Migraciones aplicadas: {', '.join(f'{version:04d}' for version in applied) or 'ninguna pendiente'}")
+
+
+if __name__ == "__main__":
+    main()
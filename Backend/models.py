@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import Dict, List, Literal, Optional
 
 class Task(BaseModel):
     id: int
@@ -12,6 +12,38 @@ class Task(BaseModel):
     created_at: str  # ⚠️ Cambiado de datetime a str
     updated_at: str  # ⚠️ Cambiado de datetime a str
 
+class TaskListItem(BaseModel):
+    # Elemento de GET /tasks: con ?fields= solo se incluyen las columnas pedidas
+    id: int
+    user_id: Optional[int] = None
+    title: Optional[str] = None
+    description: Optional[str] = None
+    completed: Optional[bool] = None
+    priority: Optional[str] = None
+    due_date: Optional[str] = None
+    created_at: Optional[str] = None
+    updated_at: Optional[str] = None
+
+class TaskSearchResult(Task):
+    # Elemento de GET /tasks/search: la tarea y su relevancia (mayor = más relevante)
+    score: float
+
+class TaskStats(BaseModel):
+    # GET /tasks/stats; overdue y due_this_week solo cuentan tareas pendientes
+    total: int
+    completed: int
+    pending: int
+    by_priority: Dict[str, int]
+    overdue: int
+    due_this_week: int
+
+class TaskChanges(BaseModel):
+    # GET /tasks/changes: tareas creadas/actualizadas e ids borrados desde la marca
+    changes: List[Task]
+    deleted: List[int]
+    next: str       # marca para la siguiente consulta (?since=)
+    has_more: bool  # True = pedir de nuevo enseguida con `next`
+
 class TaskCreate(BaseModel):
     title: str
     description: Optional[str] = None
@@ -25,6 +57,28 @@ class TaskUpdate(BaseModel):
     priority: Optional[str] = None
     due_date: Optional[str] = None
 
+class BatchOperation(BaseModel):
+    op: Literal["create", "update", "delete"]
+    id: Optional[int] = None           # requerido en update/delete
+    data: Optional[TaskUpdate] = None  # campos para create/update (create requiere title)
+
+class BatchRequest(BaseModel):
+    operations: List[BatchOperation] = []
+    complete: List[int] = []  # atajo: marcar estas tareas como completadas
+    atomic: bool = True       # True = todo o nada; False = aplicar lo que se pueda
+
+class BatchItemResult(BaseModel):
+    index: int
+    op: str
+    id: Optional[int] = None
+    status: str  # "ok", "error" o "skipped" (lote atómico revertido)
+    error: Optional[str] = None
+    task: Optional[Task] = None
+
+class BatchResponse(BaseModel):
+    committed: bool
+    results: List[BatchItemResult]
+
 class User(BaseModel):
     id: int
     email: str
@@ -0,0 +1,288 @@
+"""Límites de peticiones por usuario e IP y rechazo de carga (load shedding).
+
+Cada petición se clasifica por ruta (route_class): login (POST /auth/login y
+/auth/register, que pagan bcrypt), auth (resto de /auth), read (GET de
+/tasks) y write (escrituras en /tasks). Cada clase tiene su presupuesto por
+IP y, si la petición trae un JWT válido, por user_id; los presupuestos son
+token buckets de `N/S` (hasta N peticiones seguidas, recuperando N cada S
+segundos) configurables con RATE_LIMITS. Al agotarse se responde 429 con
+Retry-After.
+
+Antes de los límites se mira la carga del worker: si hay más de
+SHED_MAX_IN_FLIGHT peticiones en curso o más de SHED_MAX_DB_BACKLOG
+esperando una conexión a MySQL, se responde 503 con Retry-After en lugar
+de encolar la petición y alargar la latencia de todas. GET /tasks/stream
+no cuenta como petición en curso (la conexión dura lo que dure el cliente).
+
+Backends de los buckets:
+- memory: en el proceso, LRU acotado a RATE_LIMIT_MAX_KEYS buckets con
+  actualización O(1). Con varios workers cada uno lleva su propia cuenta.
+  Un bucket expulsado vuelve a empezar lleno.
+- redis: buckets compartidos entre workers, actualizados con un script Lua
+  atómico. Requiere el paquete `redis`.
+
+La IP es la del cliente de la conexión; detrás de un proxy, uvicorn la toma
+de X-Forwarded-For si la IP del proxy está en FORWARDED_ALLOW_IPS.
+"""
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from fastapi.concurrency import run_in_threadpool
+from auth_routes import verify_token
+from serialization import dumps
+from metrics import RATE_LIMITED, SHED_REQUESTS
+from config import (
+    RATE_LIMIT_ENABLED,
+    RATE_LIMIT_BACKEND,
+    RATE_LIMIT_REDIS_URL,
+    RATE_LIMIT_MAX_KEYS,
+    RATE_LIMITS,
+    SHED_MAX_IN_FLIGHT,
+    SHED_MAX_DB_BACKLOG,
+    SHED_RETRY_AFTER,
+)
+
+# Presupuesto por defecto de cada (clase, ámbito): "N/S" = N peticiones cada S segundos
+DEFAULT_LIMITS = {
+    "login.ip": "20/60",
+    "auth.ip": "300/60",
+    "auth.user": "300/60",
+    "read.ip": "3000/60",
+    "read.user": "600/60",
+    "write.ip": "1500/60",
+    "write.user": "300/60",
+}
+
+UNLIMITED_PATHS = ("/tasks/stream",)  # conexiones largas: no cuentan para SHED_MAX_IN_FLIGHT
+
+
+def parse_limits(spec: str) -> dict:
+    """{(clase, ámbito): (capacidad, tokens_por_segundo)} de DEFAULT_LIMITS con RATE_LIMITS encima.
+
+    RATE_LIMITS="login.ip=10/60,read.user=0" cambia o desactiva (0) presupuestos.
+    """
+    limits = dict(DEFAULT_LIMITS)
+    for item in spec.split(","):
+        if item.strip():
+            name, _, value = item.partition("=")
+            if name.strip() not in DEFAULT_LIMITS:
+                raise ValueError(f"RATE_LIMITS: presupuesto desconocido '{name.strip()}'")
+            limits[name.strip()] = value.strip()
+    parsed = {}
+    for name, value in limits.items():
+        count, _, seconds = value.partition("/")
+        count, seconds = int(count), float(seconds or 1)
+        if count > 0 and seconds > 0:
+            route_class, _, scope = name.partition(".")
+            parsed[(route_class, scope)] = (count, count / seconds)
+    return parsed
+
+
+def route_class(method: str, path: str) -> Optional[str]:
+    """Clase de presupuesto de una petición; None si no se limita (/, /health, /metrics, /docs...)"""
+    if path.startswith("/auth/"):
+        return "login" if path in ("/auth/login", "/auth/register") else "auth"
+    if path == "/tasks" or path.startswith("/tasks/"):
+        return "read" if method in ("GET", "HEAD") else "write"
+    return None
+
+
+class MemoryStore:
+    blocking = False
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()  # clave -> [tokens, actualizado_en]
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def take(self, key: str, capacity: int, rate: float) -> float:
+        """Consume un token; retorna 0 si había, o los segundos hasta el siguiente"""
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [float(capacity), now]
+                if len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+                    self.evictions += 1
+            else:
+                self._buckets.move_to_end(key)
+                bucket[0] = min(capacity, bucket[0] + (now - bucket[1]) * rate)
+                bucket[1] = now
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                return 0.0
+            return (1 - bucket[0]) / rate
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"backend": "memory", "keys": len(self._buckets), "max_keys": self.max_keys,
+                    "evictions": self.evictions}
+
+
+# Token bucket atómico en Redis; el reloj es el del servidor para que todos los workers coincidan
+TAKE_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return tostring(wait)
+"""
+
+
+class RedisStore:
+    blocking = True
+
+    def __init__(self, url: str):
+        import redis  # dependencia opcional
+        self._redis = redis.Redis.from_url(url)
+        self._take = self._redis.register_script(TAKE_SCRIPT)
+
+    def take(self, key: str, capacity: int, rate: float) -> float:
+        return float(self._take(keys=["ratelimit:" + key], args=[capacity, rate]))
+
+    def stats(self) -> dict:
+        return {"backend": "redis"}
+
+
+def create_store(name: str = RATE_LIMIT_BACKEND):
+    if name == "redis":
+        return RedisStore(RATE_LIMIT_REDIS_URL)
+    return MemoryStore(RATE_LIMIT_MAX_KEYS)
+
+
+class RateLimiter:
+    """Estado compartido por el middleware del proceso: buckets, peticiones en curso y contadores"""
+
+    def __init__(self, store, limits: dict, max_in_flight: int, max_db_backlog: int):
+        self.store = store
+        self.limits = limits
+        self.max_in_flight = max_in_flight
+        self.max_db_backlog = max_db_backlog
+        self.in_flight = 0
+        self.limited = 0
+        self.shed = 0
+
+    async def check(self, route: str, user_id: Optional[int], client_ip: str) -> float:
+        """Consume de los buckets de usuario e IP; retorna 0 o los segundos que hay que esperar"""
+        for scope, identity in (("user", user_id), ("ip", client_ip)):
+            limit = self.limits.get((route, scope))
+            if limit is None or identity is None:
+                continue
+            key = f"{route}:{scope}:{identity}"
+            if self.store.blocking:
+                wait = await run_in_threadpool(self.store.take, key, *limit)
+            else:
+                wait = self.store.take(key, *limit)
+            if wait > 0:
+                self.limited += 1
+                RATE_LIMITED.inc(route, scope)
+                return wait
+        return 0.0
+
+    def overloaded(self, db_backlog: int) -> Optional[str]:
+        """Motivo para rechazar la petición por sobrecarga, o None"""
+        if self.max_in_flight and self.in_flight >= self.max_in_flight:
+            return "in_flight"
+        if self.max_db_backlog and db_backlog >= self.max_db_backlog:
+            return "db_backlog"
+        return None
+
+    def stats(self) -> dict:
+        return {
+            **self.store.stats(),
+            "enabled": bool(self.limits),
+            "in_flight": self.in_flight,
+            "limited": self.limited,
+            "shed": self.shed,
+        }
+
+
+limiter = RateLimiter(
+    create_store(),
+    parse_limits(RATE_LIMITS) if RATE_LIMIT_ENABLED else {},
+    SHED_MAX_IN_FLIGHT,
+    SHED_MAX_DB_BACKLOG,
+)
+
+
+def token_user_id(headers: list) -> Optional[int]:
+    """user_id del JWT de Authorization, o None (las rutas ya responderán 401 si hace falta)"""
+    for name, value in headers:
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() != "bearer" or not token:
+                return None
+            try:
+                return verify_token(token.strip()).get("user_id")
+            except Exception:
+                return None
+    return None
+
+
+async def reject(send, status: int, detail: str, retry_after: float):
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": dumps({"detail": detail})})
+
+
+class RateLimitMiddleware:
+    """Middleware ASGI: 503 si el worker está sobrecargado y 429 si se agota el presupuesto.
+
+    db_backlog es una función que retorna cuántas peticiones esperan una
+    conexión a MySQL (o un hilo del threadpool que la presta).
+    """
+
+    def __init__(self, app, db_backlog=lambda: 0):
+        self.app = app
+        self.db_backlog = db_backlog
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "OPTIONS":
+            return await self.app(scope, receive, send)
+        route = route_class(scope["method"], scope["path"])
+        if route is None:
+            return await self.app(scope, receive, send)
+
+        counted = scope["path"] not in UNLIMITED_PATHS
+        reason = limiter.overloaded(self.db_backlog()) if counted else None
+        if reason:
+            limiter.shed += 1
+            SHED_REQUESTS.inc(reason)
+            return await reject(send, 503, "Servicio sobrecargado, reintenta más tarde", SHED_RETRY_AFTER)
+
+        if limiter.limits:
+            client = scope.get("client")
+            wait = await limiter.check(route, token_user_id(scope["headers"]), client[0] if client else "unknown")
+            if wait > 0:
+                return await reject(send, 429, "Demasiadas peticiones", wait)
+
+        if not counted:
+            return await self.app(scope, receive, send)
+        limiter.in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.in_flight -= 1
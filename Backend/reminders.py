@@ -0,0 +1,355 @@
+"""Recordatorios de fecha de vencimiento (due_date).
+
+Un planificador en el event loop mantiene en un heap las tareas pendientes
+cuyo recordatorio cae dentro de las próximas REMINDER_HORIZON_HOURS y duerme
+hasta el siguiente. El recordatorio de una tarea salta a las 00:00 UTC de su
+due_date menos REMINDER_LEAD_HOURS; si la API estaba parada en ese momento,
+salta al arrancar mientras el due_date no haya pasado.
+
+- Carga por ventanas: las tareas se leen por el índice idx_due_date en orden
+  (due_date, id), como mucho REMINDER_MAX_LOADED a la vez, y un cursor marca
+  hasta dónde se ha cargado. Con millones de fechas pendientes solo la
+  ventana próxima está en memoria.
+- Cambios incrementales: el planificador se suscribe a task_events; crear,
+  actualizar o borrar una tarea dentro de la ventana mueve o quita su
+  entrada sin volver a consultar la tabla. Las que quedan fuera de la
+  ventana se cargarán cuando llegue su turno.
+- Sin duplicados: cada disparo inserta en reminder_log (clave task_id,
+  due_date) con INSERT IGNORE ... SELECT, que además comprueba en la BD que
+  la tarea sigue pendiente y con esa fecha. Solo se avisa de las filas que
+  ese INSERT escribió, así que ni un reinicio ni varios workers repiten
+  recordatorios.
+
+Destinos (REMINDER_SINKS, separados por comas): log, webhook (POST JSON a
+REMINDER_WEBHOOK_URL) y events (evento `reminder` en GET /tasks/stream).
+
+Envío: el registro en reminder_log se confirma antes de enviar y el
+recordatorio cuenta como entregado desde ese commit (entrega "como mucho
+una vez"): si el proceso cae antes de enviar o el webhook falla, no se
+reintenta, solo queda el aviso en el log. Los POST del webhook van en un
+pool de REMINDER_WEBHOOK_CONCURRENCY hilos propio, no en el threadpool de
+las peticiones, y el planificador espera a cada lote como mucho
+REMINDER_DELIVERY_DEADLINE segundos: un endpoint lento retrasa los
+siguientes recordatorios, pero no las rutas de la API.
+"""
+from fastapi.concurrency import run_in_threadpool
+from database import db_connection
+from routes import utc_now
+from config import (
+    REMINDER_SINKS,
+    REMINDER_WEBHOOK_URL,
+    REMINDER_LEAD_HOURS,
+    REMINDER_HORIZON_HOURS,
+    REMINDER_MAX_LOADED,
+    REMINDER_BATCH,
+    REMINDER_REFILL_INTERVAL,
+    REMINDER_WEBHOOK_TIMEOUT,
+    REMINDER_WEBHOOK_CONCURRENCY,
+    REMINDER_DELIVERY_DEADLINE,
+)
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import date, datetime, time, timedelta
+from typing import Optional
+import asyncio
+import heapq
+import json
+import logging
+import urllib.request
+import uuid
+import task_events
+
+logger = logging.getLogger(__name__)
+
+MAX_ID = 2 ** 31 - 1  # tasks.id es INT
+
+
+def fire_time(due_date: date) -> datetime:
+    return datetime.combine(due_date, time.min) - timedelta(hours=REMINDER_LEAD_HOURS)
+
+
+def parse_due_date(value) -> Optional[date]:
+    """due_date llega como date desde la BD o como str desde TaskCreate"""
+    if value is None or isinstance(value, date):
+        return value
+    try:
+        return date.fromisoformat(str(value)[:10])
+    except ValueError:
+        return None
+
+
+class LogSink:
+    def send(self, reminder: dict):
+        logger.info("⏰ Recordatorio: tarea %s '%s' vence el %s", reminder["task_id"], reminder["title"],
+                    reminder["due_date"], extra={"user_id": reminder["user_id"]})
+
+
+class WebhookSink:
+    """POST JSON por recordatorio en su propio pool de hilos; send() no bloquea y devuelve el Future"""
+
+    def __init__(self, url: str, timeout: float = REMINDER_WEBHOOK_TIMEOUT,
+                 concurrency: int = REMINDER_WEBHOOK_CONCURRENCY):
+        self.url = url
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max(1, concurrency), thread_name_prefix="reminder-webhook")
+
+    def post(self, reminder: dict):
+        body = json.dumps(reminder, default=str).encode("utf-8")
+        request = urllib.request.Request(self.url, data=body, headers={"Content-Type": "application/json"})
+        try:
+            urllib.request.urlopen(request, timeout=self.timeout).close()
+        except OSError as e:
+            logger.warning("No se pudo enviar el recordatorio de la tarea %s al webhook: %s", reminder["task_id"], e)
+
+    def send(self, reminder: dict) -> Future:
+        return self._executor.submit(self.post, reminder)
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+class EventsSink:
+    def send(self, reminder: dict):
+        from event_broker import broker
+        broker.publish(reminder["user_id"], [{
+            "type": "reminder",
+            "task": {"id": reminder["task_id"], "title": reminder["title"], "due_date": reminder["due_date"]},
+        }])
+
+
+def create_sinks(names: str = REMINDER_SINKS) -> list:
+    sinks = []
+    for name in (n.strip().lower() for n in names.split(",")):
+        if name == "log":
+            sinks.append(LogSink())
+        elif name == "webhook" and REMINDER_WEBHOOK_URL:
+            sinks.append(WebhookSink(REMINDER_WEBHOOK_URL))
+        elif name == "events":
+            sinks.append(EventsSink())
+    return sinks
+
+
+LOAD_QUERY = """
+    SELECT t.id, t.user_id, t.due_date
+    FROM tasks t
+    LEFT JOIN reminder_log r ON r.task_id = t.id AND r.due_date = t.due_date
+    WHERE {position} AND t.due_date <= %s AND t.completed = FALSE AND r.task_id IS NULL
+    ORDER BY t.due_date, t.id
+    LIMIT %s
+"""
+
+
+def load_window(cursor, today: date, until: date, limit: int) -> list:
+    """Siguientes tareas pendientes tras `cursor` (None = desde hoy) con due_date <= until"""
+    if cursor is None:
+        position, params = "t.due_date >= %s", [today]
+    else:
+        position = "(t.due_date > %s OR (t.due_date = %s AND t.id > %s))"
+        params = [cursor[0], cursor[0], cursor[1]]
+    with db_connection() as connection:
+        cursor_db = connection.cursor(dictionary=True)
+        cursor_db.execute(LOAD_QUERY.format(position=position), (*params, until, limit))
+        rows = cursor_db.fetchall()
+        cursor_db.close()
+    return rows
+
+
+def claim_reminders(task_ids: list, today: date, due_until: date) -> list:
+    """Registra en reminder_log los recordatorios que siguen vigentes y devuelve solo esos.
+
+    Otro worker (o una ejecución anterior) que ya los registró hace que el
+    INSERT IGNORE no escriba nada para esas tareas.
+    """
+    batch_id = uuid.uuid4().hex
+    placeholders = ", ".join(["%s"] * len(task_ids))
+    with db_connection() as connection:
+        cursor = connection.cursor(dictionary=True)
+        try:
+            cursor.execute(
+                f"""INSERT IGNORE INTO reminder_log (task_id, due_date, user_id, fired_at, batch_id)
+                    SELECT id, due_date, user_id, CURRENT_TIMESTAMP, %s FROM tasks
+                    WHERE id IN ({placeholders}) AND completed = FALSE AND due_date BETWEEN %s AND %s""",
+                (batch_id, *task_ids, today, due_until)
+            )
+            cursor.execute(
+                f"""SELECT r.task_id, r.user_id, r.due_date, t.title
+                    FROM reminder_log r JOIN tasks t ON t.id = r.task_id
+                    WHERE r.task_id IN ({placeholders}) AND r.batch_id = %s""",
+                (*task_ids, batch_id)
+            )
+            claimed = cursor.fetchall()
+            connection.commit()
+        finally:
+            cursor.close()
+    return claimed
+
+
+class ReminderScheduler:
+    """Heap de (hora_de_disparo, task_id, due_date); el estado solo se toca desde el event loop"""
+
+    def __init__(self, sinks: list):
+        self.sinks = sinks
+        self._heap = []
+        self._entries = {}      # task_id -> (hora, due_date, user_id); lo que no esté aquí está obsoleto
+        self._cursor = None     # (due_date, id) hasta donde se ha cargado
+        self._loop = None
+        self._task = None
+        self._wakeup = None
+        self._last_refill = None
+        self.fired = 0
+        self.skipped = 0
+
+    def start(self, loop: asyncio.AbstractEventLoop):
+        self._loop = loop
+        self._wakeup = asyncio.Event()
+        self._task = loop.create_task(self._run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+        self._loop = None
+        for sink in self.sinks:
+            if hasattr(sink, "close"):
+                sink.close()
+
+    # Cambios de tareas (cualquier hilo)
+
+    def on_tasks_changed(self, user_id: int, events: list):
+        loop = self._loop
+        if loop is not None and events:
+            loop.call_soon_threadsafe(self._apply_events, user_id, events)
+
+    def _apply_events(self, user_id: int, events: list):
+        today = utc_now().date()
+        for event in events:
+            if event["type"] == "deleted":
+                self._entries.pop(event["id"], None)
+                continue
+            task = event["task"]
+            due_date = parse_due_date(task.get("due_date"))
+            if task.get("completed") or due_date is None or due_date < today or not self._in_window(due_date, task["id"]):
+                self._entries.pop(task["id"], None)
+            else:
+                self._schedule(task["id"], user_id, due_date)
+
+    # Heap
+
+    def _in_window(self, due_date: date, task_id: int) -> bool:
+        return self._cursor is not None and (due_date, task_id) <= self._cursor
+
+    def _schedule(self, task_id: int, user_id: int, due_date: date):
+        entry = (fire_time(due_date), due_date, user_id)
+        if self._entries.get(task_id) == entry:
+            return
+        self._entries[task_id] = entry
+        heapq.heappush(self._heap, (entry[0], task_id, due_date))
+        if self._heap[0][1] == task_id:
+            self._wakeup.set()  # el nuevo es el próximo: despertar antes
+        if len(self._heap) > 2 * len(self._entries) + 1000:
+            # Demasiadas entradas obsoletas (borrado perezoso): reconstruir
+            self._heap = [(fire, task_id, due) for task_id, (fire, due, _) in self._entries.items()]
+            heapq.heapify(self._heap)
+
+    def _pop_due(self, now: datetime, limit: int) -> list:
+        due = []
+        while self._heap and self._heap[0][0] <= now and len(due) < limit:
+            fire, task_id, due_date = heapq.heappop(self._heap)
+            entry = self._entries.get(task_id)
+            if entry is None or entry[1] != due_date:
+                continue  # borrada, completada o con otra fecha
+            del self._entries[task_id]
+            due.append((task_id, entry))
+        return due
+
+    # Bucle
+
+    async def _refill(self, now: datetime):
+        self._last_refill = now
+        capacity = REMINDER_MAX_LOADED - len(self._entries)
+        if capacity <= 0:
+            return
+        until = (now + timedelta(hours=REMINDER_HORIZON_HOURS + REMINDER_LEAD_HOURS)).date()
+        if self._cursor is not None and self._cursor >= (until, MAX_ID):
+            return
+        rows = await run_in_threadpool(load_window, self._cursor, now.date(), until, capacity)
+        for row in rows:
+            self._schedule(row["id"], row["user_id"], row["due_date"])
+        if len(rows) < capacity:
+            self._cursor = (until, MAX_ID)
+        elif rows:
+            self._cursor = (rows[-1]["due_date"], rows[-1]["id"])
+
+    async def _fire(self, due: list, now: datetime) -> list:
+        """Registra los recordatorios (threadpool, una transacción) y después los envía"""
+        today = now.date()
+        due_until = (now + timedelta(hours=REMINDER_LEAD_HOURS)).date()
+        claimed = await run_in_threadpool(claim_reminders, [task_id for task_id, _ in due], today, due_until)
+        await self._deliver([{
+            "task_id": row["task_id"],
+            "user_id": row["user_id"],
+            "title": row["title"],
+            "due_date": row["due_date"].isoformat(),
+        } for row in claimed])
+        return claimed
+
+    async def _deliver(self, reminders: list):
+        """Pasa cada recordatorio a los destinos; espera a los envíos en curso hasta REMINDER_DELIVERY_DEADLINE"""
+        pending = []
+        for reminder in reminders:
+            for sink in self.sinks:
+                try:
+                    result = sink.send(reminder)
+                except Exception as e:
+                    logger.warning("No se pudo enviar el recordatorio de la tarea %s: %s", reminder["task_id"], e)
+                    continue
+                if isinstance(result, Future):
+                    pending.append(asyncio.wrap_future(result))
+        if not pending:
+            return
+        _, late = await asyncio.wait(pending, timeout=REMINDER_DELIVERY_DEADLINE)
+        if late:
+            logger.warning("⏰ %d envíos de recordatorios siguen en curso tras %.0f s", len(late),
+                           REMINDER_DELIVERY_DEADLINE)
+
+    async def _run(self):
+        while True:
+            now = utc_now()
+            try:
+                if self._last_refill is None or now - self._last_refill >= timedelta(seconds=REMINDER_REFILL_INTERVAL):
+                    await self._refill(now)
+                due = self._pop_due(now, REMINDER_BATCH)
+                if due:
+                    try:
+                        claimed = await self._fire(due, now)
+                    except Exception:
+                        for task_id, (_, due_date, user_id) in due:
+                            self._schedule(task_id, user_id, due_date)  # reintentar más tarde
+                        raise
+                    self.fired += len(claimed)
+                    self.skipped += len(due) - len(claimed)
+                    continue
+            except Exception as e:
+                logger.warning("Error en el planificador de recordatorios: %s", e)
+                self._last_refill = now
+                await asyncio.sleep(REMINDER_REFILL_INTERVAL)
+                continue
+
+            timeout = REMINDER_REFILL_INTERVAL
+            if self._heap:
+                timeout = min(timeout, (self._heap[0][0] - now).total_seconds())
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), max(timeout, 0.05))
+            except asyncio.TimeoutError:
+                pass
+
+    def stats(self) -> dict:
+        return {
+            "loaded": len(self._entries),
+            "cursor": [self._cursor[0].isoformat(), self._cursor[1]] if self._cursor else None,
+            "fired": self.fired,
+            "skipped": self.skipped,
+        }
+
+
+scheduler = ReminderScheduler(create_sinks())
+task_events.subscribe(scheduler.on_tasks_changed, with_events=True)
@@ -0,0 +1,254 @@
+"""Compresión de respuestas y cabeceras de caché HTTP.
+
+CompressionMiddleware (ASGI) comprime los cuerpos JSON/NDJSON/texto de al
+menos COMPRESSION_MIN_SIZE bytes con la mejor codificación que acepte el
+cliente (Accept-Encoding), en el orden de preferencia COMPRESSION_ENCODINGS:
+
+- zstd: paquete `zstandard` (opcional)
+- br: paquete `brotli` (opcional)
+- gzip: zlib de la stdlib, siempre disponible
+
+Los niveles por defecto (zstd 3, br 4, gzip 5) son intermedios: en JSON de
+tareas los niveles altos apenas reducen más el tamaño y multiplican el coste
+de CPU (ver benchmarks/bench_compression.py).
+
+Las respuestas de un solo cuerpo (GET /tasks, cacheadas o no) se comprimen
+enteras; las de streaming (GET /tasks/export) trozo a trozo con un
+compresor incremental, vaciándolo en cada trozo para que el cliente los
+reciba sin esperar al final. Los cuerpos de COMPRESSION_OFFLOAD_BYTES o más
+se comprimen en un pool de hilos propio (zlib, brotli y zstandard liberan
+el GIL) para no bloquear el event loop; no se usa el threadpool de las
+rutas porque cada hilo de ese pool corresponde a una conexión a MySQL.
+GET /tasks/stream (text/event-stream) no se comprime.
+
+Al comprimir, el ETag pasa a débil (W/"..."): el cuerpo ya no es idéntico
+byte a byte, pero sigue siendo válido para If-None-Match.
+
+También fija Cache-Control si la ruta no lo hace: las lecturas de /tasks
+son datos privados del usuario que el cliente puede guardar pero debe
+revalidar con el ETag (`private, no-cache`); el resto (login con el token,
+escrituras, /health) es `no-store`. Vary indica que la respuesta cambia con
+Authorization y Accept-Encoding.
+"""
+import asyncio
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from config import (
+    COMPRESSION_ENABLED,
+    COMPRESSION_ENCODINGS,
+    COMPRESSION_MIN_SIZE,
+    COMPRESSION_OFFLOAD_BYTES,
+    COMPRESSION_THREADS,
+    COMPRESSION_GZIP_LEVEL,
+    COMPRESSION_BROTLI_QUALITY,
+    COMPRESSION_ZSTD_LEVEL,
+)
+
+COMPRESSIBLE_TYPES = (b"application/json", b"application/x-ndjson", b"text/plain", b"text/csv", b"text/html")
+
+
+class GzipEncoder:
+    name = "gzip"
+
+    def __init__(self, level: int):
+        self.level = level
+
+    def compress(self, data: bytes) -> bytes:
+        compressor = zlib.compressobj(self.level, zlib.DEFLATED, 31)  # wbits 31 = cabecera gzip
+        return compressor.compress(data) + compressor.flush()
+
+    def stream(self):
+        compressor = zlib.compressobj(self.level, zlib.DEFLATED, 31)
+        return (lambda data: compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH),
+                compressor.flush)
+
+
+class BrotliEncoder:
+    name = "br"
+
+    def __init__(self, quality: int):
+        import brotli  # dependencia opcional
+        self._brotli = brotli
+        self.quality = quality
+
+    def compress(self, data: bytes) -> bytes:
+        return self._brotli.compress(data, mode=self._brotli.MODE_TEXT, quality=self.quality)
+
+    def stream(self):
+        compressor = self._brotli.Compressor(mode=self._brotli.MODE_TEXT, quality=self.quality)
+        return (lambda data: compressor.process(data) + compressor.flush()), compressor.finish
+
+
+class ZstdEncoder:
+    name = "zstd"
+
+    def __init__(self, level: int):
+        import zstandard  # dependencia opcional
+        self._zstd = zstandard
+        self.level = level
+        self._local = threading.local()  # un ZstdCompressor no se puede usar desde dos hilos a la vez
+
+    def _compressor(self):
+        compressor = getattr(self._local, "compressor", None)
+        if compressor is None:
+            compressor = self._local.compressor = self._zstd.ZstdCompressor(level=self.level)
+        return compressor
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor().compress(data)
+
+    def stream(self):
+        compressor = self._zstd.ZstdCompressor(level=self.level).compressobj()
+        return (lambda data: compressor.compress(data) + compressor.flush(self._zstd.COMPRESSOBJ_FLUSH_BLOCK),
+                compressor.flush)
+
+
+ENCODER_FACTORIES = {
+    "zstd": lambda: ZstdEncoder(COMPRESSION_ZSTD_LEVEL),
+    "br": lambda: BrotliEncoder(COMPRESSION_BROTLI_QUALITY),
+    "gzip": lambda: GzipEncoder(COMPRESSION_GZIP_LEVEL),
+}
+
+
+def load_encoders(names: str) -> dict:
+    """Codificadores disponibles de la lista `names`, en orden de preferencia"""
+    encoders = {}
+    for name in (name.strip().lower() for name in names.split(",")):
+        if name not in ENCODER_FACTORIES:
+            continue
+        try:
+            encoders[name] = ENCODER_FACTORIES[name]()
+        except ImportError:
+            pass  # brotli / zstandard no instalados
+    return encoders
+
+
+@lru_cache(maxsize=256)
+def choose_encoding(accept_encoding: str, available: tuple):
+    """Primera codificación de `available` aceptada (q > 0) por el cliente, o None"""
+    accepted = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+    wildcard = accepted.get("*", 0.0)
+    for name in available:
+        if accepted.get(name, wildcard) > 0:
+            return name
+    return None
+
+
+def cache_control(method: str, path: str) -> bytes:
+    if method in ("GET", "HEAD") and (path == "/tasks" or path.startswith("/tasks/")):
+        return b"private, no-cache"
+    return b"no-store"
+
+
+def _add_vary(headers: list, values: tuple):
+    for i, (name, value) in enumerate(headers):
+        if name == b"vary":
+            present = {item.strip().lower() for item in value.decode("latin-1").split(",")}
+            missing = [v for v in values if v.decode().lower() not in present]
+            if missing:
+                headers[i] = (name, b", ".join([value, *missing]))
+            return
+    headers.append((b"vary", b", ".join(values)))
+
+
+class CompressionMiddleware:
+    """Middleware ASGI: compresión según Accept-Encoding y cabeceras Cache-Control/Vary"""
+
+    def __init__(self, app):
+        self.app = app
+        self.encoders = load_encoders(COMPRESSION_ENCODINGS) if COMPRESSION_ENABLED else {}
+        self._names = tuple(self.encoders)
+        self._executor = ThreadPoolExecutor(max_workers=COMPRESSION_THREADS, thread_name_prefix="compression")
+
+    async def _run(self, fn, data: bytes) -> bytes:
+        if len(data) < COMPRESSION_OFFLOAD_BYTES:
+            return fn(data)
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, data)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        encoding = None
+        if self._names:
+            for name, value in scope["headers"]:
+                if name == b"accept-encoding":
+                    encoding = choose_encoding(value.decode("latin-1"), self._names)
+                    break
+        authorized = scope["path"] == "/tasks" or scope["path"].startswith("/tasks/")
+        start = None
+        compress = None      # función de compresión del trozo actual (streaming)
+        finish = None
+
+        async def send_wrapper(message):
+            nonlocal start, compress, finish
+            if message["type"] == "http.response.start":
+                # Se retiene hasta ver el primer cuerpo: su tamaño decide si se comprime
+                start = message
+                headers = list(message.get("headers", ()))
+                names = {name for name, _ in headers}
+                if b"cache-control" not in names:
+                    headers.append((b"cache-control", cache_control(scope["method"], scope["path"])))
+                content_type = next((value for name, value in headers if name == b"content-type"), b"")
+                vary = [b"Authorization"] if authorized else []
+                negotiable = bool(self._names) and content_type.startswith(COMPRESSIBLE_TYPES)
+                if negotiable:
+                    vary.append(b"Accept-Encoding")
+                if vary:
+                    _add_vary(headers, tuple(vary))
+                start["headers"] = headers
+                if not negotiable or encoding is None or b"content-encoding" in names or message["status"] < 200 \
+                        or message["status"] in (204, 304):
+                    await send(start)
+                    start = None
+                return
+
+            if message["type"] != "http.response.body" or (start is None and compress is None):
+                return await send(message)
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            encoder = self.encoders[encoding]
+            if start is not None:
+                headers = start["headers"]
+                if not more_body and len(body) < COMPRESSION_MIN_SIZE:
+                    await send(start)  # cuerpo pequeño: sin comprimir
+                    start = None
+                    return await send(message)
+                headers = [(name, value) for name, value in headers if name != b"content-length"]
+                headers = [(name, b"W/" + value if name == b"etag" and not value.startswith(b"W/") else value)
+                           for name, value in headers]
+                headers.append((b"content-encoding", encoding.encode()))
+                if not more_body:
+                    body = await self._run(encoder.compress, body)
+                    headers.append((b"content-length", str(len(body)).encode()))
+                    start["headers"] = headers
+                    await send(start)
+                    start = None
+                    return await send({"type": "http.response.body", "body": body})
+                start["headers"] = headers
+                await send(start)
+                start = None
+                compress, finish = encoder.stream()
+
+            chunk = await self._run(compress, body) if body else b""
+            if not more_body:
+                chunk += finish()
+            await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+        await self.app(scope, receive, send_wrapper)
+        if start is not None:
+            await send(start)  # respuesta sin cuerpo
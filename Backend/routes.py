@@ -1,221 +1,451 @@
 from fastapi import HTTPException
-from models import Task, TaskCreate, TaskUpdate
-from database import get_db_connection
+from models import TaskCreate, TaskUpdate
+from database import db_connection
 from mysql.connector import Error
 from typing import List, Optional
-from datetime import datetime
+from datetime import datetime, timezone
+from config import TASKS_PAGE_DEFAULT_LIMIT, EXPORT_BATCH_SIZE
+from serialization import dumps, task_row
+import task_events
+import base64
+import heapq
+import json
 import logging
-import traceback
 
-# Configurar logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def format_datetime(dt):
-    """Convierte datetime a string ISO de forma segura"""
-    if dt is None:
-        return datetime.utcnow().isoformat()
-    if isinstance(dt, datetime):
-        return dt.isoformat()
-    if isinstance(dt, str):
-        return dt
-    return str(dt)
-
-def get_tasks_route(user_id: int, completed: Optional[bool] = None, priority: Optional[str] = None) -> List[Task]:
-    """Obtiene todas las tareas del usuario con filtros opcionales"""
+# Columnas de la tabla tasks que se pueden pedir con ?fields=
+TASK_FIELDS = ("id", "user_id", "title", "description", "completed", "priority", "due_date", "created_at", "updated_at")
+
+# Consultas fijas por clave primaria (compartidas con async_routes; migrate.py --explain las revisa)
+TASK_BY_ID_QUERY = "SELECT * FROM tasks WHERE id = %s AND user_id = %s"
+DELETE_TASK_QUERY = "DELETE FROM tasks WHERE id = %s AND user_id = %s"
+# Fechas de una tarea recién insertada: las pone MySQL (CURRENT_TIMESTAMP), el único reloj de las escrituras
+TASK_TIMESTAMPS_QUERY = "SELECT created_at, updated_at FROM tasks WHERE id = %s"
+
+# Tareas archivadas (archive.py): mismas columnas que tasks y el mismo id
+ARCHIVED_TASK_BY_ID_QUERY = f"SELECT {', '.join(TASK_FIELDS)} FROM tasks_archive WHERE id = %s AND user_id = %s"
+
+def parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """Valida la proyección ?fields=a,b; id y created_at siempre se incluyen (los usa el cursor)"""
+    if not fields:
+        return None
+    requested = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in requested if f not in TASK_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Campos desconocidos: {', '.join(unknown)}")
+    return [f for f in TASK_FIELDS if f in requested or f in ("id", "created_at")]
+
+def encode_cursor(row: dict) -> str:
+    """Cursor opaco con la posición (created_at, id) de la última fila de la página"""
+    created_at = row['created_at']
+    if isinstance(created_at, datetime):
+        created_at = created_at.isoformat()
+    raw = json.dumps([created_at, row['id']]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip("=")
+
+def decode_cursor(cursor: str):
     try:
-        logger.info(f"📋 Obteniendo tareas para user_id: {user_id}")
-        connection = get_db_connection()
-        cursor = connection.cursor(dictionary=True)
-        
-        query = "SELECT * FROM tasks WHERE user_id = %s"
-        params = [user_id]
-        
-        if completed is not None:
-            query += " AND completed = %s"
-            params.append(completed)
-        
-        if priority:
-            query += " AND priority = %s"
-            params.append(priority)
-        
-        query += " ORDER BY created_at DESC"
-        
-        logger.info(f"Query: {query}, Params: {params}")
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, task_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), int(task_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+def build_tasks_query(user_id: int, completed: Optional[bool] = None, priority: Optional[str] = None,
+                      limit: Optional[int] = None, cursor: Optional[str] = None,
+                      columns: Optional[List[str]] = None, include_archived: bool = False,
+                      table: str = "tasks"):
+    """Construye la consulta del listado de tareas (compartida con async_routes).
+
+    Con limit/cursor pagina por keyset sobre (created_at, id): cada combinación
+    de filtros tiene un índice (user_id[, completed][, priority], created_at, id)
+    que se recorre en orden en lugar de ordenar todo el resultado.
+    Se pide una fila de más para saber si existe una página siguiente.
+
+    Con include_archived y limit se une tasks_archive (UNION ALL): cada rama
+    lee su índice en orden hasta el LIMIT y solo se ordenan esas filas. Sin
+    limit la unión ordenaría la cuenta entera en una tabla temporal: ver
+    build_tasks_queries. Las tareas archivadas están completadas, así que con
+    completed=false no se lee. table="tasks_archive" lee solo el archivo.
+    """
+    conditions = "user_id = %s"
+    params = [user_id]
+    
+    if completed is not None:
+        conditions += " AND completed = %s"
+        params.append(completed)
+    
+    if priority:
+        conditions += " AND priority = %s"
+        params.append(priority)
+    
+    if cursor:
+        created_at, task_id = decode_cursor(cursor)
+        conditions += " AND (created_at < %s OR (created_at = %s AND id < %s))"
+        params.extend([created_at, created_at, task_id])
+    
+    order = " ORDER BY created_at DESC, id DESC"
+    page = " LIMIT %s" if limit is not None else ""
+    page_params = [limit + 1] if limit is not None else []
+    
+    if table == "tasks_archive":
+        query = f"SELECT {', '.join(columns or TASK_FIELDS)} FROM tasks_archive WHERE {conditions}{order}{page}"
+        return query, params + page_params
+    
+    if not include_archived or completed is False:
+        query = f"SELECT {', '.join(columns) if columns else '*'} FROM tasks WHERE {conditions}{order}{page}"
+        return query, params + page_params
+    
+    if limit is None:
+        raise ValueError("include_archived sin limit: usar build_tasks_queries")
+    
+    select = f"SELECT {', '.join(columns or TASK_FIELDS)} FROM {{table}} WHERE {conditions}{order}{page}"
+    query = (f"({select.format(table='tasks')}) UNION ALL ({select.format(table='tasks_archive')})"
+             f"{order}{page}")
+    return query, (params + page_params) * 2 + page_params
+
+def build_tasks_queries(user_id: int, completed: Optional[bool] = None, priority: Optional[str] = None,
+                        limit: Optional[int] = None, cursor: Optional[str] = None,
+                        columns: Optional[List[str]] = None, include_archived: bool = False) -> list:
+    """[(consulta, parámetros)] del listado, cada una ordenada por (created_at, id) DESC.
+
+    Una sola consulta salvo include_archived sin limit: entonces una por tabla,
+    cada una recorre su índice ya en orden, y merge_task_rows las intercala.
+    """
+    if include_archived and limit is None and completed is not False:
+        args = (user_id, completed, priority, limit, cursor, columns)
+        return [build_tasks_query(*args), build_tasks_query(*args, table="tasks_archive")]
+    return [build_tasks_query(user_id, completed, priority, limit, cursor, columns, include_archived)]
+
+def merge_task_rows(results: list) -> list:
+    """Intercala listas de filas ya ordenadas por (created_at, id) DESC sin volver a ordenarlas"""
+    if len(results) == 1:
+        return list(results[0])
+    return list(heapq.merge(*results, key=lambda row: (row["created_at"], row["id"]), reverse=True))
+
+def page_limit(limit: Optional[int], cursor: Optional[str]) -> Optional[int]:
+    """Sin limit ni cursor se devuelve la lista completa (compatibilidad con el frontend)"""
+    if limit is None and cursor:
+        return TASKS_PAGE_DEFAULT_LIMIT
+    return limit
+
+def build_tasks_page(rows: list, limit: Optional[int], columns: Optional[List[str]]):
+    """Recorta la fila extra y calcula el siguiente cursor; las filas se devuelven sin copiar"""
+    next_cursor = None
+    if limit is not None and len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1])
+    
+    return [task_row(row) for row in rows], next_cursor
+
+def encode_export_chunk(rows: list, fmt: str, first: bool) -> bytes:
+    """Serializa un lote de filas de la BD directamente a NDJSON o a un trozo de array JSON"""
+    lines = [dumps(task_row(row)) for row in rows]
+    if fmt == "ndjson":
+        return b"\n".join(lines) + b"\n"
+    return (b"" if first else b",") + b",".join(lines)
+
+def iter_export_chunks(batches, fmt: str):
+    """Genera la exportación lote a lote a partir de un iterable de listas de filas"""
+    if fmt == "json":
+        yield b"["
+    first = True
+    for rows in batches:
+        yield encode_export_chunk(rows, fmt, first)
+        first = False
+    if fmt == "json":
+        yield b"]"
+
+def export_queries(user_id: int) -> list:
+    """Consultas de la exportación: primero tasks y después tasks_archive, cada una por su índice"""
+    return build_tasks_queries(user_id, include_archived=True)
+
+def iter_query_batches(cursor, queries):
+    """Ejecuta las consultas una tras otra en un cursor sin buffer y entrega sus filas por lotes"""
+    for query, params in queries:
         cursor.execute(query, tuple(params))
-        tasks = cursor.fetchall()
-        logger.info(f"✅ Tareas encontradas: {len(tasks)}")
-        
-        cursor.close()
-        connection.close()
-        
-        # Convertir datetime a string
-        for task in tasks:
-            logger.info(f"Procesando tarea ID: {task.get('id')}")
-            task['created_at'] = format_datetime(task.get('created_at'))
-            task['updated_at'] = format_datetime(task.get('updated_at'))
-        
-        return [Task(**task) for task in tasks]
+        while True:
+            rows = cursor.fetchmany(EXPORT_BATCH_SIZE)
+            if not rows:
+                break
+            yield rows
+
+def utc_now() -> datetime:
+    """Fecha actual en UTC con precisión de segundos (como las columnas TIMESTAMP)"""
+    return datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0)
+
+def build_insert_query(user_id: int, task: TaskCreate):
+    """INSERT de una tarea; created_at/updated_at los pone MySQL (ver TASK_TIMESTAMPS_QUERY)"""
+    query = """INSERT INTO tasks (user_id, title, description, priority, due_date) 
+               VALUES (%s, %s, %s, %s, %s)"""
+    return query, (user_id, task.title, task.description, task.priority, task.due_date)
+
+def build_created_task(task_id: int, user_id: int, task: TaskCreate, timestamps: dict) -> dict:
+    """Fila equivalente a la recién insertada: los valores enviados y las fechas leídas de MySQL"""
+    return {
+        "id": task_id,
+        "user_id": user_id,
+        "title": task.title,
+        "description": task.description,
+        "completed": False,
+        "priority": task.priority,
+        "due_date": task.due_date,
+        "created_at": timestamps["created_at"],
+        "updated_at": timestamps["updated_at"],
+    }
+
+def build_update_assignments(task: TaskUpdate):
+    """Lista de asignaciones `campo = %s` y sus parámetros para los campos proporcionados"""
+    update_fields = []
+    params = []
+    
+    if task.title is not None:
+        update_fields.append("title = %s")
+        params.append(task.title)
+    
+    if task.description is not None:
+        update_fields.append("description = %s")
+        params.append(task.description)
+    
+    if task.completed is not None:
+        update_fields.append("completed = %s")
+        params.append(task.completed)
+    
+    if task.priority is not None:
+        update_fields.append("priority = %s")
+        params.append(task.priority)
+    
+    if task.due_date is not None:
+        update_fields.append("due_date = %s")
+        params.append(task.due_date)
+    
+    return update_fields, params
+
+def build_update_query(user_id: int, task_id: int, task: TaskUpdate):
+    """Construye el UPDATE solo con los campos proporcionados; None si no hay cambios"""
+    update_fields, params = build_update_assignments(task)
+    if not update_fields:
+        return None
+    
+    update_fields.append("updated_at = CURRENT_TIMESTAMP")
+    query = f"UPDATE tasks SET {', '.join(update_fields)} WHERE id = %s AND user_id = %s"
+    params.extend([task_id, user_id])
+    return query, params
+
+def build_restore_queries(user_id: int, task_ids: list) -> list:
+    """Sentencias que devuelven tareas archivadas a tasks (con @task_archiving los triggers no las cuentan)"""
+    columns = ", ".join(TASK_FIELDS)
+    placeholders = ", ".join(["%s"] * len(task_ids))
+    where = f"user_id = %s AND id IN ({placeholders})"
+    return [
+        ("SET @task_archiving = 1", ()),
+        (f"INSERT INTO tasks ({columns}) SELECT {columns} FROM tasks_archive WHERE {where}", (user_id, *task_ids)),
+        (f"DELETE FROM tasks_archive WHERE {where}", (user_id, *task_ids)),
+    ]
+
+RESTORE_DONE_QUERY = "SET @task_archiving = NULL"
+
+def archived_ids_query(user_id: int, task_ids: list):
+    """Ids de `task_ids` que están archivados, bloqueándolos hasta el commit"""
+    placeholders = ", ".join(["%s"] * len(task_ids))
+    return (f"SELECT id FROM tasks_archive WHERE user_id = %s AND id IN ({placeholders}) FOR UPDATE",
+            (user_id, *task_ids))
+
+def restore_archived_tasks(cursor, user_id: int, task_ids) -> set:
+    """Devuelve a tasks, dentro de la transacción de `cursor`, las tareas archivadas de `task_ids`.
+
+    Lo usan las escrituras sobre tareas que no están en tasks: la tarea vuelve
+    a la tabla viva y la escritura se aplica como a cualquier otra. Retorna
+    los ids restaurados.
+    """
+    task_ids = sorted(set(task_ids))
+    if not task_ids:
+        return set()
+    cursor.execute(*archived_ids_query(user_id, task_ids))
+    found = sorted(row["id"] if isinstance(row, dict) else row[0] for row in cursor.fetchall())
+    if not found:
+        return set()
+    try:
+        for query, params in build_restore_queries(user_id, found):
+            cursor.execute(query, params)
+    finally:
+        cursor.execute(RESTORE_DONE_QUERY)
+    logger.debug("📤 Tareas restauradas del archivo: %s", found, extra={"user_id": user_id})
+    return set(found)
+
+def get_tasks_route(user_id: int, completed: Optional[bool] = None, priority: Optional[str] = None,
+                    limit: Optional[int] = None, cursor: Optional[str] = None, fields: Optional[str] = None,
+                    include_archived: bool = False):
+    """Obtiene las tareas del usuario con filtros opcionales, paginación y proyección.
+
+    Retorna (tareas, siguiente_cursor); siguiente_cursor es None en la última página.
+    """
+    try:
+        logger.debug("📋 Obteniendo tareas para user_id: %s", user_id)
+        
+        columns = parse_fields(fields)
+        limit = page_limit(limit, cursor)
+        queries = build_tasks_queries(user_id, completed, priority, limit, cursor, columns, include_archived)
+        
+        results = []
+        with db_connection() as connection:
+            cursor_db = connection.cursor(dictionary=True)
+            for query, params in queries:
+                logger.debug("Query: %s, Params: %s", query, params)
+                cursor_db.execute(query, tuple(params))
+                results.append(cursor_db.fetchall())
+            cursor_db.close()
+        tasks = merge_task_rows(results)
+        logger.debug("✅ Tareas encontradas: %d", len(tasks))
+        
+        return build_tasks_page(tasks, limit, columns)
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"❌ Error en get_tasks_route: {str(e)}")
-        logger.error(traceback.format_exc())
+        logger.exception("❌ Error en get_tasks_route: %s", e)
         raise HTTPException(status_code=500, detail=f"Error al obtener tareas: {str(e)}")
 
-def create_task_route(user_id: int, task: TaskCreate) -> Task:
-    """Crea una nueva tarea"""
+def create_task_route(user_id: int, task: TaskCreate) -> dict:
+    """Crea una nueva tarea (INSERT y lectura de sus fechas por clave primaria antes del commit)"""
     try:
-        logger.info(f"📝 Creando tarea para user_id: {user_id}, título: {task.title}")
-        connection = get_db_connection()
-        cursor = connection.cursor(dictionary=True)
-        
-        cursor.execute(
-            """INSERT INTO tasks (user_id, title, description, priority, due_date) 
-               VALUES (%s, %s, %s, %s, %s)""",
-            (user_id, task.title, task.description, task.priority, task.due_date)
-        )
-        connection.commit()
-        task_id = cursor.lastrowid
-        logger.info(f"✅ Tarea creada con ID: {task_id}")
-        
-        cursor.execute("SELECT * FROM tasks WHERE id = %s", (task_id,))
-        new_task = cursor.fetchone()
-        logger.info(f"Tarea recuperada: {new_task}")
-        
-        cursor.close()
-        connection.close()
-        
-        # Convertir datetime a string
-        new_task['created_at'] = format_datetime(new_task.get('created_at'))
-        new_task['updated_at'] = format_datetime(new_task.get('updated_at'))
-        
-        logger.info(f"Tarea formateada: {new_task}")
-        return Task(**new_task)
+        logger.debug("📝 Creando tarea para user_id: %s, título: %s", user_id, task.title)
+        query, params = build_insert_query(user_id, task)
+        with db_connection() as connection:
+            cursor = connection.cursor(dictionary=True)
+            try:
+                cursor.execute(query, params)
+                task_id = cursor.lastrowid
+                cursor.execute(TASK_TIMESTAMPS_QUERY, (task_id,))
+                timestamps = cursor.fetchone()
+                connection.commit()
+            finally:
+                cursor.close()
+        new_task = build_created_task(task_id, user_id, task, timestamps)
+        task_events.tasks_changed(user_id, [task_events.created(new_task)])
+        logger.info("✅ Tarea creada con ID: %s", task_id, extra={"user_id": user_id})
+        
+        return new_task
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"❌ Error en create_task_route: {str(e)}")
-        logger.error(traceback.format_exc())
+        logger.exception("❌ Error en create_task_route: %s", e)
         raise HTTPException(status_code=500, detail=f"Error al crear tarea: {str(e)}")
 
-def get_task_route(user_id: int, task_id: int) -> Task:
+def get_task_route(user_id: int, task_id: int) -> dict:
     """Obtiene una tarea específica"""
     try:
-        logger.info(f"🔍 Buscando tarea {task_id} para user_id: {user_id}")
-        connection = get_db_connection()
-        cursor = connection.cursor(dictionary=True)
-        
-        cursor.execute("SELECT * FROM tasks WHERE id = %s AND user_id = %s", (task_id, user_id))
-        task = cursor.fetchone()
-        cursor.close()
-        connection.close()
+        logger.debug("🔍 Buscando tarea %s para user_id: %s", task_id, user_id)
+        with db_connection() as connection:
+            cursor = connection.cursor(dictionary=True)
+            cursor.execute(TASK_BY_ID_QUERY, (task_id, user_id))
+            task = cursor.fetchone()
+            if not task:
+                cursor.execute(ARCHIVED_TASK_BY_ID_QUERY, (task_id, user_id))
+                task = cursor.fetchone()
+            cursor.close()
         
         if not task:
             raise HTTPException(status_code=404, detail="Tarea no encontrada")
         
-        # Convertir datetime a string
-        task['created_at'] = format_datetime(task.get('created_at'))
-        task['updated_at'] = format_datetime(task.get('updated_at'))
-        
-        logger.info(f"✅ Tarea encontrada: {task}")
-        return Task(**task)
+        logger.debug("✅ Tarea encontrada: %s", task)
+        return task_row(task)
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"❌ Error en get_task_route: {str(e)}")
-        logger.error(traceback.format_exc())
+        logger.exception("❌ Error en get_task_route: %s", e)
         raise HTTPException(status_code=500, detail=f"Error al obtener tarea: {str(e)}")
 
-def update_task_route(user_id: int, task_id: int, task: TaskUpdate) -> Task:
-    """Actualiza una tarea existente"""
+def update_task_route(user_id: int, task_id: int, task: TaskUpdate) -> dict:
+    """Actualiza una tarea existente.
+
+    El UPDATE filtra por id y user_id y su contador de filas (CLIENT_FOUND_ROWS:
+    filas encontradas, no solo modificadas) indica si la tarea existe; la fila
+    final se lee dentro de la misma transacción. Si la tarea está archivada se
+    restaura a tasks y se repite el UPDATE.
+    """
     try:
-        logger.info(f"✏️ Actualizando tarea {task_id} para user_id: {user_id}")
-        connection = get_db_connection()
-        cursor = connection.cursor(dictionary=True)
-        
-        # Verificar que la tarea existe y pertenece al usuario
-        cursor.execute("SELECT * FROM tasks WHERE id = %s AND user_id = %s", (task_id, user_id))
-        existing_task = cursor.fetchone()
-        
-        if not existing_task:
-            cursor.close()
-            connection.close()
-            raise HTTPException(status_code=404, detail="Tarea no encontrada")
-        
-        # Construir query dinámicamente solo con campos proporcionados
-        update_fields = []
-        params = []
-        
-        if task.title is not None:
-            update_fields.append("title = %s")
-            params.append(task.title)
-        
-        if task.description is not None:
-            update_fields.append("description = %s")
-            params.append(task.description)
-        
-        if task.completed is not None:
-            update_fields.append("completed = %s")
-            params.append(task.completed)
-        
-        if task.priority is not None:
-            update_fields.append("priority = %s")
-            params.append(task.priority)
-        
-        if task.due_date is not None:
-            update_fields.append("due_date = %s")
-            params.append(task.due_date)
-        
-        if update_fields:
-            update_fields.append("updated_at = CURRENT_TIMESTAMP")
-            query = f"UPDATE tasks SET {', '.join(update_fields)} WHERE id = %s AND user_id = %s"
-            params.extend([task_id, user_id])
-            
-            cursor.execute(query, tuple(params))
-            connection.commit()
-        
-        # Obtener tarea actualizada
-        cursor.execute("SELECT * FROM tasks WHERE id = %s", (task_id,))
-        updated_task = cursor.fetchone()
-        cursor.close()
-        connection.close()
-        
-        # Convertir datetime a string
-        updated_task['created_at'] = format_datetime(updated_task.get('created_at'))
-        updated_task['updated_at'] = format_datetime(updated_task.get('updated_at'))
-        
-        logger.info(f"✅ Tarea actualizada: {updated_task}")
-        return Task(**updated_task)
+        logger.debug("✏️ Actualizando tarea %s para user_id: %s", task_id, user_id)
+        update = build_update_query(user_id, task_id, task)
+        with db_connection() as connection:
+            cursor = connection.cursor(dictionary=True)
+            try:
+                if update:
+                    query, params = update
+                    cursor.execute(query, tuple(params))
+                    if cursor.rowcount == 0:
+                        if not restore_archived_tasks(cursor, user_id, [task_id]):
+                            raise HTTPException(status_code=404, detail="Tarea no encontrada")
+                        cursor.execute(query, tuple(params))
+                
+                cursor.execute(TASK_BY_ID_QUERY, (task_id, user_id))
+                updated_task = cursor.fetchone()
+                if not updated_task and not update:
+                    cursor.execute(ARCHIVED_TASK_BY_ID_QUERY, (task_id, user_id))
+                    updated_task = cursor.fetchone()
+                if not updated_task:
+                    raise HTTPException(status_code=404, detail="Tarea no encontrada")
+                
+                if update:
+                    connection.commit()
+            finally:
+                cursor.close()
+        updated_task = task_row(updated_task)
+        if update:
+            task_events.tasks_changed(user_id, [task_events.updated(updated_task)])
+        
+        logger.info("✅ Tarea actualizada: %s", task_id, extra={"user_id": user_id})
+        logger.debug("Tarea actualizada: %s", updated_task)
+        return updated_task
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"❌ Error en update_task_route: {str(e)}")
-        logger.error(traceback.format_exc())
+        logger.exception("❌ Error en update_task_route: %s", e)
         raise HTTPException(status_code=500, detail=f"Error al actualizar tarea: {str(e)}")
 
 def delete_task_route(user_id: int, task_id: int) -> dict:
-    """Elimina una tarea"""
+    """Elimina una tarea (un solo DELETE; 0 filas afectadas = no existe, no es del usuario o está archivada)"""
     try:
-        logger.info(f"🗑️ Eliminando tarea {task_id} para user_id: {user_id}")
-        connection = get_db_connection()
-        cursor = connection.cursor(dictionary=True)
-        
-        # Verificar que la tarea existe y pertenece al usuario
-        cursor.execute("SELECT * FROM tasks WHERE id = %s AND user_id = %s", (task_id, user_id))
-        task = cursor.fetchone()
-        
-        if not task:
+        logger.debug("🗑️ Eliminando tarea %s para user_id: %s", task_id, user_id)
+        with db_connection() as connection:
+            cursor = connection.cursor()
+            cursor.execute(DELETE_TASK_QUERY, (task_id, user_id))
+            deleted = cursor.rowcount
+            if not deleted and restore_archived_tasks(cursor, user_id, [task_id]):
+                cursor.execute(DELETE_TASK_QUERY, (task_id, user_id))
+                deleted = cursor.rowcount
             cursor.close()
-            connection.close()
-            raise HTTPException(status_code=404, detail="Tarea no encontrada")
-        
-        cursor.execute("DELETE FROM tasks WHERE id = %s AND user_id = %s", (task_id, user_id))
-        connection.commit()
-        cursor.close()
-        connection.close()
+            if not deleted:
+                raise HTTPException(status_code=404, detail="Tarea no encontrada")
+            connection.commit()
+        task_events.tasks_changed(user_id, [task_events.deleted(task_id)])
         
-        logger.info(f"✅ Tarea eliminada exitosamente")
+        logger.info("✅ Tarea eliminada: %s", task_id, extra={"user_id": user_id})
         return {"message": "Tarea eliminada exitosamente"}
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"❌ Error en delete_task_route: {str(e)}")
-        logger.error(traceback.format_exc())
-        raise HTTPException(status_code=500, detail=f"Error al eliminar tarea: {str(e)}")
\ No newline at end of file
+        logger.exception("❌ Error en delete_task_route: %s", e)
+        raise HTTPException(status_code=500, detail=f"Error al eliminar tarea: {str(e)}")
+
+def export_tasks_route(user_id: int, fmt: str = "ndjson"):
+    """Exporta todas las tareas del usuario como un generador de bytes.
+
+    Usa un cursor sin buffer: las filas se leen del socket de MySQL por lotes
+    de EXPORT_BATCH_SIZE y se escriben en la respuesta, así la memoria no
+    crece con el número de tareas. La conexión queda prestada mientras dura
+    la descarga. Incluye las tareas archivadas (archive.py): la exportación es
+    una copia completa de la cuenta. Salen primero las tareas de tasks y
+    después las archivadas, cada grupo por (created_at, id) DESC: una sola
+    consulta con UNION ALL ... ORDER BY obligaría a MySQL a materializar y
+    ordenar la cuenta entera antes de devolver la primera fila.
+    """
+    with db_connection() as connection:
+        cursor = connection.cursor(dictionary=True, buffered=False)
+        try:
+            yield from iter_export_chunks(iter_query_batches(cursor, export_queries(user_id)), fmt)
+        finally:
+            try:
+                cursor.close()
+            except Error:
+                pass  # descarga interrumpida: el pool descarta la conexión con resultados sin leer
\ No newline at end of file
@@ -0,0 +1,295 @@
+"""Búsqueda de texto en las tareas: GET /tasks/search?q=.
+
+Busca en title y description. Cada palabra de q es obligatoria y se
+compara como prefijo ("inf" encuentra "informe"). Mayúsculas y acentos no
+importan. Los resultados se ordenan por relevancia y se paginan con un
+cursor opaco.
+
+Backends (TASK_SEARCH_BACKEND):
+- fulltext: MATCH ... AGAINST en modo booleano sobre el índice FULLTEXT
+  ft_tasks_text de BD/schema.sql. La relevancia es la de InnoDB. Las
+  palabras que el índice no contiene (más cortas que
+  TASK_SEARCH_MIN_TOKEN_SIZE o stopwords de InnoDB) se buscan con LIKE
+  sobre las tareas del usuario en lugar de devolver cero resultados.
+  El índice FULLTEXT no puede incluir user_id: MATCH recorre las
+  coincidencias de todos los usuarios y filtra después, así que su coste
+  crece con la tabla entera. Un usuario con hasta TASK_SEARCH_LIKE_MAX_TASKS
+  tareas (la mayoría) busca solo con LIKE sobre sus filas (idx_user_created),
+  con relevancia = palabras encontradas en el título.
+- memory: índice invertido en el proceso, construido por usuario a partir
+  de la tabla tasks la primera vez que busca y descartado cuando sus tareas
+  cambian (task_events). Pensado para pruebas y entornos sin el índice
+  FULLTEXT. La relevancia es TF-IDF.
+"""
+from fastapi import HTTPException
+from database import db_connection
+from serialization import task_row
+from cache import TTLCache
+from config import (
+    TASK_SEARCH_BACKEND,
+    TASK_SEARCH_MAX_TERMS,
+    TASK_SEARCH_INDEX_USERS,
+    TASK_SEARCH_MIN_TOKEN_SIZE,
+    TASK_SEARCH_LIKE_MAX_TASKS,
+    TASKS_PAGE_DEFAULT_LIMIT,
+)
+from bisect import bisect_left
+from typing import Optional
+import base64
+import heapq
+import json
+import logging
+import math
+import re
+import threading
+import unicodedata
+import task_events
+
+logger = logging.getLogger(__name__)
+
+_WORD = re.compile(r"\w+")
+
+# innodb_ft_default_stopword: MySQL no las indexa y +palabra* con ellas no encuentra nada
+FULLTEXT_STOPWORDS = frozenset((
+    "a", "about", "an", "are", "as", "at", "be", "by", "com", "de", "en", "for", "from", "how", "i", "in",
+    "is", "it", "la", "of", "on", "or", "that", "the", "this", "to", "was", "what", "when", "where", "who",
+    "will", "with", "und", "www",
+))
+
+# Una fila si el usuario tiene más de N tareas: lee como mucho N + 1 entradas de idx_user_created
+USER_HAS_MORE_TASKS_QUERY = "SELECT id FROM tasks WHERE user_id = %s LIMIT 1 OFFSET %s"
+
+
+def tokenize(text: str) -> list:
+    """Palabras en minúsculas y sin acentos (como la collation *_ai_ci de MySQL)"""
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return _WORD.findall(text)
+
+
+def parse_search_terms(q: str) -> list:
+    """Términos únicos de la consulta, en orden; 400 si no queda ninguno"""
+    terms = list(dict.fromkeys(tokenize(q or "")))[:TASK_SEARCH_MAX_TERMS]
+    if not terms:
+        raise HTTPException(status_code=400, detail="La búsqueda necesita al menos una palabra")
+    return terms
+
+
+def encode_search_cursor(offset: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps([offset]).encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_search_cursor(cursor: Optional[str]) -> int:
+    if not cursor:
+        return 0
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        (offset,) = json.loads(raw)
+        return max(0, int(offset))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+
+def split_search_terms(terms: list):
+    """(términos que están en el índice FULLTEXT, términos que hay que buscar con LIKE)"""
+    indexed = [term for term in terms if len(term) >= TASK_SEARCH_MIN_TOKEN_SIZE and term not in FULLTEXT_STOPWORDS]
+    return indexed, [term for term in terms if term not in indexed]
+
+
+def build_search_query(user_id: int, terms: list, completed: Optional[bool], priority: Optional[str],
+                       limit: int, offset: int, fulltext: bool = True):
+    """Consulta FULLTEXT en modo booleano: +término* por palabra (obligatoria y por prefijo).
+
+    tokenize() deja solo caracteres de palabra, así que los operadores
+    booleanos de MySQL no pueden colarse desde q. Los términos fuera del
+    índice (todos con fulltext=False) se exigen con LIKE '%término%' en
+    title o description; sin ningún término indexado la relevancia es el
+    número de términos que aparecen en el título. Se pide una fila de más
+    para saber si hay página siguiente.
+    """
+    indexed, unindexed = split_search_terms(terms) if fulltext else ([], list(terms))
+    # `_` es carácter de palabra y comodín de LIKE
+    patterns = ["%" + term.replace("_", "\\_") + "%" for term in unindexed]
+    if indexed:
+        against = " ".join(f"+{term}*" for term in indexed)
+        query = """SELECT *, MATCH(title, description) AGAINST (%s IN BOOLEAN MODE) AS score
+                   FROM tasks
+                   WHERE user_id = %s AND MATCH(title, description) AGAINST (%s IN BOOLEAN MODE)"""
+        params = [against, user_id, against]
+    else:
+        score = " + ".join(["(title LIKE %s)"] * len(patterns))
+        query = f"SELECT *, {score} AS score FROM tasks WHERE user_id = %s"
+        params = [*patterns, user_id]
+
+    for pattern in patterns:
+        query += " AND (title LIKE %s OR description LIKE %s)"
+        params.extend([pattern, pattern])
+
+    if completed is not None:
+        query += " AND completed = %s"
+        params.append(completed)
+
+    if priority:
+        query += " AND priority = %s"
+        params.append(priority)
+
+    query += " ORDER BY score DESC, id DESC LIMIT %s OFFSET %s"
+    params.extend([limit + 1, offset])
+    return query, params
+
+
+class UserSearchIndex:
+    """Índice invertido de las tareas de un usuario: término -> {task_id: frecuencia}"""
+
+    def __init__(self, rows: list):
+        self.tasks = {}
+        self.postings = {}
+        for row in rows:
+            self.tasks[row["id"]] = row
+            for term in tokenize(f"{row['title']} {row.get('description') or ''}"):
+                docs = self.postings.setdefault(term, {})
+                docs[row["id"]] = docs.get(row["id"], 0) + 1
+        self.terms = sorted(self.postings)  # para expandir prefijos con bisect
+
+    def _expand(self, prefix: str):
+        i = bisect_left(self.terms, prefix)
+        while i < len(self.terms) and self.terms[i].startswith(prefix):
+            yield self.terms[i]
+            i += 1
+
+    def search(self, terms: list, completed: Optional[bool] = None, priority: Optional[str] = None,
+               top: Optional[int] = None) -> list:
+        """Los `top` mejores (score, task_id) por relevancia, con todos los términos presentes"""
+        total = len(self.tasks)
+        scores = None
+        for prefix in terms:
+            term_scores = {}
+            for term in self._expand(prefix):
+                docs = self.postings[term]
+                idf = math.log(1 + total / len(docs))
+                for task_id, tf in docs.items():
+                    term_scores[task_id] = term_scores.get(task_id, 0.0) + tf * idf
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {task_id: score + term_scores[task_id]
+                          for task_id, score in scores.items() if task_id in term_scores}
+            if not scores:
+                return []
+
+        results = []
+        for task_id, score in scores.items():
+            task = self.tasks[task_id]
+            if completed is not None and bool(task["completed"]) != completed:
+                continue
+            if priority and task["priority"] != priority:
+                continue
+            results.append((score, task_id))
+        if top is not None:
+            return heapq.nlargest(top, results)
+        results.sort(reverse=True)
+        return results
+
+
+class MemorySearchIndex:
+    """Índices por usuario construidos bajo demanda (LRU de TASK_SEARCH_INDEX_USERS usuarios)"""
+
+    def __init__(self, max_users: int):
+        self._indexes = TTLCache(max_users, float("inf"))
+        # Solo de usuarios con un índice en construcción: evitan guardar uno construido
+        # antes de un cambio y se borran al terminar la última construcción
+        self._loading = {}      # user_id -> construcciones en curso
+        self._generations = {}  # user_id -> invalidaciones durante esas construcciones
+        self._lock = threading.Lock()  # invalidate_user y get llegan desde varios hilos
+
+    def invalidate_user(self, user_id: int):
+        with self._lock:
+            if user_id in self._loading:
+                self._generations[user_id] = self._generations.get(user_id, 0) + 1
+            self._indexes.pop(user_id)
+
+    def get(self, user_id: int, load_rows) -> UserSearchIndex:
+        index = self._indexes.get(user_id)
+        if index is None:
+            with self._lock:
+                self._loading[user_id] = self._loading.get(user_id, 0) + 1
+                generation = self._generations.get(user_id, 0)
+            try:
+                index = UserSearchIndex(load_rows())  # fuera del lock: lee MySQL
+                with self._lock:
+                    if self._generations.get(user_id, 0) == generation:
+                        self._indexes.set(user_id, index)
+            finally:
+                with self._lock:
+                    self._loading[user_id] -= 1
+                    if not self._loading[user_id]:
+                        del self._loading[user_id]
+                        self._generations.pop(user_id, None)
+        return index
+
+    def stats(self) -> dict:
+        return {"backend": "memory", **self._indexes.stats()}
+
+
+memory_index = MemorySearchIndex(TASK_SEARCH_INDEX_USERS) if TASK_SEARCH_BACKEND == "memory" else None
+if memory_index is not None:
+    task_events.subscribe(memory_index.invalidate_user)
+
+
+def _search_fulltext(user_id, terms, completed, priority, limit, offset) -> list:
+    with db_connection() as connection:
+        cursor = connection.cursor(dictionary=True)
+        fulltext = True
+        if TASK_SEARCH_LIKE_MAX_TASKS > 0:
+            cursor.execute(USER_HAS_MORE_TASKS_QUERY, (user_id, TASK_SEARCH_LIKE_MAX_TASKS))
+            fulltext = cursor.fetchone() is not None
+        query, params = build_search_query(user_id, terms, completed, priority, limit, offset, fulltext)
+        cursor.execute(query, tuple(params))
+        rows = cursor.fetchall()
+        cursor.close()
+    for row in rows:
+        row["score"] = float(row["score"])
+    return rows
+
+
+def _search_memory(user_id, terms, completed, priority, limit, offset) -> list:
+    def load_rows():
+        with db_connection() as connection:
+            cursor = connection.cursor(dictionary=True)
+            cursor.execute("SELECT * FROM tasks WHERE user_id = %s", (user_id,))
+            rows = cursor.fetchall()
+            cursor.close()
+        return rows
+
+    index = memory_index.get(user_id, load_rows)
+    matches = index.search(terms, completed, priority, top=offset + limit + 1)[offset:]
+    return [{**index.tasks[task_id], "score": round(score, 6)} for score, task_id in matches]
+
+
+def search_tasks_route(user_id: int, q: str, completed: Optional[bool] = None, priority: Optional[str] = None,
+                       limit: Optional[int] = None, cursor: Optional[str] = None):
+    """Busca tareas del usuario por texto. Retorna (tareas, siguiente_cursor)."""
+    terms = parse_search_terms(q)
+    offset = decode_search_cursor(cursor)
+    limit = limit or TASKS_PAGE_DEFAULT_LIMIT
+    try:
+        search = _search_memory if memory_index is not None else _search_fulltext
+        rows = search(user_id, terms, completed, priority, limit, offset)
+        logger.debug("🔎 Búsqueda %s para user_id %s: %d resultados", terms, user_id, len(rows))
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("❌ Error en search_tasks_route: %s", e)
+        raise HTTPException(status_code=500, detail=f"Error al buscar tareas: {str(e)}")
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_search_cursor(offset + limit)
+    return [task_row(row) for row in rows], next_cursor
+
+
+def get_search_stats() -> dict:
+    if memory_index is not None:
+        return memory_index.stats()
+    return {"backend": "fulltext"}
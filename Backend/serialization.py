@@ -0,0 +1,57 @@
+"""Serialización JSON de las respuestas de tareas.
+
+Las filas de MySQL se devuelven tal cual (datetime/date nativos, sin pasar por
+format_datetime ni por Task(**fila)) y se codifican una sola vez con orjson.
+Los datos vienen de la propia BD, así que no se vuelven a validar con pydantic;
+los modelos de models.py siguen describiendo la respuesta en OpenAPI.
+
+orjson es opcional: si no está instalado se usa json de la stdlib con el
+mismo resultado (sin espacios, fechas en ISO 8601, UTF-8 sin escapar).
+"""
+from datetime import date, datetime
+from fastapi.responses import JSONResponse
+from metrics import SERIALIZE_SECONDS
+from time import perf_counter
+import json
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depende del entorno
+    orjson = None
+
+
+def _default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Tipo no serializable: {type(value).__name__}")
+
+
+if orjson is not None:
+    def _encode(content) -> bytes:
+        return orjson.dumps(content, default=_default)
+else:
+    def _encode(content) -> bytes:
+        return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def dumps(content) -> bytes:
+    """Serializa a JSON compacto en bytes"""
+    start = perf_counter()
+    body = _encode(content)
+    SERIALIZE_SECONDS.observe(perf_counter() - start)
+    return body
+
+
+def task_row(row: dict) -> dict:
+    """Deja una fila de tasks lista para serializar: completed llega como TINYINT (0/1)"""
+    if 'completed' in row:
+        row['completed'] = bool(row['completed'])
+    return row
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse que codifica con dumps(); las rutas de tareas la devuelven
+    directamente para que FastAPI no repita la validación del response_model"""
+
+    def render(self, content) -> bytes:
+        return dumps(content)
@@ -0,0 +1,165 @@
+"""Arranque de la API en producción: `python serve.py` (o `python -m serve`).
+
+Lanza SERVER_WORKERS procesos de uvicorn (por defecto uno por CPU) que
+comparten el socket de escucha; el proceso padre los vigila y reinicia los
+que mueran.
+
+- uvloop y httptools se usan si están instalados (`pip install uvloop
+  httptools`); si no, asyncio y h11.
+- Cada worker tiene su pool de MySQL y su threadpool de THREADPOOL_SIZE
+  hilos (ver main.lifespan); se avisa si workers × conexiones supera
+  max_connections habitual. Si HASH_WORKERS no está fijado, los procesos de
+  bcrypt se reparten entre los workers en lugar de crear uno por CPU en
+  cada uno.
+- La caché de listados `memory` (TASK_CACHE_BACKEND) es local a cada
+  proceso: con varios workers una escritura en uno no invalida la copia de
+  los demás, que seguirían sirviendo listas y 304 obsoletos. Si
+  TASK_CACHE_BACKEND no está fijado se arranca sin caché (`none`); si se
+  fija a `memory` explícitamente, se avisa.
+- Los eventos de GET /tasks/stream con TASK_EVENTS_BACKEND=local tampoco
+  salen del worker: un cliente conectado a otro no recibe el cambio ni
+  puede reanudar con Last-Event-ID. Con varios workers hace falta `redis`;
+  si TASK_EVENTS_BACKEND no está fijado se arranca con `none` (el stream
+  responde 503) y con `local` explícito no se arranca.
+- El resto del estado por proceso no tiene un valor seguro que forzar y se
+  avisa al arrancar (per_worker_warnings): el índice de búsqueda `memory`
+  no ve las escrituras de otros workers, cada worker mantiene su propio
+  planificador de recordatorios (reminder_log evita avisos duplicados, pero
+  la carga de ventanas se repite en cada uno) y los límites de
+  RATE_LIMIT_BACKEND=memory se cuentan por worker, así que el límite
+  efectivo es hasta workers × el configurado.
+- Antes de arrancar los workers se importa main una vez en el padre: un
+  error de configuración o de import falla aquí, no en bucle en cada
+  worker. Los workers se crean con spawn y vuelven a importar la app (el
+  hilo de logging y los pools no sobreviven a un fork).
+- Señales: SIGTERM/SIGINT paran dejando SERVER_GRACEFUL_TIMEOUT segundos a
+  las peticiones en curso; con 2 o más workers, SIGHUP los reinicia uno a
+  uno (recargar código o .env sin cerrar el socket) y SIGTTIN/SIGTTOU
+  añaden o quitan un worker.
+"""
+import argparse
+import logging
+import os
+
+import uvicorn
+
+import config
+
+logger = logging.getLogger("serve")
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+MYSQL_DEFAULT_MAX_CONNECTIONS = 151
+
+
+def available(module: str) -> bool:
+    try:
+        __import__(module)
+        return True
+    except ImportError:
+        return False
+
+
+def build_options(workers: int) -> dict:
+    """Argumentos de uvicorn.run para `workers` procesos"""
+    return {
+        "host": config.SERVER_HOST,
+        "port": config.SERVER_PORT,
+        "workers": workers,
+        "loop": "uvloop" if available("uvloop") else "asyncio",
+        "http": "httptools" if available("httptools") else "h11",
+        "backlog": config.SERVER_BACKLOG,
+        "timeout_keep_alive": config.SERVER_KEEPALIVE,
+        "timeout_graceful_shutdown": config.SERVER_GRACEFUL_TIMEOUT,
+        # Sin proceso padre (1 worker) nadie lo reiniciaría: solo con varios
+        "limit_max_requests": (config.SERVER_MAX_REQUESTS or None) if workers > 1 else None,
+        "access_log": config.SERVER_ACCESS_LOG,
+        "log_level": config.LOG_LEVEL.lower(),
+        "app_dir": BACKEND_DIR,
+    }
+
+
+def configure_task_cache():
+    """Con varios workers la caché de listados debe ser compartida (redis) o no existir"""
+    backend = os.environ.get("TASK_CACHE_BACKEND")
+    if backend is None:
+        os.environ["TASK_CACHE_BACKEND"] = "none"
+        logger.info("🗂️ Varios workers sin TASK_CACHE_BACKEND: caché de listados desactivada "
+                    "(usa TASK_CACHE_BACKEND=redis para compartirla)")
+    elif backend.strip().lower() == "memory":
+        logger.warning("⚠️ TASK_CACHE_BACKEND=memory con varios workers: cada worker puede servir listados "
+                       "y 304 obsoletos hasta TASK_CACHE_TTL tras un cambio hecho en otro; usa redis")
+
+
+def configure_task_events():
+    """Con varios workers los eventos SSE deben repartirse por redis o desactivarse"""
+    backend = os.environ.get("TASK_EVENTS_BACKEND")
+    if backend is None:
+        os.environ["TASK_EVENTS_BACKEND"] = "none"
+        logger.info("📡 Varios workers sin TASK_EVENTS_BACKEND: GET /tasks/stream desactivado "
+                    "(usa TASK_EVENTS_BACKEND=redis para repartir los eventos entre workers)")
+    elif backend.strip().lower() == "local":
+        raise SystemExit("TASK_EVENTS_BACKEND=local no funciona con varios workers: los clientes de "
+                         "GET /tasks/stream de un worker no ven los cambios hechos en otro. "
+                         "Usa TASK_EVENTS_BACKEND=redis (o none), o --workers 1")
+
+
+def per_worker_warnings(workers: int) -> list:
+    """Avisos del estado que cada worker guarda por su cuenta y diverge entre workers"""
+    warnings = []
+    if config.TASK_SEARCH_BACKEND == "memory":
+        warnings.append("TASK_SEARCH_BACKEND=memory: el índice de búsqueda de cada worker no ve las escrituras "
+                        "hechas en los demás; usa fulltext")
+    if config.REMINDERS_ENABLED:
+        warnings.append(f"REMINDERS_ENABLED: los {workers} workers cargan y disparan recordatorios por su cuenta "
+                        "(reminder_log evita duplicados); para uno solo, REMINDERS_ENABLED=false y un proceso "
+                        "aparte con REMINDERS_ENABLED=true")
+    if config.RATE_LIMIT_ENABLED and config.RATE_LIMIT_BACKEND != "redis":
+        warnings.append(f"RATE_LIMIT_BACKEND={config.RATE_LIMIT_BACKEND}: los límites se cuentan por worker, "
+                        f"el efectivo es hasta {workers}× el configurado; usa redis")
+    return warnings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Arranca la API con varios workers de uvicorn")
+    parser.add_argument("--workers", type=int, default=config.SERVER_WORKERS)
+    parser.add_argument("--port", type=int, default=None)
+    args = parser.parse_args()
+
+    workers = max(1, args.workers)
+    # Reparto de bcrypt entre workers: los hijos heredan el entorno y leen config al importar
+    cpus = os.cpu_count() or 1
+    os.environ.setdefault("HASH_WORKERS", str(max(1, cpus // workers)))
+    if args.port is not None:
+        os.environ["PORT"] = str(args.port)
+        config.SERVER_PORT = args.port
+
+    import main as app_module  # precarga: falla aquí si la app no importa
+    if workers > 1:
+        # Los workers leen el entorno al arrancar (spawn)
+        try:
+            configure_task_events()
+        except SystemExit:
+            app_module.shutdown_logging()
+            raise
+        configure_task_cache()
+        for warning in per_worker_warnings(workers):
+            logger.warning("⚠️ %s", warning)
+    options = build_options(workers)
+
+    connections = workers * config.db_connections_per_worker()
+    logger.info("🚀 %d worker(s) en %s:%d (loop=%s, http=%s, threadpool=%d, HASH_WORKERS=%s, DB_MODE=%s)",
+                workers, options["host"], options["port"], options["loop"], options["http"],
+                config.THREADPOOL_SIZE, os.environ["HASH_WORKERS"], config.DB_MODE)
+    if connections > MYSQL_DEFAULT_MAX_CONNECTIONS:
+        logger.warning("Hasta %d conexiones a MySQL (%d workers × %d por worker): revisa max_connections",
+                       connections, workers, config.db_connections_per_worker())
+
+    # Con un solo worker se sirve la app ya importada, sin proceso padre
+    try:
+        uvicorn.run(app_module.app if workers == 1 else "main:app", **options)
+    finally:
+        app_module.shutdown_logging()
+
+
+if __name__ == "__main__":
+    main()
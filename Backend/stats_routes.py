@@ -0,0 +1,128 @@
+"""Estadísticas de tareas por usuario: GET /tasks/stats.
+
+Los conteos salen de la tabla resumen task_counters (ver BD/schema.sql): una
+fila por combinación (usuario, completed, priority, due_date) con el número
+de tareas. La mantienen triggers sobre tasks en la misma transacción que
+cada INSERT/UPDATE/DELETE. Por eso cubren igual routes.py, async_routes.py y
+los lotes de batch_routes.py. Consultar las estadísticas suma unas pocas
+filas por usuario en lugar de recorrer todas sus tareas.
+
+Las fechas "vencida" y "esta semana" dependen del día en que se consulta, así
+que no se guardan: se calculan agrupando por due_date. Las tareas sin
+due_date se cuentan con NO_DUE_DATE, que nunca cae en esos rangos.
+
+Si los contadores se desincronizan (carga masiva con los triggers
+desactivados, restauración de un backup...) se reconstruyen desde tasks:
+
+    python stats_routes.py --rebuild [--user-id N]
+"""
+from fastapi import HTTPException
+from database import db_connection
+from routes import utc_now
+from datetime import date, timedelta
+from typing import Optional
+import argparse
+import logging
+
+logger = logging.getLogger(__name__)
+
+NO_DUE_DATE = date(9999, 12, 31)  # due_date NULL en task_counters (forma parte de la clave)
+PRIORITIES = ("low", "medium", "high")
+
+STATS_QUERY = """
+    SELECT
+        COALESCE(SUM(count), 0) AS total,
+        COALESCE(SUM(CASE WHEN completed THEN count ELSE 0 END), 0) AS completed,
+        COALESCE(SUM(CASE WHEN priority = 'low' THEN count ELSE 0 END), 0) AS low,
+        COALESCE(SUM(CASE WHEN priority = 'medium' THEN count ELSE 0 END), 0) AS medium,
+        COALESCE(SUM(CASE WHEN priority = 'high' THEN count ELSE 0 END), 0) AS high,
+        COALESCE(SUM(CASE WHEN NOT completed AND due_date < %s THEN count ELSE 0 END), 0) AS overdue,
+        COALESCE(SUM(CASE WHEN NOT completed AND due_date BETWEEN %s AND %s THEN count ELSE 0 END), 0) AS due_this_week
+    FROM task_counters
+    WHERE user_id = %s
+"""
+
+
+def week_bounds(today: date):
+    """Desde hoy hasta el domingo de la semana actual (semana ISO, lunes a domingo)"""
+    return today, today + timedelta(days=6 - today.weekday())
+
+
+def build_stats(row: dict) -> dict:
+    total = int(row["total"])
+    completed = int(row["completed"])
+    return {
+        "total": total,
+        "completed": completed,
+        "pending": total - completed,
+        "by_priority": {priority: int(row[priority]) for priority in PRIORITIES},
+        "overdue": int(row["overdue"]),
+        "due_this_week": int(row["due_this_week"]),
+    }
+
+
+def get_task_stats_route(user_id: int, today: Optional[date] = None) -> dict:
+    """Conteos del usuario; `today` permite al cliente usar su fecha local (por defecto, hoy en UTC)"""
+    today = today or utc_now().date()
+    week_start, week_end = week_bounds(today)
+    try:
+        with db_connection() as connection:
+            cursor = connection.cursor(dictionary=True)
+            cursor.execute(STATS_QUERY, (today, week_start, week_end, user_id))
+            row = cursor.fetchone()
+            cursor.close()
+        return build_stats(row)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("❌ Error en get_task_stats_route: %s", e)
+        raise HTTPException(status_code=500, detail=f"Error al obtener estadísticas: {str(e)}")
+
+
+def rebuild_task_counters(user_id: Optional[int] = None) -> int:
+    """Recalcula task_counters desde tasks y tasks_archive (de un usuario o de todos) en una transacción.
+
+    INSERT ... SELECT bloquea en modo compartido las filas leídas, así que las
+    escrituras concurrentes de esos usuarios esperan al commit y ningún
+    cambio se pierde. Las tareas archivadas (archive.py) siguen contando.
+    Retorna las filas de contadores escritas.
+    """
+    where, params = ("WHERE user_id = %s", (user_id,)) if user_id is not None else ("", ())
+    with db_connection() as connection:
+        cursor = connection.cursor()
+        try:
+            cursor.execute(f"DELETE FROM task_counters {where}", params)
+            cursor.execute(
+                f"""INSERT INTO task_counters (user_id, completed, priority, due_date, count)
+                    SELECT user_id, COALESCE(completed, FALSE), COALESCE(priority, 'medium'),
+                           COALESCE(due_date, %s), COUNT(*)
+                    FROM (SELECT user_id, completed, priority, due_date FROM tasks {where}
+                          UNION ALL
+                          SELECT user_id, completed, priority, due_date FROM tasks_archive {where}) AS all_tasks
+                    GROUP BY 1, 2, 3, 4""",
+                (NO_DUE_DATE, *params, *params)
+            )
+            written = cursor.rowcount
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+        finally:
+            cursor.close()
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mantenimiento de los contadores de GET /tasks/stats")
+    parser.add_argument("--rebuild", action="store_true", help="recalcular task_counters desde tasks y tasks_archive")
+    parser.add_argument("--user-id", type=int, default=None, help="solo este usuario")
+    args = parser.parse_args()
+    if not args.rebuild:
+        parser.print_help()
+        return
+    written = rebuild_task_counters(args.user_id)
+    print(f"✅ Contadores reconstruidos: {written} filas")
+
+
+if __name__ == "__main__":
+    main()
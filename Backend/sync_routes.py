@@ -0,0 +1,189 @@
+"""Sincronización incremental: GET /tasks/changes?since=<token>.
+
+Devuelve solo lo que cambió desde la marca `since`: tareas creadas o
+actualizadas (por updated_at, índice idx_user_updated) y los ids de las
+borradas, que el trigger tasks_tombstone_delete registra en task_tombstones.
+Las tareas archivadas (archive.py) siguen existiendo para el cliente: se leen
+de tasks_archive desde la misma marca (idx_archive_user_updated), así que la
+descarga inicial las incluye. Archivar o restaurar no cambia updated_at ni
+escribe lápidas: un cliente al día no recibe nada.
+Los dos orígenes se mezclan en un único orden (fecha, id) y se paginan con
+`next`/`has_more`, así que con el cliente al día la respuesta sale casi vacía.
+
+La marca es opaca para el cliente: codifica la última posición (fecha, id)
+entregada. Una transacción puede confirmarse con un updated_at algo anterior
+al de otra ya leída; por eso, al terminar, la marca nunca pasa de
+ahora - SYNC_SAFETY_LAG y lo más reciente se reenvía en la siguiente
+consulta. El cliente debe aplicar los cambios por id (upsert), tolerar
+duplicados e ignorar borrados de tareas que no conoce.
+
+Las lápidas se purgan pasado SYNC_TOMBSTONE_RETENTION_DAYS; una marca más
+antigua recibe 410 y el cliente debe volver a descargar la lista completa.
+"""
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+from database import db_connection
+from routes import TASK_FIELDS
+from serialization import task_row
+from config import (
+    SYNC_PAGE_LIMIT,
+    SYNC_SAFETY_LAG,
+    SYNC_TOMBSTONE_RETENTION_DAYS,
+    SYNC_PURGE_INTERVAL,
+)
+from datetime import datetime, timedelta
+from typing import Optional
+import argparse
+import asyncio
+import base64
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+PURGE_CHUNK = 10000
+NOW_QUERY = "SELECT CURRENT_TIMESTAMP AS now"
+
+
+def encode_sync_token(position) -> str:
+    moment, item_id = position
+    raw = json.dumps([moment.isoformat(), item_id]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_sync_token(token: str):
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        moment, item_id = json.loads(raw)
+        return datetime.fromisoformat(moment), int(item_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Token de sincronización inválido")
+
+
+def build_changes_queries(user_id: int, position, limit: int):
+    """Consultas de tareas, tareas archivadas y lápidas posteriores a `position`.
+
+    position None es la sincronización inicial: no necesita lápidas, el cliente parte de cero.
+    """
+    conditions = "user_id = %s"
+    tasks_params = [user_id]
+    tombstones = None
+    if position is not None:
+        moment, item_id = position
+        conditions += " AND (updated_at > %s OR (updated_at = %s AND id > %s))"
+        tasks_params.extend([moment, moment, item_id])
+        tombstones = (
+            """SELECT task_id, deleted_at FROM task_tombstones
+               WHERE user_id = %s AND (deleted_at > %s OR (deleted_at = %s AND task_id > %s))
+               ORDER BY deleted_at, task_id LIMIT %s""",
+            [user_id, moment, moment, item_id, limit + 1],
+        )
+    tasks_params.append(limit + 1)
+    order = " ORDER BY updated_at, id LIMIT %s"
+    tasks = (f"SELECT * FROM tasks WHERE {conditions}{order}", tasks_params)
+    archived = (f"SELECT {', '.join(TASK_FIELDS)} FROM tasks_archive WHERE {conditions}{order}", list(tasks_params))
+    return tasks, archived, tombstones
+
+
+def merge_changes(tasks: list, tombstones: list, limit: int):
+    """Mezcla tareas (de tasks y tasks_archive) y lápidas por (fecha, id); retorna (página, hay_más)"""
+    events = [((row["updated_at"], row["id"]), row) for row in tasks]
+    events.extend(((row["deleted_at"], row["task_id"]), None) for row in tombstones)
+    events.sort(key=lambda event: event[0])
+    return events[:limit], len(events) > limit
+
+
+def next_position(position, page: list, has_more: bool, horizon: datetime):
+    """Marca para la siguiente consulta (ver el docstring del módulo)"""
+    if has_more:
+        return page[-1][0]
+    # Página completa: todo lo anterior a ahora - SYNC_SAFETY_LAG está entregado, así que
+    # la marca avanza hasta ahí aunque la página venga vacía (cliente sin cambios), y lo
+    # posterior se reenvía en la siguiente consulta. Nunca retrocede.
+    safe = (horizon, 0)
+    return max(position, safe) if position is not None else safe
+
+
+def get_changes_route(user_id: int, since: Optional[str] = None, limit: Optional[int] = None) -> dict:
+    """Cambios del usuario desde la marca `since` (sin marca: todas sus tareas, archivadas incluidas)"""
+    limit = limit or SYNC_PAGE_LIMIT
+    position = decode_sync_token(since) if since else None
+
+    try:
+        tasks_query, archived_query, tombstones_query = build_changes_queries(user_id, position, limit)
+        with db_connection() as connection:
+            cursor = connection.cursor(dictionary=True)
+            try:
+                # "Ahora" con el reloj de MySQL, el mismo que escribe updated_at y deleted_at
+                cursor.execute(NOW_QUERY)
+                now = cursor.fetchone()["now"]
+                if position is not None and position[0] < now - timedelta(days=SYNC_TOMBSTONE_RETENTION_DAYS):
+                    raise HTTPException(status_code=410,
+                                        detail="Token de sincronización expirado: descarga de nuevo las tareas")
+                tasks = []
+                for query, params in (tasks_query, archived_query):
+                    cursor.execute(query, tuple(params))
+                    tasks.extend(cursor.fetchall())
+                tombstones = []
+                if tombstones_query:
+                    cursor.execute(tombstones_query[0], tuple(tombstones_query[1]))
+                    tombstones = cursor.fetchall()
+            finally:
+                cursor.close()
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("❌ Error en get_changes_route: %s", e)
+        raise HTTPException(status_code=500, detail=f"Error al obtener cambios: {str(e)}")
+
+    page, has_more = merge_changes(tasks, tombstones, limit)
+    horizon = now - timedelta(seconds=SYNC_SAFETY_LAG)
+    return {
+        "changes": [task_row(row) for _, row in page if row is not None],
+        "deleted": [item_id for (_, item_id), row in page if row is None],
+        "next": encode_sync_token(next_position(position, page, has_more, horizon)),
+        "has_more": has_more,
+    }
+
+
+def purge_tombstones(retention_days: int = SYNC_TOMBSTONE_RETENTION_DAYS) -> int:
+    """Borra las lápidas más antiguas que la retención, en trozos para no bloquear la tabla"""
+    purged = 0
+    while True:
+        with db_connection() as connection:
+            cursor = connection.cursor()
+            cursor.execute("DELETE FROM task_tombstones WHERE deleted_at < CURRENT_TIMESTAMP - INTERVAL %s DAY LIMIT %s",
+                           (retention_days, PURGE_CHUNK))
+            deleted = cursor.rowcount
+            connection.commit()
+            cursor.close()
+        purged += deleted
+        if deleted < PURGE_CHUNK:
+            return purged
+
+
+async def purge_tombstones_periodically(interval: float = SYNC_PURGE_INTERVAL):
+    """Tarea de fondo del lifespan: purga cada `interval` segundos"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            purged = await run_in_threadpool(purge_tombstones)
+            if purged:
+                logger.info("🧹 Lápidas purgadas: %d", purged)
+        except Exception as e:
+            logger.warning("No se pudieron purgar las lápidas: %s", e)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mantenimiento de task_tombstones (GET /tasks/changes)")
+    parser.add_argument("--purge", action="store_true", help="borrar lápidas más antiguas que la retención")
+    parser.add_argument("--days", type=int, default=SYNC_TOMBSTONE_RETENTION_DAYS)
+    args = parser.parse_args()
+    if not args.purge:
+        parser.print_help()
+        return
+    print(f"✅ Lápidas purgadas: {purge_tombstones(args.days)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+"""Caché de lectura de los listados GET /tasks por usuario.
+
+Cada usuario tiene un contador de versión que forma parte de la clave; las
+rutas que modifican tareas lo incrementan tras el commit (invalidate_user,
+suscrito a task_events),
+de modo que todas las combinaciones de filtros cacheadas de ese usuario
+dejan de ser alcanzables a la vez. Se guarda el JSON ya serializado, así
+un acierto no vuelve a serializar, y el ETag se deriva de la versión y los
+parámetros para responder 304 sin leer siquiera el cuerpo.
+
+Backends:
+- memory: LRU en el proceso con límite de entradas y de bytes. Las
+  versiones son locales al proceso: con varios workers cada uno puede
+  servir su copia hasta TASK_CACHE_TTL después de un cambio hecho en otro.
+- redis: versiones y cuerpos en Redis (o cualquier servidor compatible),
+  compartidos entre workers. Requiere el paquete `redis`.
+- none: sin caché.
+"""
+import hashlib
+import itertools
+import os
+import time
+
+from fastapi.concurrency import run_in_threadpool
+from cache import TTLCache
+import task_events
+from config import (
+    TASK_CACHE_BACKEND,
+    TASK_CACHE_TTL,
+    TASK_CACHE_MAX_ENTRIES,
+    TASK_CACHE_MAX_BYTES,
+    TASK_CACHE_REDIS_URL,
+)
+
+
+class NullBackend:
+    blocking = False
+
+    def get_version(self, user_id):
+        return None
+
+    def bump_version(self, user_id):
+        pass
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value):
+        pass
+
+    def stats(self) -> dict:
+        return {"backend": "none"}
+
+
+class MemoryBackend:
+    blocking = False
+
+    def __init__(self):
+        self._entries = TTLCache(TASK_CACHE_MAX_ENTRIES, TASK_CACHE_TTL, max_bytes=TASK_CACHE_MAX_BYTES)
+        self._versions = TTLCache(TASK_CACHE_MAX_ENTRIES, float("inf"))
+        # Versiones únicas en todo el proceso: si se expulsa la versión de un
+        # usuario, la nueva nunca coincide con entradas antiguas
+        self._epoch = f"{os.getpid()}.{time.time_ns()}"
+        self._counter = itertools.count(1)
+
+    def _new_version(self):
+        return f"{self._epoch}.{next(self._counter)}"
+
+    def get_version(self, user_id):
+        version = self._versions.get(user_id)
+        if version is None:
+            version = self._new_version()
+            self._versions.set(user_id, version)
+        return version
+
+    def bump_version(self, user_id):
+        self._versions.set(user_id, self._new_version())
+
+    def get(self, key):
+        return self._entries.get(key)
+
+    def set(self, key, value):
+        self._entries.set(key, value)
+
+    def stats(self) -> dict:
+        return {"backend": "memory", **self._entries.stats()}
+
+
+class RedisBackend:
+    blocking = True
+
+    def __init__(self, url: str):
+        import redis  # dependencia opcional
+        self._redis = redis.Redis.from_url(url)
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _version_key(user_id):
+        return f"tasks:ver:{user_id}"
+
+    def get_version(self, user_id):
+        key = self._version_key(user_id)
+        version = self._redis.get(key)
+        if version is None:
+            # Semilla con el reloj para no reutilizar versiones si Redis expulsa la clave
+            self._redis.set(key, time.time_ns(), nx=True)
+            version = self._redis.get(key)
+        return version.decode()
+
+    def bump_version(self, user_id):
+        key = self._version_key(user_id)
+        pipe = self._redis.pipeline()
+        pipe.set(key, time.time_ns(), nx=True)
+        pipe.incr(key)
+        pipe.execute()
+
+    def get(self, key):
+        value = self._redis.get("tasks:list:" + key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, key, value):
+        self._redis.set("tasks:list:" + key, value, ex=max(1, int(TASK_CACHE_TTL)))
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "backend": "redis",
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+def create_backend(name: str = TASK_CACHE_BACKEND):
+    if name == "redis":
+        return RedisBackend(TASK_CACHE_REDIS_URL)
+    if name == "memory":
+        return MemoryBackend()
+    return NullBackend()
+
+
+backend = create_backend()
+
+
+async def run(fn, *args):
+    """Llama a una función de este módulo sin bloquear el event loop si el backend es remoto"""
+    if backend.blocking:
+        return await run_in_threadpool(fn, *args)
+    return fn(*args)
+
+
+def lookup(user_id: int, params: tuple):
+    """Devuelve (clave, etag, (cuerpo, siguiente_cursor) | None) para un listado"""
+    version = backend.get_version(user_id)
+    if version is None:
+        return None, None, None
+    key = f"{user_id}:{version}:" + ":".join("" if p is None else str(p) for p in params)
+    etag = '"' + hashlib.blake2b(key.encode('utf-8'), digest_size=12).hexdigest() + '"'
+    cached = backend.get(key)
+    if cached is None:
+        return key, etag, None
+    next_cursor, _, body = cached.partition(b"\n")
+    return key, etag, (body, next_cursor.decode() or None)
+
+
+def store(key: str, body: bytes, next_cursor: str = None):
+    if key is not None:
+        backend.set(key, (next_cursor or "").encode() + b"\n" + body)
+
+
+def invalidate_user(user_id: int):
+    """Invalida todos los listados cacheados del usuario (llamar después del commit)"""
+    backend.bump_version(user_id)
+
+
+task_events.subscribe(invalidate_user, blocking=backend.blocking)
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    if not if_none_match or not etag:
+        return False
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+def get_task_cache_stats() -> dict:
+    return backend.stats()
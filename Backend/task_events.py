@@ -0,0 +1,55 @@
+"""Aviso de cambios en las tareas de un usuario.
+
+Las rutas que modifican tareas llaman a tasks_changed(user_id, eventos)
+después del commit; los módulos que guardan estado derivado de la tabla
+tasks (caché de listados, índice de búsqueda en memoria, canal de push...)
+se suscriben con subscribe() en lugar de que cada ruta tenga que conocerlos
+a todos.
+
+Los eventos describen qué cambió: {"type": "created"|"updated", "task": fila}
+o {"type": "deleted", "id": id}. Los listeners que solo necesitan saber que
+algo cambió reciben únicamente el user_id.
+"""
+from fastapi.concurrency import run_in_threadpool
+
+_listeners = []
+
+
+def subscribe(listener, blocking: bool = False, with_events: bool = False):
+    """Registra listener(user_id) o, con with_events=True, listener(user_id, eventos).
+
+    blocking=True si hace E/S (p. ej. Redis).
+    """
+    _listeners.append((listener, blocking, with_events))
+    return listener
+
+
+def created(task: dict) -> dict:
+    return {"type": "created", "task": task}
+
+
+def updated(task: dict) -> dict:
+    return {"type": "updated", "task": task}
+
+
+def deleted(task_id: int) -> dict:
+    return {"type": "deleted", "id": task_id}
+
+
+def tasks_changed(user_id: int, events: list = ()):
+    """Notifica un cambio confirmado (commit) en las tareas del usuario"""
+    for listener, _, with_events in _listeners:
+        if with_events:
+            listener(user_id, events)
+        else:
+            listener(user_id)
+
+
+async def tasks_changed_async(user_id: int, events: list = ()):
+    """Versión para async_routes: los listeners que bloquean van al threadpool"""
+    for listener, blocking, with_events in _listeners:
+        args = (user_id, events) if with_events else (user_id,)
+        if blocking:
+            await run_in_threadpool(listener, *args)
+        else:
+            listener(*args)
@@ -0,0 +1,10 @@
+"""Las pruebas importan los módulos de Backend como la API (desde la carpeta Backend).
+
+No necesitan MySQL: las que tocan la base de datos usan conexiones falsas.
+
+    cd Backend && python -m pytest tests
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
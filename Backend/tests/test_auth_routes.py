@@ -0,0 +1,84 @@
+"""POST /auth/register: los duplicados se rechazan sin pagar bcrypt"""
+from contextlib import contextmanager
+
+import pytest
+from fastapi import HTTPException
+from mysql.connector.errors import IntegrityError
+
+import auth_routes
+from models import UserCreate
+
+USER = UserCreate(email="ana@example.com", username="ana", password="secreta123")
+
+
+class UsersCursor:
+    """Cursor falso: `existing` son los valores ya registrados; el INSERT puede fallar con `insert_error`"""
+
+    def __init__(self, existing=(), insert_error=None):
+        self.existing = set(existing)
+        self.insert_error = insert_error
+        self._row = None
+        self.lastrowid = 7
+
+    def execute(self, query, params=()):
+        if query == auth_routes.INSERT_USER_QUERY:
+            if self.insert_error:
+                raise self.insert_error
+            self._row = None
+        elif query == auth_routes.USER_PROFILE_QUERY:
+            self._row = {"id": 7, "email": USER.email, "username": USER.username, "created_at": None}
+        else:
+            self._row = {"id": 1} if params[0] in self.existing else None
+
+    def fetchone(self):
+        return self._row
+
+    def close(self):
+        pass
+
+
+def patch(monkeypatch, cursor):
+    hashed = []
+
+    class Connection:
+        def cursor(self, **kwargs):
+            return cursor
+
+        def commit(self):
+            pass
+
+    @contextmanager
+    def fake_db_connection():
+        yield Connection()
+
+    monkeypatch.setattr(auth_routes, "db_connection", fake_db_connection)
+    monkeypatch.setattr(auth_routes, "hash_password", lambda password: hashed.append(password) or "hash")
+    return hashed
+
+
+@pytest.mark.parametrize("existing, detail", [
+    ({USER.email}, "El email ya está registrado"),
+    ({USER.username}, "El nombre de usuario ya existe"),
+])
+def test_duplicate_is_rejected_before_hashing(monkeypatch, existing, detail):
+    hashed = patch(monkeypatch, UsersCursor(existing))
+    with pytest.raises(HTTPException) as error:
+        auth_routes.register_user_route(USER)
+    assert error.value.status_code == 400 and error.value.detail == detail
+    assert hashed == []
+
+
+def test_duplicate_inserted_concurrently_is_a_400(monkeypatch):
+    race = IntegrityError(msg="Duplicate entry 'ana' for key 'users.username'", errno=1062)
+    patch(monkeypatch, UsersCursor(insert_error=race))
+    with pytest.raises(HTTPException) as error:
+        auth_routes.register_user_route(USER)
+    assert error.value.status_code == 400
+    assert error.value.detail == "El nombre de usuario ya existe"
+
+
+def test_new_user_is_hashed_and_registered(monkeypatch):
+    hashed = patch(monkeypatch, UsersCursor())
+    response = auth_routes.register_user_route(USER)
+    assert hashed == [USER.password]
+    assert response.id == 7 and response.token
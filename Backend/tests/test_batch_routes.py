@@ -0,0 +1,92 @@
+"""POST /tasks/batch: el resultado es el de aplicar las operaciones en orden, aunque se agrupen"""
+
+import batch_routes
+from models import TaskUpdate
+
+
+class RecordingCursor:
+    """Cursor falso: las tareas `owned` existen y se anota cada sentencia ejecutada"""
+
+    def __init__(self, owned=()):
+        self.owned = set(owned)
+        self.statements = []
+        self.lastrowid = None
+        self._result = []
+        self._next_id = 100
+
+    def execute(self, query, params=()):
+        query = " ".join(query.split())
+        self.statements.append((query, tuple(params)))
+        if query.startswith("SELECT id FROM tasks WHERE"):
+            self._result = [{"id": task_id} for task_id in params[1:] if task_id in self.owned]
+        elif query.startswith("SELECT id FROM tasks_archive"):
+            self._result = []
+        elif query.startswith("INSERT INTO tasks"):
+            self.lastrowid = self._next_id
+            self._next_id += query.count("(%s, %s, %s, %s, %s, %s)") + 7  # hueco entre INSERT (otras sesiones)
+
+    def fetchall(self):
+        return self._result
+
+    def fetchone(self):
+        return self._result[0] if self._result else None
+
+    def updates(self):
+        return [(query, params) for query, params in self.statements if query.startswith("UPDATE tasks")]
+
+
+def op(index, kind, task_id=None, **data):
+    payload = TaskUpdate(**data) if kind in ("create", "update") else None
+    return {"index": index, "op": kind, "id": task_id, "data": payload}
+
+
+def test_updates_to_the_same_task_apply_in_request_order():
+    cursor = RecordingCursor(owned={1})
+    errors = batch_routes.apply_batch(cursor, 7, [
+        op(0, "update", 1, title="primero", priority="low"),
+        op(1, "update", 1, title="segundo"),
+    ])
+    assert errors == {}
+    [(query, params)] = cursor.updates()
+    assert "title = %s" in query and "priority = %s" in query
+    assert params[:2] == ("segundo", "low")
+
+
+def test_update_after_complete_wins():
+    cursor = RecordingCursor(owned={1, 2})
+    errors = batch_routes.apply_batch(cursor, 7, [
+        op(0, "complete", 1),
+        op(1, "update", 1, completed=False),
+        op(2, "update", 2, completed=False),
+        op(3, "complete", 2),
+    ])
+    assert errors == {}
+    by_value = {params[0]: params[2:] for query, params in cursor.updates()}
+    assert by_value == {False: (1,), True: (2,)}
+
+
+def test_operations_after_delete_are_rejected():
+    cursor = RecordingCursor(owned={1})
+    errors = batch_routes.apply_batch(cursor, 7, [op(0, "delete", 1), op(1, "update", 1, title="tarde")],
+                                      atomic=False)
+    assert errors == {1: "La tarea se elimina antes en este lote"}
+    assert cursor.updates() == []
+
+
+def test_creates_use_one_multi_row_insert():
+    cursor = RecordingCursor()
+    operations = [op(i, "create", title=f"t{i}") for i in range(3)]
+    assert batch_routes.apply_batch(cursor, 7, operations) == {}
+    inserts = [query for query, _ in cursor.statements if query.startswith("INSERT")]
+    assert len(inserts) == 1
+    assert [o["id"] for o in operations] == [100, 101, 102]
+
+
+def test_creates_are_chunked_with_ids_from_each_insert(monkeypatch):
+    monkeypatch.setattr(batch_routes, "BATCH_INSERT_CHUNK", 2)
+    cursor = RecordingCursor()
+    operations = [op(i, "create", title=f"t{i}") for i in range(5)]
+    assert batch_routes.apply_batch(cursor, 7, operations) == {}
+    inserts = [query for query, _ in cursor.statements if query.startswith("INSERT")]
+    assert len(inserts) == 3
+    assert [o["id"] for o in operations] == [100, 101, 109, 110, 118]
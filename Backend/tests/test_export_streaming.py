@@ -0,0 +1,117 @@
+"""GET /tasks/export: las filas salen por lotes de fetchmany, sin fetchall ni memoria proporcional"""
+import json
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import routes
+
+TOTAL_ROWS = 200_000
+BATCH = 1000
+
+
+class FakeCursor:
+    """Cursor sin buffer: genera las filas al pedirlas y cuenta cuántas ha entregado"""
+
+    def __init__(self, total: int):
+        self.total = total
+        self.produced = 0
+        self.closed = False
+        self.queries = []
+
+    def execute(self, query, params=()):
+        self.queries.append(query)
+
+    def fetchmany(self, size):
+        start = datetime(2025, 1, 1)
+        count = min(size, self.total - self.produced)
+        rows = [{
+            "id": self.produced + i + 1, "user_id": 1, "title": f"Tarea {self.produced + i}",
+            "description": "x" * 50, "completed": False, "priority": "medium", "due_date": None,
+            "created_at": start - timedelta(seconds=self.produced + i), "updated_at": start,
+        } for i in range(count)]
+        self.produced += count
+        return rows
+
+    def fetchall(self):
+        raise AssertionError("la exportación no debe leer todo el resultado de una vez")
+
+    def close(self):
+        self.closed = True
+
+
+class FakeConnection:
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def cursor(self, **kwargs):
+        assert kwargs.get("buffered") is False, "la exportación necesita un cursor sin buffer"
+        return self._cursor
+
+
+def patch_connection(monkeypatch, cursor):
+    @contextmanager
+    def fake_db_connection():
+        yield FakeConnection(cursor)
+    monkeypatch.setattr(routes, "db_connection", fake_db_connection)
+    monkeypatch.setattr(routes, "EXPORT_BATCH_SIZE", BATCH)
+
+
+def test_export_reads_lazily(monkeypatch):
+    cursor = FakeCursor(TOTAL_ROWS)
+    patch_connection(monkeypatch, cursor)
+    chunks = routes.export_tasks_route(1, "ndjson")
+    next(chunks)
+    assert cursor.produced == BATCH  # solo el primer lote leído
+    next(chunks)
+    assert cursor.produced == 2 * BATCH
+    chunks.close()
+    assert cursor.closed
+
+
+def test_export_reads_tasks_then_archive_without_union(monkeypatch):
+    cursor = FakeCursor(0)
+    patch_connection(monkeypatch, cursor)
+    list(routes.export_tasks_route(1, "ndjson"))
+    assert [" FROM tasks_archive " in query for query in cursor.queries] == [False, True]
+    assert not any("UNION" in query for query in cursor.queries)
+    assert all(query.endswith("ORDER BY created_at DESC, id DESC") for query in cursor.queries)
+
+
+def test_export_memory_is_bounded(monkeypatch):
+    cursor = FakeCursor(TOTAL_ROWS)
+    patch_connection(monkeypatch, cursor)
+    lines = 0
+    tracemalloc.start()
+    try:
+        for chunk in routes.export_tasks_route(1, "ndjson"):
+            lines += chunk.count(b"\n")
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert lines == TOTAL_ROWS
+    # ~40 MB si se acumularan las filas; con lotes de 1000 basta con unos pocos MB
+    assert peak < 5 * 1024 * 1024, f"pico de memoria {peak / 1024 / 1024:.1f} MB"
+
+
+def test_export_json_is_valid(monkeypatch):
+    patch_connection(monkeypatch, FakeCursor(2500))
+    body = b"".join(routes.export_tasks_route(1, "json"))
+    tasks = json.loads(body)
+    assert len(tasks) == 2500
+    assert tasks[0]["id"] == 1
+
+
+def test_unbounded_archived_listing_merges_two_ordered_queries():
+    queries = routes.build_tasks_queries(1, include_archived=True)
+    assert len(queries) == 2 and not any("UNION" in query for query, _ in queries)
+    start = datetime(2025, 1, 1)
+    tasks = [{"id": 5, "created_at": start}, {"id": 3, "created_at": start}, {"id": 1, "created_at": start - timedelta(days=2)}]
+    archived = [{"id": 4, "created_at": start}, {"id": 2, "created_at": start - timedelta(days=1)}]
+    merged = routes.merge_task_rows([tasks, archived])
+    assert [row["id"] for row in merged] == [5, 4, 3, 2, 1]
+
+
+def test_bounded_archived_listing_keeps_one_union():
+    queries = routes.build_tasks_queries(1, limit=50, include_archived=True)
+    assert len(queries) == 1 and "UNION ALL" in queries[0][0]
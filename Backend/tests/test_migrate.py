@@ -0,0 +1,99 @@
+"""migrate.py: migraciones versionadas y comprobación con EXPLAIN"""
+import migrate
+from routes import (
+    ARCHIVED_TASK_BY_ID_QUERY,
+    TASK_TIMESTAMPS_QUERY,
+    build_tasks_queries,
+    build_tasks_query,
+    encode_cursor,
+    utc_now,
+)
+from sync_routes import build_changes_queries
+
+
+SAMPLE = {
+    "user": {"id": 1, "email": "explain@example.com", "username": "explain"},
+    "task": {"id": 5, "created_at": utc_now()},
+}
+
+
+def test_baseline_runs_first_and_creates_what_later_migrations_use():
+    migrations = migrate.load_migrations()
+    assert [m["version"] for m in migrations][:3] == [0, 1, 2]
+    baseline = "\n".join(migrations[0]["statements"])
+    for name in ("idx_user_created", "idx_user_updated", "ft_tasks_text", "task_counters",
+                 "task_tombstones", "reminder_log", "tasks_counters_update_new", "tasks_tombstone_delete"):
+        assert name in baseline
+    assert migrations[0]["statements"][-1] == "DROP INDEX idx_user_id ON tasks"
+    assert any(s.startswith("INSERT INTO task_counters") for s in migrations[0]["statements"])
+
+
+def test_schema_registers_every_migration_with_its_checksum():
+    with open(migrate.MIGRATIONS_DIR.replace("migrations", "schema.sql"), encoding="utf-8") as f:
+        schema = f.read()
+    for migration in migrate.load_migrations():
+        assert f"({migration['version']}, '{migration['name']}', '{migration['checksum']}')" in schema
+
+
+def test_explain_covers_every_tasks_query_shape():
+    explained = {" ".join(query.split()) for _, query, _ in migrate.explain_queries(SAMPLE)}
+    cursor = encode_cursor(SAMPLE["task"])
+    for completed in (None, False, True):
+        for priority in (None, "high"):
+            for page_cursor in (None, cursor):
+                for limit in (None, 50):
+                    if page_cursor and limit is None:
+                        continue
+                    for include_archived in (False, True):
+                        for query, _ in build_tasks_queries(1, completed, priority, limit, page_cursor,
+                                                            include_archived=include_archived):
+                            assert " ".join(query.split()) in explained
+
+
+def test_explain_never_sees_an_unbounded_union():
+    for _, query, _ in migrate.explain_queries(SAMPLE):
+        if "UNION ALL" in query:
+            assert query.endswith("LIMIT %s")
+
+
+def test_explain_covers_changes_queries():
+    explained = {query for _, query, _ in migrate.explain_queries(SAMPLE)}
+    for position in (None, (SAMPLE["task"]["created_at"], SAMPLE["task"]["id"])):
+        for changes_query in build_changes_queries(1, position, 100):
+            if changes_query is not None:
+                assert changes_query[0] in explained
+
+
+def test_explain_queries_params_match_placeholders():
+    for name, query, params in migrate.explain_queries(SAMPLE):
+        assert query.count("%s") == len(params), name
+
+
+UNION_PLAN = [
+    {"table": "tasks", "type": "ref", "key": "idx_user_completed_created", "Extra": "Backward index scan"},
+    {"table": "tasks_archive", "type": "ref", "key": "idx_archive_user_created", "Extra": "Backward index scan"},
+    {"table": "<union1,2>", "type": "ALL", "key": None, "Extra": "Using temporary; Using filesort"},
+]
+
+
+def test_bounded_union_sort_is_not_a_problem():
+    query, _ = build_tasks_query(1, completed=True, limit=50, include_archived=True)
+    assert migrate.explain_problems(UNION_PLAN, query) == []
+
+
+def test_unbounded_union_sort_is_flagged():
+    query = ("(SELECT id FROM tasks WHERE user_id = %s ORDER BY created_at DESC, id DESC LIMIT %s) UNION ALL "
+             "(SELECT id FROM tasks_archive WHERE user_id = %s ORDER BY created_at DESC, id DESC LIMIT %s)"
+             " ORDER BY created_at DESC, id DESC")
+    problems = migrate.explain_problems(UNION_PLAN, query)
+    assert any(problem.startswith("<union1,2>") for problem in problems)
+    assert any("filesort" in problem for problem in problems)
+
+
+def test_full_scan_is_flagged():
+    assert migrate.explain_problems([{"table": "tasks", "type": "ALL", "key": None, "Extra": ""}])
+
+
+def test_archived_and_timestamp_queries_are_explained():
+    explained = {query for _, query, _ in migrate.explain_queries(SAMPLE)}
+    assert {ARCHIVED_TASK_BY_ID_QUERY, TASK_TIMESTAMPS_QUERY} <= explained
@@ -0,0 +1,64 @@
+"""Recordatorios: el webhook se envía en su propio pool y con plazo, sin ocupar el threadpool"""
+import asyncio
+import threading
+import time
+from datetime import date
+
+import reminders
+
+
+class SlowWebhook(reminders.WebhookSink):
+    """Webhook cuyo POST tarda `delay` segundos y anota el hilo que lo envía"""
+
+    def __init__(self, delay: float, concurrency: int):
+        super().__init__("http://example.invalid", concurrency=concurrency)
+        self.delay = delay
+        self.threads = set()
+        self.sent = []
+
+    def post(self, reminder: dict):
+        self.threads.add(threading.current_thread().name)
+        time.sleep(self.delay)
+        self.sent.append(reminder["task_id"])
+
+
+def reminder(task_id: int) -> dict:
+    return {"task_id": task_id, "user_id": 1, "title": f"Tarea {task_id}", "due_date": date(2026, 10, 18).isoformat()}
+
+
+def test_webhooks_run_concurrently_on_their_own_threads():
+    sink = SlowWebhook(delay=0.2, concurrency=8)
+    scheduler = reminders.ReminderScheduler([sink])
+    start = time.perf_counter()
+    asyncio.run(scheduler._deliver([reminder(i) for i in range(8)]))
+    elapsed = time.perf_counter() - start
+    sink.close()
+    assert sorted(sink.sent) == list(range(8))
+    assert elapsed < 1.0  # 8 × 0.2 s en serie serían 1.6 s
+    assert all(name.startswith("reminder-webhook") for name in sink.threads)
+
+
+def test_slow_endpoint_is_bounded_by_the_deadline(monkeypatch):
+    monkeypatch.setattr(reminders, "REMINDER_DELIVERY_DEADLINE", 0.1)
+    sink = SlowWebhook(delay=1.0, concurrency=1)
+    scheduler = reminders.ReminderScheduler([sink])
+    start = time.perf_counter()
+    asyncio.run(scheduler._deliver([reminder(i) for i in range(5)]))
+    assert time.perf_counter() - start < 0.5
+    sink.close()
+
+
+def test_failing_sink_does_not_stop_the_others():
+    delivered = []
+
+    class BrokenSink:
+        def send(self, reminder):
+            raise RuntimeError("caído")
+
+    class ListSink:
+        def send(self, reminder):
+            delivered.append(reminder["task_id"])
+
+    scheduler = reminders.ReminderScheduler([BrokenSink(), ListSink()])
+    asyncio.run(scheduler._deliver([reminder(1), reminder(2)]))
+    assert delivered == [1, 2]
@@ -0,0 +1,111 @@
+"""GET /tasks/search: consultas del backend fulltext e índice en memoria"""
+import threading
+from contextlib import contextmanager
+
+import pytest
+
+import search_routes
+
+
+def test_indexed_terms_use_match_against():
+    query, params = search_routes.build_search_query(1, ["informe", "viaje"], None, None, 10, 0)
+    assert "MATCH(title, description) AGAINST" in query
+    assert "LIKE" not in query
+    assert params[:3] == ["+informe* +viaje*", 1, "+informe* +viaje*"]
+
+
+def test_short_and_stopword_terms_fall_back_to_like():
+    query, params = search_routes.build_search_query(1, ["informe", "ok", "the"], None, None, 10, 0)
+    assert params[0] == "+informe*"
+    assert query.count("(title LIKE %s OR description LIKE %s)") == 2
+    assert params[3:7] == ["%ok%", "%ok%", "%the%", "%the%"]
+
+
+def test_only_unindexed_terms_skip_fulltext():
+    query, params = search_routes.build_search_query(1, ["de", "tv"], True, None, 10, 0)
+    assert "MATCH" not in query
+    assert "(title LIKE %s) + (title LIKE %s) AS score" in query
+    assert params[:3] == ["%de%", "%tv%", 1]
+    assert "%de%" in params and "%tv%" in params
+    assert params[-2:] == [11, 0]
+
+
+def test_small_accounts_search_with_like_only():
+    query, params = search_routes.build_search_query(1, ["informe"], None, None, 10, 0, fulltext=False)
+    assert "MATCH" not in query
+    assert params[:2] == ["%informe%", 1]
+
+
+class CountingCursor:
+    """Cursor falso: el usuario tiene `tasks` tareas; anota las consultas"""
+
+    def __init__(self, tasks):
+        self.tasks = tasks
+        self.queries = []
+        self._rows = []
+
+    def execute(self, query, params=()):
+        self.queries.append(query)
+        if query == search_routes.USER_HAS_MORE_TASKS_QUERY:
+            self._rows = [{"id": 1}] if self.tasks > params[1] else []
+        else:
+            self._rows = []
+
+    def fetchone(self):
+        return self._rows[0] if self._rows else None
+
+    def fetchall(self):
+        return self._rows
+
+    def close(self):
+        pass
+
+
+@pytest.mark.parametrize("tasks, fulltext", [(10, False), (5000, True)])
+def test_fulltext_only_for_large_accounts(monkeypatch, tasks, fulltext):
+    cursor = CountingCursor(tasks)
+
+    class Connection:
+        def cursor(self, **kwargs):
+            return cursor
+
+    @contextmanager
+    def fake_db_connection():
+        yield Connection()
+
+    monkeypatch.setattr(search_routes, "db_connection", fake_db_connection)
+    monkeypatch.setattr(search_routes, "TASK_SEARCH_LIKE_MAX_TASKS", 2000)
+    search_routes._search_fulltext(1, ["informe"], None, None, 10, 0)
+    assert ("MATCH" in cursor.queries[-1]) is fulltext
+
+
+def test_like_escapes_underscore():
+    _, params = search_routes.build_search_query(1, ["a_"], None, None, 10, 0)
+    assert "%a\\_%" in params
+
+
+def test_memory_index_discards_index_built_during_invalidation():
+    index = search_routes.MemorySearchIndex(10)
+    loading = threading.Event()
+    release = threading.Event()
+
+    def load_rows():
+        loading.set()
+        release.wait(5)
+        return []
+
+    thread = threading.Thread(target=index.get, args=(1, load_rows))
+    thread.start()
+    loading.wait(5)
+    index.invalidate_user(1)
+    release.set()
+    thread.join(5)
+    assert index._indexes.get(1) is None
+
+
+def test_memory_index_keeps_no_generations_after_builds():
+    index = search_routes.MemorySearchIndex(10)
+    for user_id in range(50):
+        index.get(user_id, lambda: [])
+        index.invalidate_user(user_id)
+    assert index._generations == {} and index._loading == {}
@@ -0,0 +1,73 @@
+"""serve.py con varios workers: el estado por proceso no puede divergir entre workers"""
+import sys
+
+import pytest
+
+import serve
+
+
+def test_events_are_disabled_when_backend_is_unset(monkeypatch):
+    monkeypatch.delenv("TASK_EVENTS_BACKEND", raising=False)
+    serve.configure_task_events()
+    assert serve.os.environ["TASK_EVENTS_BACKEND"] == "none"
+
+
+def test_local_events_refuse_to_start(monkeypatch):
+    monkeypatch.setenv("TASK_EVENTS_BACKEND", "local")
+    with pytest.raises(SystemExit):
+        serve.configure_task_events()
+
+
+def test_redis_events_are_kept(monkeypatch):
+    monkeypatch.setenv("TASK_EVENTS_BACKEND", "redis")
+    serve.configure_task_events()
+    assert serve.os.environ["TASK_EVENTS_BACKEND"] == "redis"
+
+
+def test_list_cache_is_disabled_when_backend_is_unset(monkeypatch):
+    monkeypatch.delenv("TASK_CACHE_BACKEND", raising=False)
+    serve.configure_task_cache()
+    assert serve.os.environ["TASK_CACHE_BACKEND"] == "none"
+
+
+def test_multi_worker_start_refuses_local_events(monkeypatch):
+    monkeypatch.setenv("TASK_EVENTS_BACKEND", "local")
+    monkeypatch.setattr(sys, "argv", ["serve.py", "--workers", "2"])
+    started = []
+    monkeypatch.setattr(serve.uvicorn, "run", lambda *args, **kwargs: started.append(kwargs))
+    with pytest.raises(SystemExit):
+        serve.main()
+    assert started == []
+
+
+def test_disabled_broker_rejects_stream(monkeypatch):
+    from fastapi.testclient import TestClient
+
+    import main
+    from event_broker import DisabledBackend
+
+    monkeypatch.setattr(main.broker, "backend", DisabledBackend())
+    main.app.dependency_overrides[main.get_stream_user_id] = lambda: 1
+    try:
+        response = TestClient(main.app).get("/tasks/stream")
+    finally:
+        main.app.dependency_overrides.clear()
+    assert response.status_code == 503
+
+
+def test_per_worker_state_is_reported(monkeypatch):
+    monkeypatch.setattr(serve.config, "TASK_SEARCH_BACKEND", "memory")
+    monkeypatch.setattr(serve.config, "REMINDERS_ENABLED", True)
+    monkeypatch.setattr(serve.config, "RATE_LIMIT_ENABLED", True)
+    monkeypatch.setattr(serve.config, "RATE_LIMIT_BACKEND", "memory")
+    warnings = serve.per_worker_warnings(4)
+    assert [w.split(":")[0].split("=")[0] for w in warnings] == [
+        "TASK_SEARCH_BACKEND", "REMINDERS_ENABLED", "RATE_LIMIT_BACKEND"]
+    assert "4×" in warnings[2]
+
+
+def test_shared_backends_are_not_reported(monkeypatch):
+    monkeypatch.setattr(serve.config, "TASK_SEARCH_BACKEND", "fulltext")
+    monkeypatch.setattr(serve.config, "REMINDERS_ENABLED", False)
+    monkeypatch.setattr(serve.config, "RATE_LIMIT_BACKEND", "redis")
+    assert serve.per_worker_warnings(4) == []
@@ -0,0 +1,59 @@
+"""GET /tasks/changes: avance de la marca de sincronización"""
+from datetime import datetime, timedelta
+
+from sync_routes import build_changes_queries, merge_changes, next_position
+
+NOW = datetime(2026, 10, 17, 12, 0, 0)
+HORIZON = NOW - timedelta(seconds=5)
+
+
+def test_empty_page_advances_old_position_to_horizon():
+    position = (NOW - timedelta(days=3), 42)
+    assert next_position(position, [], False, HORIZON) == (HORIZON, 0)
+
+
+def test_empty_page_without_position_starts_at_horizon():
+    assert next_position(None, [], False, HORIZON) == (HORIZON, 0)
+
+
+def test_complete_page_older_than_horizon_advances_to_horizon():
+    position = (NOW - timedelta(days=1), 1)
+    page = [((NOW - timedelta(hours=1), 7), None)]
+    assert next_position(position, page, False, HORIZON) == (HORIZON, 0)
+
+
+def test_recent_changes_are_resent_after_the_horizon():
+    position = (NOW - timedelta(days=1), 1)
+    page = [((NOW - timedelta(seconds=1), 9), None)]
+    assert next_position(position, page, False, HORIZON) == (HORIZON, 0)
+
+
+def test_position_never_moves_back():
+    position = (NOW - timedelta(seconds=1), 9)
+    assert next_position(position, [], False, HORIZON) == position
+
+
+def test_more_pages_continue_from_last_item():
+    page = [((NOW - timedelta(days=2), 3), None), ((NOW - timedelta(days=1), 4), None)]
+    assert next_position(None, page, True, HORIZON) == (NOW - timedelta(days=1), 4)
+
+
+def test_initial_sync_reads_archived_tasks():
+    tasks, archived, tombstones = build_changes_queries(1, None, 100)
+    assert " FROM tasks " in tasks[0] and " FROM tasks_archive " in archived[0]
+    assert tombstones is None
+    assert tasks[1] == archived[1] == [1, 101]
+
+
+def test_incremental_sync_reads_archive_from_the_same_position():
+    position = (NOW - timedelta(days=1), 7)
+    tasks, archived, _ = build_changes_queries(1, position, 100)
+    assert archived[1] == tasks[1]
+    assert archived[0].endswith("ORDER BY updated_at, id LIMIT %s")
+
+
+def test_archived_rows_are_merged_with_tasks():
+    older = {"id": 2, "updated_at": NOW - timedelta(days=2)}
+    newer = {"id": 1, "updated_at": NOW - timedelta(days=1)}
+    page, has_more = merge_changes([newer, older], [], 1)
+    assert [row["id"] for _, row in page] == [2] and has_more
@@ -0,0 +1,139 @@
+"""WRITE_BEHIND_ENABLED: validación antes de encolar, orden por tarea al agrupar y un hilo que no muere"""
+import asyncio
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+import pytest
+from fastapi import HTTPException
+
+import task_events
+import write_behind
+from models import TaskUpdate
+from write_behind import WriteBehind
+
+
+def make_writer():
+    return WriteBehind(window_ms=5, max_batch=100, max_pending=100)
+
+
+def item(user_id, op, task_id=None, data=None):
+    return {"user_id": user_id, "op": op, "id": task_id, "data": data, "future": Future(), "enqueued": 0.0}
+
+
+@pytest.mark.parametrize("op, data", [
+    ("create", TaskUpdate(title="")),
+    ("create", TaskUpdate(title="Informe", priority="urgent")),
+    ("update", TaskUpdate(due_date="mañana")),
+])
+def test_invalid_writes_are_rejected_before_queueing(op, data):
+    writer = make_writer()
+    with pytest.raises(HTTPException) as error:
+        writer.submit(1, op, 5 if op == "update" else None, data)
+    assert error.value.status_code == 400
+    assert writer.stats()["pending"] == 0
+
+
+def test_valid_write_is_queued():
+    writer = make_writer()
+    writer.submit(1, "update", 5, TaskUpdate(priority="high", due_date="2026-10-20"))
+    assert writer.stats()["pending"] == 1
+
+
+def test_updates_of_a_task_merge_in_arrival_order():
+    writer = make_writer()
+    operations = writer.group([
+        item(1, "update", 5, TaskUpdate(title="a", priority="low")),
+        item(1, "update", 6, TaskUpdate(title="otra")),
+        item(1, "update", 5, TaskUpdate(title="b")),
+    ])
+    ops = operations[1]
+    assert [op["id"] for op in ops] == [5, 6]
+    assert ops[0]["data"].title == "b" and ops[0]["data"].priority == "low"
+    assert len(ops[0]["items"]) == 2
+
+
+def test_delete_after_update_waits_for_next_window_with_later_writes():
+    writer = make_writer()
+    update, delete, later = item(1, "update", 5, TaskUpdate(title="a")), item(1, "delete", 5), item(1, "update", 6)
+    other = item(2, "update", 9, TaskUpdate(title="x"))
+    operations = writer.group([update, delete, later, other])
+    assert [op["op"] for op in operations[1]] == ["update"]
+    assert [op["id"] for op in operations[2]] == [9]
+    assert list(writer._deferred) == [delete, later]
+    assert writer._collect() == [delete, later]
+
+
+def test_update_after_delete_keeps_request_order():
+    writer = make_writer()
+    operations = writer.group([item(1, "delete", 5), item(1, "update", 5, TaskUpdate(title="a"))])
+    assert [op["op"] for op in operations[1]] == ["delete", "update"]
+
+
+class FakeConnection:
+    def cursor(self, **kwargs):
+        return self
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    @contextmanager
+    def fake_db_connection():
+        yield FakeConnection()
+    monkeypatch.setattr(write_behind, "db_connection", fake_db_connection)
+    monkeypatch.setattr(write_behind, "apply_batch", lambda cursor, user_id, ops, atomic: {})
+    monkeypatch.setattr(write_behind, "fetch_batch_tasks",
+                        lambda cursor, user_id, ops, errors: {op["id"]: {"id": op["id"]} for op in ops})
+
+
+def test_failing_listener_does_not_stop_the_writer(fake_db, monkeypatch):
+    def broken_listener(user_id, events):
+        raise ConnectionError("redis caído")
+    monkeypatch.setattr(task_events, "_listeners", [(broken_listener, True, True)])
+    writer = make_writer()
+    writer.start()
+    try:
+        first = writer.submit(1, "update", 5, TaskUpdate(title="a"))
+        assert first.result(timeout=2) == {"id": 5}
+        later = writer.submit(1, "update", 6, TaskUpdate(title="b"))
+        assert later.result(timeout=2) == {"id": 6}
+    finally:
+        writer.stop()
+
+
+def test_unexpected_flush_error_fails_the_window_and_keeps_going(fake_db, monkeypatch):
+    writer = make_writer()
+    calls = []
+
+    def flaky_group(items):
+        calls.append(items)
+        if len(calls) == 1:
+            raise RuntimeError("fallo inesperado")
+        return WriteBehind.group(writer, items)
+    monkeypatch.setattr(writer, "group", flaky_group)
+    writer.start()
+    try:
+        failed = writer.submit(1, "update", 5, TaskUpdate(title="a"))
+        with pytest.raises(HTTPException) as error:
+            failed.result(timeout=2)
+        assert error.value.status_code == 500
+        assert writer.submit(1, "update", 6, TaskUpdate(title="b")).result(timeout=2) == {"id": 6}
+    finally:
+        writer.stop()
+
+
+def test_waiting_is_bounded_by_the_timeout():
+    writer = WriteBehind(window_ms=5, max_batch=100, max_pending=100, timeout=0.05)
+    future = writer.submit(1, "delete", 5)  # sin hilo: nunca se resuelve
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(writer.wait(future))
+    assert error.value.status_code == 504
+    assert not future.cancelled()
@@ -0,0 +1,297 @@
+"""Agrupación de escrituras de tareas con commit en grupo (WRITE_BEHIND_ENABLED).
+
+Sin este modo cada POST/PUT/DELETE de /tasks hace su propio commit, y MySQL
+sincroniza el redo log a disco una vez por petición. Con él, las
+mutaciones se encolan y un hilo las aplica por ventanas:
+
+1. Espera la primera operación y recoge las que lleguen durante
+   WRITE_BEHIND_WINDOW_MS (o hasta WRITE_BEHIND_MAX_BATCH).
+2. Agrupa por usuario en orden de llegada. Las actualizaciones seguidas de
+   la misma tarea se fusionan en una (gana el último valor de cada campo).
+3. Aplica todos los usuarios en una sola transacción con
+   batch_routes.apply_batch (INSERT/UPDATE/DELETE multi-fila; cada grupo de
+   sentencias con su SAVEPOINT, así el fallo de una operación no afecta a
+   las demás) y hace un único commit.
+4. Resuelve el resultado de cada llamador y notifica task_events.
+
+Los datos se validan en submit() (batch_routes.validate_task_data) antes
+de encolar: una operación inválida recibe un 400 inmediato y no ocupa sitio
+en la ventana ni puede fallar después de aceptada.
+
+El llamador recibe su resultado solo cuando su grupo ha hecho commit: la
+durabilidad es la misma que sin agrupar, a cambio de hasta una ventana de
+latencia. El orden por usuario se mantiene porque hay un solo hilo y la
+cola es FIFO; si en una ventana se borra una tarea que ya se actualiza en
+ella, el borrado y lo que sigue de ese usuario pasan a la ventana siguiente
+(así la actualización devuelve la tarea antes de borrarse). Las llamadas
+que se fusionan reciben todas la tarea final.
+
+El hilo no muere por un error: un fallo de flush() o de un listener de
+task_events (p. ej. Redis caído) se registra, las llamadas sin resolver de
+la ventana reciben un 500 y la cola sigue. Los listeners se llaman después
+de resolver las llamadas, así que su fallo no afecta a la respuesta. Aun
+así, la petición espera como mucho WRITE_BEHIND_TIMEOUT segundos y recibe un
+504 (la escritura puede confirmarse igualmente después).
+
+El hilo usa el pool síncrono de database.py también con DB_MODE=async.
+"""
+import asyncio
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+from fastapi import HTTPException
+from models import TaskCreate, TaskUpdate
+from database import db_connection
+from batch_routes import apply_batch, fetch_batch_tasks, build_batch_events, merge_updates, validate_task_data
+from metrics import WRITE_BEHIND_BATCH, WRITE_BEHIND_LATENCY, WRITE_BEHIND_FLUSH_SECONDS, WRITE_BEHIND_MERGED
+from config import WRITE_BEHIND_WINDOW_MS, WRITE_BEHIND_MAX_BATCH, WRITE_BEHIND_MAX_PENDING, WRITE_BEHIND_TIMEOUT
+import task_events
+
+logger = logging.getLogger(__name__)
+
+# Errores de apply_batch que equivalen a un 404 de las rutas individuales
+NOT_FOUND_ERRORS = ("Tarea no encontrada", "La tarea se elimina antes en este lote")
+
+
+class WriteBehind:
+    """Cola de mutaciones de tareas y el hilo que las confirma en grupo"""
+
+    def __init__(self, window_ms: float, max_batch: int, max_pending: int, timeout: float = WRITE_BEHIND_TIMEOUT):
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self.timeout = timeout
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._deferred = deque()  # operaciones aplazadas a la siguiente ventana (van primero)
+        self._thread = None
+        self._stopping = False
+        self.flushes = 0
+        self.operations = 0
+        self.merged = 0
+        self.failures = 0
+
+    # ===== API para las rutas =====
+
+    def submit(self, user_id: int, op: str, task_id: int = None, data=None) -> Future:
+        """Encola una operación; el Future se resuelve con el resultado tras el commit.
+
+        400 si los datos no son válidos y 503 si la cola está llena, ambos sin encolar.
+        """
+        error = validate_task_data(op, data) if op in ("create", "update") else None
+        if error is not None:
+            raise HTTPException(status_code=400, detail=error)
+        future = Future()
+        item = {"user_id": user_id, "op": op, "id": task_id, "data": data, "future": future,
+                "enqueued": time.perf_counter()}
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            raise HTTPException(status_code=503, detail="Demasiadas escrituras pendientes",
+                                headers={"Retry-After": "1"})
+        return future
+
+    async def wait(self, future: Future):
+        """Resultado de submit() sin esperar más de self.timeout; 504 si no llega"""
+        try:
+            # shield: al vencer el plazo no se cancela el Future que resolverá el hilo
+            return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), self.timeout)
+        except asyncio.TimeoutError:
+            logger.error("⏱️ Escritura agrupada sin confirmar tras %.1f s", self.timeout)
+            raise HTTPException(status_code=504,
+                                detail="La escritura no se confirmó a tiempo; puede aplicarse igualmente")
+
+    async def create(self, user_id: int, task: TaskCreate) -> dict:
+        return await self.wait(self.submit(user_id, "create", data=TaskUpdate(**task.model_dump())))
+
+    async def update(self, user_id: int, task_id: int, task: TaskUpdate) -> dict:
+        return await self.wait(self.submit(user_id, "update", task_id, task))
+
+    async def delete(self, user_id: int, task_id: int) -> dict:
+        return await self.wait(self.submit(user_id, "delete", task_id))
+
+    # ===== Hilo de escritura =====
+
+    def start(self):
+        if self._thread is None:
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Aplica lo pendiente y para el hilo"""
+        if self._thread is not None:
+            self._stopping = True
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def _collect(self) -> list:
+        """Operaciones de la siguiente ventana: las aplazadas y lo que llegue hasta el plazo"""
+        items = list(self._deferred)
+        self._deferred.clear()
+        if not items:
+            item = self._queue.get()
+            if item is None:
+                return []
+            items.append(item)
+        deadline = time.perf_counter() + self.window
+        while len(items) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                self._stopping = True
+                break
+            items.append(item)
+        return items
+
+    def _run(self):
+        while True:
+            items = self._collect()
+            if items:
+                try:
+                    self.flush(items)
+                except Exception as e:
+                    self.failures += 1
+                    logger.exception("❌ Error inesperado en el hilo de escritura: %s", e)
+                    deferred = {id(item) for item in self._deferred}
+                    error = HTTPException(status_code=500, detail=f"Error al guardar la tarea: {str(e)}")
+                    for item in items:
+                        if id(item) not in deferred:
+                            self._settle(item["future"], error)
+            if self._stopping and not self._deferred and self._queue.empty():
+                return
+
+    @staticmethod
+    def _settle(future: Future, result):
+        """Resuelve el Future con el resultado o la excepción si nadie lo ha resuelto aún"""
+        if future.done():
+            return
+        if isinstance(result, Exception):
+            future.set_exception(result)
+        else:
+            future.set_result(result)
+
+    def group(self, items: list) -> dict:
+        """{user_id: operaciones de apply_batch} en orden de llegada, fusionando actualizaciones.
+
+        Cada operación lleva en "items" las llamadas que resuelve. Lo que deba
+        esperar a la ventana siguiente se mueve a self._deferred.
+        """
+        operations = {}
+        latest = {}     # (user_id, task_id) -> última operación de la tarea en esta ventana
+        blocked = set()  # usuarios con operaciones aplazadas: las siguientes también esperan
+        for item in items:
+            user_id = item["user_id"]
+            key = (user_id, item["id"])
+            previous = latest.get(key) if item["id"] is not None else None
+            if user_id in blocked or (item["op"] == "delete" and previous and previous["op"] == "update"):
+                blocked.add(user_id)
+                self._deferred.append(item)
+                continue
+            if item["op"] == "update" and previous and previous["op"] == "update":
+                previous["data"] = merge_updates(previous["data"], item["data"])
+                previous["items"].append(item)
+                self.merged += 1
+                WRITE_BEHIND_MERGED.inc()
+                continue
+            ops = operations.setdefault(user_id, [])
+            op = {"index": len(ops), "op": item["op"], "id": item["id"], "data": item["data"], "items": [item]}
+            ops.append(op)
+            if item["id"] is not None:
+                latest[key] = op
+        return operations
+
+    def flush(self, items: list):
+        """Aplica una ventana en una transacción y resuelve sus llamadas"""
+        operations = self.group(items)
+        if not operations:
+            return
+        count = sum(len(ops) for ops in operations.values())
+        start = time.perf_counter()
+        outcomes = {}
+        try:
+            with db_connection() as connection:
+                cursor = connection.cursor(dictionary=True)
+                try:
+                    for user_id, ops in operations.items():
+                        errors = apply_batch(cursor, user_id, ops, atomic=False)
+                        outcomes[user_id] = (errors, fetch_batch_tasks(cursor, user_id, ops, errors))
+                    connection.commit()
+                except Exception:
+                    connection.rollback()
+                    raise
+                finally:
+                    cursor.close()
+        except Exception as e:
+            self.failures += 1
+            logger.exception("❌ Error al aplicar %d escrituras agrupadas: %s", count, e)
+            error = HTTPException(status_code=500, detail=f"Error al guardar la tarea: {str(e)}")
+            for ops in operations.values():
+                for op in ops:
+                    for item in op["items"]:
+                        self._settle(item["future"], error)
+            return
+
+        elapsed = time.perf_counter() - start
+        self.flushes += 1
+        self.operations += count
+        WRITE_BEHIND_BATCH.observe(count)
+        WRITE_BEHIND_FLUSH_SECONDS.observe(elapsed)
+        logger.debug("💾 Commit agrupado: %d operaciones de %d usuarios en %.1f ms",
+                     count, len(operations), elapsed * 1000)
+
+        now = time.perf_counter()
+        for user_id, ops in operations.items():
+            errors, tasks = outcomes[user_id]
+            for op in ops:
+                try:
+                    result = self._result(op, errors, tasks)
+                except Exception as e:
+                    logger.exception("❌ Error al preparar el resultado de una escritura agrupada: %s", e)
+                    result = HTTPException(status_code=500, detail=f"Error al guardar la tarea: {str(e)}")
+                for item in op["items"]:
+                    WRITE_BEHIND_LATENCY.observe(now - item["enqueued"])
+                    self._settle(item["future"], result)
+        # Los avisos van después de responder a todos: un listener que falla no deja llamadas colgadas
+        for user_id, ops in operations.items():
+            errors, tasks = outcomes[user_id]
+            try:
+                events = build_batch_events(ops, errors, tasks)
+                if events:
+                    task_events.tasks_changed(user_id, events)
+            except Exception as e:
+                logger.exception("⚠️ Error al notificar los cambios de user_id %s: %s", user_id, e)
+
+    @staticmethod
+    def _result(op: dict, errors: dict, tasks: dict):
+        """Lo que habría devuelto la ruta individual para esta operación (o la excepción)"""
+        error = errors.get(op["index"])
+        if error is not None:
+            if error in NOT_FOUND_ERRORS:
+                return HTTPException(status_code=404, detail="Tarea no encontrada")
+            return HTTPException(status_code=500, detail=f"Error al guardar la tarea: {error}")
+        if op["op"] == "delete":
+            return {"message": "Tarea eliminada exitosamente"}
+        task = tasks.get(op["id"])
+        if task is None:
+            return HTTPException(status_code=404, detail="Tarea no encontrada")
+        return task
+
+    def stats(self) -> dict:
+        return {
+            "pending": self._queue.qsize() + len(self._deferred),
+            "flushes": self.flushes,
+            "operations": self.operations,
+            "merged": self.merged,
+            "failures": self.failures,
+            "avg_batch": round(self.operations / self.flushes, 2) if self.flushes else 0.0,
+        }
+
+
+writer = WriteBehind(WRITE_BEHIND_WINDOW_MS, WRITE_BEHIND_MAX_BATCH, WRITE_BEHIND_MAX_PENDING)